@@ -2,6 +2,7 @@ import os
 from flask import Flask, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, verify_jwt_in_request
+from flask_migrate import Migrate
 from app.config import Config
 
 EXEMPT_PATHS = [
@@ -14,6 +15,9 @@ EXEMPT_PATHS = [
 
 db = SQLAlchemy()
 jwt = JWTManager()
+migrate = Migrate()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
 
 
 def create_app():
@@ -25,6 +29,7 @@ def create_app():
 
     db.init_app(app)
     jwt.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
     from .utils.authentication.jwtConfiguration import user_lookup
 
     with app.app_context():
@@ -36,7 +41,23 @@ def create_app():
 
         # Call the register func
         register_routes(app)
-        db.create_all()
+
+        # The schema is managed by migrations (flask db upgrade), not at boot
+        if app.config["SCHEMA_VERSION_CHECK"] and not app.config.get("TESTING"):
+            from app.db_utils import check_schema_version
+
+            check_schema_version(MIGRATIONS_DIR)
+
+        from app.db_pool import instrument_pool
+
+        instrument_pool(db.engine)
+
+    from app.services.data_upload.ingestionQueue import start_ingestion_workers
+    from app.services.data_upload.embeddingModels import warm_up_embedding_models
+
+    if app.config["EMBEDDING_WARMUP"] and not app.config.get("TESTING"):
+        warm_up_embedding_models(app, [app.config["EMBEDDING_MODEL_NAME"]])
+    start_ingestion_workers(app)
 
     # @app.before_request
     # def require_jwt():
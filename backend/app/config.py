@@ -1,14 +1,41 @@
 import os
 
+from app.db_pool import TimedQueuePool
+
 
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # One pool per worker process shared by requests, ingestion threads and
+    # db_utils raw cursors. Size it for INGESTION_WORKERS x parallel stages
+    # plus concurrent requests; keep the total under Postgres max_connections.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        # Seconds to wait for a free connection before erroring
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # Test connections on checkout so a Postgres restart isn't fatal
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "True") == "True",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
     DEBUG = os.getenv("FLASK_DEBUG", "False") == "True"
+    # Check at boot that the database is at the latest migration (one query)
+    SCHEMA_VERSION_CHECK = os.getenv("SCHEMA_VERSION_CHECK", "True") == "True"
 
     # Set as absolute path in the container
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER")
+    # Rendered graph PNGs, keyed by patient data version
+    GRAPH_CACHE_DIR = os.getenv(
+        "GRAPH_CACHE_DIR", os.path.join(UPLOAD_FOLDER or "uploads", "graph_cache")
+    )
+    GRAPH_CACHE_MEMORY_ENTRIES = int(os.getenv("GRAPH_CACHE_MEMORY_ENTRIES", "256"))
+    # Render processes per worker process for graph pre-rendering (0 renders
+    # in the calling thread); started lazily on the first render
+    GRAPH_RENDER_WORKERS = int(os.getenv("GRAPH_RENDER_WORKERS", "2"))
+    # Render the patient's graphs as the last step of report ingestion
+    GRAPH_PRERENDER = os.getenv("GRAPH_PRERENDER", "True") == "True"
 
     # Make sure logging is enabled
     FLASK_LOG_LEVEL = os.getenv("FLASK_LOG_LEVEL", "INFO")
@@ -16,6 +43,46 @@ class Config:
     JWT_TOKEN_LOCATION = ["cookies"]
     JWT_COOKIE_CSRF_PROTECT = False
 
+    # Background report ingestion (threads per worker process, 0 disables)
+    INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+    INGESTION_POLL_INTERVAL = float(os.getenv("INGESTION_POLL_INTERVAL", "5"))
+    # Running jobs touch updated_at this often (seconds), even mid-stage;
+    # one not touched for INGESTION_STALE_AFTER seconds is considered
+    # abandoned. Workers look for abandoned jobs every
+    # INGESTION_RECOVERY_INTERVAL seconds.
+    INGESTION_HEARTBEAT_INTERVAL = float(os.getenv("INGESTION_HEARTBEAT_INTERVAL", "30"))
+    INGESTION_STALE_AFTER = int(os.getenv("INGESTION_STALE_AFTER", "300"))
+    INGESTION_RECOVERY_INTERVAL = float(os.getenv("INGESTION_RECOVERY_INTERVAL", "60"))
+    INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+
+    # Sentence embedding model used for chat and summary retrieval
+    EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-mpnet-base-v2")
+    # Load the embedding model when the worker boots instead of on first use
+    EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "True") == "True"
+
+    # Max concurrent requests to Ollama per process; match OLLAMA_NUM_PARALLEL
+    OLLAMA_MAX_IN_FLIGHT = int(
+        os.getenv("OLLAMA_MAX_IN_FLIGHT", os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+    )
+    # Of those, slots ingestion may not use so chat never queues behind it
+    OLLAMA_INTERACTIVE_SLOTS = int(os.getenv("OLLAMA_INTERACTIVE_SLOTS", "1"))
+    OLLAMA_HOST = os.getenv("OLLAMA_HOST")
+    # Seconds to open a connection / to wait for a generation to finish
+    OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+    OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "180"))
+    # Extra attempts after a connection error, timeout or 5xx response
+    OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES", "2"))
+    OLLAMA_RETRY_BACKOFF = float(os.getenv("OLLAMA_RETRY_BACKOFF", "1"))
+    # Seconds after the first attempt of a request when no more attempts are
+    # made; later attempts get only the remaining time as read timeout
+    OLLAMA_RETRY_DEADLINE = float(os.getenv("OLLAMA_RETRY_DEADLINE", "300"))
+
+    # Reuse responses to identical prompts for models with temperature 0
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True") == "True"
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+    # Seconds before a model's Modelfile is re-read from Ollama
+    LLM_CACHE_MODEL_TTL = int(os.getenv("LLM_CACHE_MODEL_TTL", "300"))
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -0,0 +1,87 @@
+"""
+Connection-pool instrumentation for the shared SQLAlchemy engine.
+
+Every database access in the backend (ORM sessions, ingestion workers,
+``db_utils`` raw cursors, graph queries) checks connections out of the one
+engine pool configured by ``SQLALCHEMY_ENGINE_OPTIONS``. This module times
+how long callers wait for a connection and how long they hold it, for
+``/debug/db-pool``.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+_lock = threading.Lock()
+_stats = {
+    "checkouts": 0,
+    "wait_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+    "timeouts": 0,
+    "checkins": 0,
+    "held_seconds": 0.0,
+    "max_held_seconds": 0.0,
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with _lock:
+                _stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with _lock:
+                _stats["checkouts"] += 1
+                _stats["wait_seconds"] += waited
+                _stats["max_wait_seconds"] = max(_stats["max_wait_seconds"], waited)
+
+
+def instrument_pool(engine) -> None:
+    """Track how long connections stay checked out of ``engine``'s pool."""
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        held = time.perf_counter() - started
+        with _lock:
+            _stats["checkins"] += 1
+            _stats["held_seconds"] += held
+            _stats["max_held_seconds"] = max(_stats["max_held_seconds"], held)
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """Current pool occupancy plus cumulative wait and hold times."""
+    with _lock:
+        stats = dict(_stats)
+    pool = engine.pool
+    stats["mean_wait_seconds"] = (
+        stats["wait_seconds"] / stats["checkouts"] if stats["checkouts"] else None
+    )
+    stats["mean_held_seconds"] = (
+        stats["held_seconds"] / stats["checkins"] if stats["checkins"] else None
+    )
+    stats["status"] = pool.status()
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    return stats
@@ -2,35 +2,59 @@ import psycopg2
 import psycopg2.extras
 from flask import current_app
 from datetime import datetime
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
 
 def get_db_connection():
     """
-    Create a direct connection to the PostgreSQL database.
-    This bypasses Flask-SQLAlchemy completely to avoid app context issues.
+    Check a raw DBAPI connection out of the shared SQLAlchemy pool.
+
+    For code that wants plain psycopg2 cursors; the connection is reused
+    across requests instead of opening a new one each time. Pass it to
+    ``close_connection`` to return it to the pool.
     """
-    # Get the DB connection parameters from the environment variable
-    # In Docker, this will use the container-network connection
-    host = "db"  # Container name from docker-compose
-    port = 5432  # Default PostgreSQL port
-    user = "postgres"
-    password = "password"
-    database = "neuroclinaical"
-    
-    # Create and return the connection
-    connection = psycopg2.connect(
-        host=host,
-        port=port,
-        user=user,
-        password=password,
-        database=database
-    )
-    
-    # Set the connection to automatically convert PostgreSQL arrays to Python lists
-    psycopg2.extras.register_default_jsonb(globally=True, loads=lambda x: x)
-    
+    connection = db.engine.raw_connection()
+
     # Return a connection with a DictCursor for easier column access
     return connection, connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
+def query_rows(sql, params=None):
+    """
+    Run a read-only query on a pooled connection and return a list of dicts.
+
+    ``sql`` uses SQLAlchemy ``:name`` placeholders.
+    """
+    with db.engine.connect() as conn:
+        result = conn.execute(text(sql), params or {})
+        return [dict(row._mapping) for row in result]
+
+def check_schema_version(migrations_dir):
+    """
+    Check that the database is at the latest migration; log an error if not.
+
+    Costs one query on ``alembic_version``; the head revision comes from the
+    migration scripts on disk. Only logs, so ``flask db upgrade`` (which
+    loads the app too) can still bring the schema up to date.
+    """
+    heads = set(ScriptDirectory(migrations_dir).get_heads())
+    try:
+        with db.engine.connect() as conn:
+            current = set(
+                conn.execute(text("SELECT version_num FROM alembic_version")).scalars()
+            )
+    except SQLAlchemyError:
+        current = set()
+    if current == heads:
+        return True
+    current_app.logger.error(
+        f"Database schema is at revision {', '.join(sorted(current)) or 'none'}, "
+        f"expected {', '.join(sorted(heads))}. Run `flask db upgrade`."
+    )
+    return False
+
 def close_connection(connection, cursor):
     """Safely close a database connection and cursor."""
     if cursor:
@@ -39,18 +63,38 @@ def close_connection(connection, cursor):
         connection.close()
 
 def get_report(report_id):
-    """Get a report by ID using direct database access with proper app context."""
-    with app.app_context():  # Ensure Flask app context
-        conn, cursor = get_db_connection()
-        try:
-            cursor.execute(
-                "SELECT id, patient_id, filepath, filetype, summary FROM reports WHERE id = %s",
-                (report_id,)
-            )
-            report = cursor.fetchone()
-            return report
-        finally:
-            close_connection(conn, cursor)
+    """Get a report by ID using direct database access."""
+    conn, cursor = get_db_connection()
+    try:
+        cursor.execute(
+            """
+            SELECT id, patient_id, file_path AS filepath, file_name, summary,
+                   extracted_text
+            FROM reports WHERE id = %s
+            """,
+            (report_id,)
+        )
+        report = cursor.fetchone()
+        return report
+    finally:
+        close_connection(conn, cursor)
+
+def update_report_text(report_id, extracted_text):
+    """Cache a report's extracted text using direct database access."""
+    conn, cursor = get_db_connection()
+    try:
+        cursor.execute(
+            "UPDATE reports SET extracted_text = %s WHERE id = %s",
+            (extracted_text, report_id)
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        current_app.logger.error(f"Error caching report text: {str(e)}")
+        return False
+    finally:
+        close_connection(conn, cursor)
 
 def update_report_summary(report_id, summary):
     """Update a report's summary using direct database access."""
@@ -6,6 +6,7 @@ from flask_jwt_extended import jwt_required
 from app.db_utils import (
     get_report,
     update_report_summary,
+    update_report_text,
     store_seizure,
     store_drug
 )
@@ -26,31 +27,33 @@ def process_report(report_id):
         handle_drugadmin_request,
     )
     from app.services.data_upload.uploadUtilities import extract_days_from_text
-    from app.services.data_upload.uploadHandlers import pdf_upload_handler, docx_upload_handler
+    from app.services.data_upload.uploadHandlers import text_extractors
     
     # Get the report using direct database access
     report = get_report(report_id)
     if not report:
         return jsonify({"error": "Report not found"}), 404
     
+    filetype = os.path.splitext(report['file_name'] or report['filepath'])[1].lower().lstrip(".")
+
     # Check if file exists
-    if not os.path.exists(report['filepath']):
+    if not report['extracted_text'] and not os.path.exists(report['filepath']):
         return jsonify({"error": "Report file not found"}), 404
     
     try:
-        # Extract text based on file type
-        if report['filetype'] == "pdf":
-            extracted_text = pdf_upload_handler()(report['filepath'])
-        elif report['filetype'] == "docx":
-            extracted_text = docx_upload_handler()(report['filepath'])
-        else:
-            return jsonify({"error": f"Unsupported file type: {report['filetype']}"}), 400
+        # Use the text cached at upload; parse the file only on a miss
+        extracted_text = report['extracted_text']
+        if not extracted_text:
+            if filetype not in text_extractors:
+                return jsonify({"error": f"Unsupported file type: {filetype}"}), 400
+            extracted_text = text_extractors[filetype](report['filepath'])
+            update_report_text(report_id, extracted_text)
             
-        current_app.logger.info(f"Extracted {len(extracted_text)} characters from {report['filetype']} file")
+        current_app.logger.info(f"Extracted {len(extracted_text)} characters from {filetype} file")
         
         # Start with a basic summary
         summary = report['summary'] or ""
-        summary += f"\nProcessing report on {report['filetype']} file with {len(extracted_text)} characters."
+        summary += f"\nProcessing report on {filetype} file with {len(extracted_text)} characters."
         update_report_summary(report_id, summary)
         
         # Extract days from text
@@ -1,12 +1,13 @@
-from app import create_app
+from app import create_app, db
+from app.db_pool import pool_stats
+from app.services.data_upload.embeddingModels import embedding_model_stats
+from app.services.data_upload.llmCache import llm_cache_stats
+from app.services.data_upload.ollamaClient import OllamaError, get_ollama_client
 from flask import jsonify, current_app
-import urllib
 import os
-import json
 
 app = create_app()
 app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY")
-OLLAMA_URL = os.getenv("OLLAMA_HOST")
 
 
 @app.route("/health", methods=["GET"])
@@ -41,23 +42,40 @@ def list_routes():
     return jsonify(sorted(routes, key=lambda x: x["path"]))
 
 
+@app.route("/debug/embeddings", methods=["GET"])
+def embedding_stats():
+    """Load time and use count of the embedding models in this worker"""
+    return jsonify(embedding_model_stats())
+
+
 @app.route("/debug/ollama", methods=["GET"])
 def test_ollama():
     """Check ollama is alive"""
     payload = {"model": "mymodel", "prompt": "hi how are you", "stream": False}
 
-    req = urllib.request.Request(
-        OLLAMA_URL,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-    )
-
     try:
-        with urllib.request.urlopen(req, timeout=None) as response:
-            result = json.loads(response.read().decode("utf-8"))
-            return result
-    except urllib.error.URLError as e:
-        print("Error contacting Ollama:", e)
+        return get_ollama_client().generate(payload)
+    except OllamaError as e:
+        current_app.logger.error(f"Error contacting Ollama: {e}")
+        return jsonify(error=str(e)), 502
+
+
+@app.route("/debug/ollama/metrics", methods=["GET"])
+def ollama_metrics():
+    """Per-model request counts and latency histograms for this worker"""
+    return jsonify(get_ollama_client().stats())
+
+
+@app.route("/debug/db-pool", methods=["GET"])
+def db_pool_metrics():
+    """Connection pool occupancy and checkout wait/hold times for this worker"""
+    return jsonify(pool_stats(db.engine))
+
+
+@app.route("/debug/llm-cache", methods=["GET"])
+def llm_cache_metrics():
+    """LLM response cache hit rate for this worker and total cached entries"""
+    return jsonify(llm_cache_stats())
 
 
 if __name__ == "__main__":
@@ -51,6 +51,8 @@ class Patient(db.Model):
     __tablename__ = "patients"
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.Text, nullable=False)
+    # Bumped whenever the patient's seizures or drugs change; keys graph caches
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     reports = db.relationship("Report", back_populates="patient", cascade="all, delete")
     supplemental_materials = db.relationship(
@@ -65,30 +67,49 @@ class Patient(db.Model):
     drug_administrations = db.relationship(
         "DrugAdministration", back_populates="patient", cascade="all, delete"
     )
+    day_aggregates = db.relationship("PatientDayAggregate", cascade="all, delete")
+    daily_stats = db.relationship("PatientDailyStat", cascade="all, delete")
 
 
 class Report(db.Model):
     __tablename__ = "reports"
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(
-        db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False
+        db.Integer,
+        db.ForeignKey("patients.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     summary = db.Column(db.Text)
     file_path = db.Column(db.Text, nullable=False)
     file_name = db.Column(db.Text)
+    # Text extracted once at upload; content_hash (sha256 of the file)
+    # lets a re-upload of the same document reuse it
+    extracted_text = db.Column(db.Text)
+    content_hash = db.Column(db.Text, index=True)
+    # Retrieval index built at ingestion: chunk text here, float16
+    # embeddings in the .npy sidecar at embedding_path
+    embedding_chunks = db.Column(db.JSON)
+    embedding_path = db.Column(db.Text)
+    embedding_model = db.Column(db.Text)
 
     patient = db.relationship("Patient", back_populates="reports")
     extracted_images = db.relationship(
         "ExtractedImage", back_populates="report", cascade="all, delete"
     )
-    
+    ingestion_jobs = db.relationship(
+        "IngestionJob", back_populates="report", cascade="all, delete"
+    )
 
 
 class ExtractedImage(db.Model):
     __tablename__ = "extracted_images"
     id = db.Column(db.Integer, primary_key=True)
     report_id = db.Column(
-        db.Integer, db.ForeignKey("reports.id", ondelete="CASCADE"), nullable=False
+        db.Integer,
+        db.ForeignKey("reports.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     file_path = db.Column(db.Text, nullable=True)
 
@@ -97,6 +118,8 @@ class ExtractedImage(db.Model):
 
 class Seizure(db.Model):
     __tablename__ = "seizures"
+    # Also serves lookups by patient_id alone
+    __table_args__ = (db.Index("ix_seizures_patient_id_day", "patient_id", "day"),)
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(
         db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False
@@ -114,7 +137,7 @@ class Seizure(db.Model):
 class Electrode(db.Model):
     __tablename__ = "electrodes"
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.Text, nullable=False)
+    name = db.Column(db.Text, nullable=False, unique=True)
 
     seizures = db.relationship(
         "Seizure", secondary=seizures_electrodes, back_populates="electrodes"
@@ -123,6 +146,10 @@ class Electrode(db.Model):
 
 class DrugAdministration(db.Model):
     __tablename__ = "drug_administration"
+    # Also serves lookups by patient_id alone
+    __table_args__ = (
+        db.Index("ix_drug_administration_patient_id_day", "patient_id", "day"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(
         db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False
@@ -139,7 +166,10 @@ class SupplementalMaterial(db.Model):
     __tablename__ = "supplemental_materials"
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(
-        db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False
+        db.Integer,
+        db.ForeignKey("patients.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     file_path = db.Column(db.Text, nullable=False)
     file_name = db.Column(db.Text)
@@ -151,10 +181,16 @@ class Conversation(db.Model):
     __tablename__ = "conversations"
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
-        db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     patient_id = db.Column(
-        db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False
+        db.Integer,
+        db.ForeignKey("patients.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
 
     user = db.relationship("User", back_populates="conversations")
@@ -171,9 +207,97 @@ class Message(db.Model):
         db.Integer,
         db.ForeignKey("conversations.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
     query = db.Column(db.Text, nullable=False)
     response = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=func.now())
 
     conversation = db.relationship("Conversation", back_populates="messages")
+
+
+class IngestionJob(db.Model):
+    __tablename__ = "ingestion_jobs"
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(
+        db.Integer,
+        db.ForeignKey("reports.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    patient_id = db.Column(
+        db.Integer,
+        db.ForeignKey("patients.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    file_type = db.Column(db.Text, nullable=False)
+    # queued -> running -> succeeded / failed
+    status = db.Column(db.Text, nullable=False, default="queued", index=True)
+    stage = db.Column(db.Text)
+    # {stage_name: {"state": ..., "started_at": ..., "finished_at": ...}}
+    stages = db.Column(db.JSON, nullable=False, default=dict)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=func.now())
+    started_at = db.Column(db.DateTime)
+    # Set in the transaction that stores the pipeline's results, so a retried
+    # job knows they are already in and does not store them twice
+    persisted_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=func.now(), onupdate=func.now()
+    )
+
+    report = db.relationship("Report", back_populates="ingestion_jobs")
+
+
+class LLMResponse(db.Model):
+    """Cached Ollama completion, keyed by sha256 of model, Modelfile and prompt."""
+
+    __tablename__ = "llm_response_cache"
+    key = db.Column(db.String(64), primary_key=True)
+    model = db.Column(db.Text, nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=func.now())
+    # Least recently used rows are evicted first
+    last_used_at = db.Column(db.DateTime, nullable=False, default=func.now(), index=True)
+
+
+class PatientDayAggregate(db.Model):
+    """
+    Seizure stack and electrode counts of one patient-day for the day-level
+    graphs, maintained as seizures are stored. Per-day totals live in
+    ``PatientDailyStat`` only.
+    """
+
+    __tablename__ = "patient_day_aggregates"
+    patient_id = db.Column(
+        db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = db.Column(db.Integer, primary_key=True)
+    # [[duration, [electrode, ...]], ...], one entry per seizure in id order
+    stack = db.Column(db.JSON, nullable=False, default=list, server_default="[]")
+    # {electrode: number of the day's seizures it was an onset electrode of}
+    electrode_counts = db.Column(db.JSON, nullable=False, default=dict, server_default="{}")
+
+
+class PatientDailyStat(db.Model):
+    """Seizure and drug totals of one patient-day, refreshed as data is stored."""
+
+    __tablename__ = "patient_daily_stats"
+    patient_id = db.Column(
+        db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = db.Column(db.Integer, primary_key=True)
+    seizure_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    total_seizure_duration = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    drug_administration_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    total_dosage = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # {drug_name: mg administered that day}
+    drug_totals = db.Column(db.JSON, nullable=False, default=dict, server_default="{}")
@@ -1,10 +1,16 @@
-from app.services.data_upload.nlpRequestHandler import handle_chat_request
-from app.services.data_upload.uploadHandlers import docx_upload_handler, pdf_upload_handler
-from flask import Blueprint, request, jsonify, send_file
+from app.services.data_upload.nlpRequestHandler import handle_chat_request, stream_chat_request
+from app.services.data_upload.uploadHandlers import (
+    get_report_text,
+    report_file_type,
+    supported_file_types,
+)
+from app.services.data_upload.uploadUtilities import build_report_index, load_report_index
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 from flask_restful import Api, Resource
 from app.models import Patient, Report
 from app import db
 from flask import current_app
+import json
 import os
 
 chats_bp = Blueprint("chats", __name__, url_prefix="/chat")
@@ -12,10 +18,6 @@ api = Api(chats_bp)
 
 @chats_bp.route("/<int:report_id>/messages", methods=["POST"])
 def send_message(report_id):
-    supported_file_types = {
-    ".pdf": pdf_upload_handler().extract_text_from_pdf,
-    ".docx": docx_upload_handler().extract_text_from_docx,
-}
     current_app.logger.error(f"Working0")
     try:
         query_data = request.get_json()
@@ -33,32 +35,66 @@ def send_message(report_id):
             current_app.logger.error(f"Error uploading report")
             return jsonify({"error": "Report not found"}), 404
         current_app.logger.error(f"Working2")
-        _, content_ext = os.path.splitext(report.file_name)
-        current_app.logger.error(f"Working3")
-        current_app.logger.error(f"{content_ext}")
-        # Extract text from file
-        if content_ext not in supported_file_types:
-            return jsonify({"error": "Failed to match extension"}), 500
+        # Stored retrieval index: one question embedding + a dot product
+        index = load_report_index(report)
+        extracted_text = None
+        if index is None:
+            current_app.logger.error(f"Working3")
+            if report_file_type(report) not in supported_file_types:
+                return jsonify({"error": "Failed to match extension"}), 500
+
+            current_app.logger.error(f"Working4")
+            if not report.extracted_text and not os.path.exists(report.file_path):
+                current_app.logger.error(f"File not found: {report.file_path}")
+                return jsonify({"error": "Report file not found"}), 500
+            # Cached at upload; only older reports are parsed here
+            extracted_text = get_report_text(report)
+            if not extracted_text:
+                return jsonify({"error": "Failed to retrieve reports"}), 500
+
+            # Reports ingested before indexing existed get indexed on first use
+            index = build_report_index(report, extracted_text)
+            db.session.commit()
 
-        current_app.logger.error(f"Working4")
-        if not os.path.exists(report.file_path):
-            current_app.logger.error(f"File not found: {report.file_path}")
-            return jsonify({"error": "Report file not found"}), 500
-        extracted_text = supported_file_types[content_ext](report.file_path)
-        current_app.logger.error(f"{extracted_text}")
-        if not extracted_text:
-            return jsonify({"error": "Failed to retrieve reports"}), 500
-        
     except Exception as e:
         current_app.logger.error(f"Exception")
         return jsonify({"error": "Failed to retrieve reports"}), 500# User input
-    
+
+    # Streaming mode: forward tokens as server-sent events as Ollama emits them
+    if query_data.get("stream") or request.accept_mimetypes.best == "text/event-stream":
+        return Response(
+            stream_with_context(_chat_events(extracted_text, query_data["query"], index)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     try:
-        response = handle_chat_request(extracted_text, query_data["query"])
+        response = handle_chat_request(extracted_text, query_data["query"], index)
         return jsonify({"response": response}), 200
     except Exception as e:
            return jsonify({"error": "Error Processing Report"}), 500# User input
 
-    
 
+def _sse(data, event=None):
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
+
+def _chat_events(extracted_text, query, index):
+    """
+    SSE body for a streamed chat answer.
+
+    One ``data`` event per token, then a ``done`` event carrying the full
+    response, or an ``error`` event if the model fails mid-stream.
+    """
+    tokens = []
+    try:
+        for token in stream_chat_request(extracted_text, query, index):
+            tokens.append(token)
+            yield _sse({"token": token})
+    except Exception as e:
+        current_app.logger.error(f"Error streaming chat response: {e}")
+        yield _sse({"error": "Error Processing Report"}, event="error")
+        return
+    yield _sse({"response": "".join(tokens)}, event="done")
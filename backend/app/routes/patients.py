@@ -1,11 +1,27 @@
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, make_response, send_file
 from app.models import Patient
 from app import db
-from app.services.create_graphs.create_graphs import make_plot2
+from app.db_utils import query_rows
 from io import BytesIO
 from PIL import Image
-from app.services.create_graphs.generate_graphs import get_graphs
+from app.services.create_graphs.generate_graphs import (
+    GRAPH_COUNT,
+    GRAPH_VIEWS,
+    fetch_graph_data,
+    get_graphs,
+)
+from app.services.create_graphs.graphCache import (
+    drop_patient_graphs,
+    get_cached_graph,
+    get_patient_version,
+    graph_data_etag,
+    graph_etag,
+    store_graph,
+)
+from app.services.create_graphs.graphData import build_graph_data
+from app.services.create_graphs.graphRenderer import render_patient_graphs
+from app.services.data_upload.dailyStats import load_daily_stats
 
 
 patients_bp = Blueprint("patients", __name__, url_prefix="/patients")
@@ -100,6 +116,7 @@ def delete_patient(patient_id):
 
     db.session.delete(patient)
     db.session.commit()
+    drop_patient_graphs(patient_id)
     return "", 204
 
 
@@ -200,17 +217,96 @@ def get_patient_supplemental_materials(patient_id):
 def get_patient_graph(patient_id, graph_number):
     """Graph number is 0 - 8"""
     try:
-        graph_image = get_graphs(patient_id, graph_number)
+        version = get_patient_version(patient_id)
+        if version is None:
+            return jsonify({"error": "Patient not found."}), 404
+
+        # Unchanged since the client's copy: skip the DB load and render
+        etag = graph_etag(patient_id, graph_number, version)
+        if request.if_none_match.contains(etag):
+            response = make_response("", 304)
+            response.set_etag(etag)
+            return response
+
+        png = get_cached_graph(patient_id, graph_number, version)
+        if png is None:
+            graph_image = get_graphs(patient_id, graph_number)
+
+            # Save to in-memory buffer
+            img_io = BytesIO()
+            graph_image.save(img_io, "PNG")
+            png = img_io.getvalue()
+            store_graph(patient_id, graph_number, version, png)
+
+        response = send_file(BytesIO(png), mimetype="image/png", as_attachment=False)
+        response.set_etag(etag)
+        # Clients may keep the image but must revalidate it each time
+        response.headers["Cache-Control"] = "no-cache"
+        return response
 
-        # Save to in-memory buffer
-        img_io = BytesIO()
-        graph_image.save(img_io, "PNG")
-        img_io.seek(0)
+    except Exception as e:
+        return {"error": str(e)}, 500
 
-        return send_file(img_io, mimetype="image/png", as_attachment=False)
+
+@patients_bp.route(
+    "/<int:patient_id>/graph-data/<int:graph_number>", methods=["GET"]
+)
+def get_patient_graph_data(patient_id, graph_number):
+    """Series of graph 0 - 8 as JSON, for drawing client side"""
+    if graph_number >= GRAPH_COUNT:
+        return jsonify({"error": f"Graph number must be 0-{GRAPH_COUNT - 1}."}), 400
+    try:
+        version = get_patient_version(patient_id)
+        if version is None:
+            return jsonify({"error": "Patient not found."}), 404
+
+        etag = graph_data_etag(patient_id, graph_number, version)
+        if request.if_none_match.contains(etag):
+            response = make_response("", 304)
+            response.set_etag(etag)
+            return response
+
+        seizures, drugs = fetch_graph_data(
+            patient_id, GRAPH_VIEWS[graph_number]["screen"]
+        )
+        response = jsonify(build_graph_data(graph_number, seizures, drugs))
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
 
     except Exception as e:
-        return {"error": str(e)}, 500
+        return jsonify({"error": str(e)}), 500
+
+
+@patients_bp.route("/<int:patient_id>/graphs/render", methods=["POST"])
+def render_patient_graph_set(patient_id):
+    """Render and cache all nine graphs; ?force=true re-renders cached ones"""
+    force = request.args.get("force", "false").lower() == "true"
+    try:
+        summary = render_patient_graphs(patient_id, force=force)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if summary is None:
+        return jsonify({"error": "Patient not found."}), 404
+    return jsonify(summary), 200
+
+
+@patients_bp.route("/<int:patient_id>/daily_stats", methods=["GET"])
+def get_patient_daily_stats(patient_id):
+    """Seizure and drug totals per day; ?from_day= / ?to_day= limit the range"""
+    try:
+        from_day, to_day = (
+            int(request.args[key]) if key in request.args else None
+            for key in ("from_day", "to_day")
+        )
+    except ValueError:
+        return jsonify({"error": "from_day and to_day must be integers."}), 400
+    try:
+        if get_patient_version(patient_id) is None:
+            return jsonify({"error": "Patient not found."}), 404
+        return jsonify(load_daily_stats(patient_id, from_day, to_day)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @patients_bp.route("/<int:patient_id>/drug_administration", methods=["GET"])
@@ -219,69 +315,38 @@ def get_patient_drug_administration(patient_id):
     if not patient:
         return jsonify({"error": "Patient not found."}), 404
 
-    # Import psycopg2 for direct database access
-    import psycopg2
-    import psycopg2.extras
-
     try:
-        # Get database connection parameters from the environment
-        host = "db"  # Container name from docker-compose
-        port = 5432  # Default PostgreSQL port
-        user = "postgres"
-        password = "password"
-        database = "neuroclinaical"
-
-        # Create direct connection to PostgreSQL
-        conn = psycopg2.connect(
-            host=host,
-            port=port,
-            user=user,
-            password=password,
-            database=database,
-        )
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-        # Get drug administrations with drug information - removed the time column
-        cursor.execute(
+        # Get drug administrations over the shared connection pool
+        drugs = query_rows(
             """
             SELECT 
                 da.id, 
-                d.name AS drug_name, 
+                da.drug_name, 
                 da.day, 
                 da.dosage,
                 da.time
             FROM 
                 drug_administration da
             WHERE 
-                da.patient_id = %s
+                da.patient_id = :patient_id
             ORDER BY 
                 da.day ASC
         """,
-            (patient_id,),
+            {"patient_id": patient_id},
         )
 
-        # Fetch all results
-        drugs = cursor.fetchall()
-
         # Convert to list of dictionaries for JSON response
         result = []
         for drug in drugs:
             drug_data = {
                 "id": drug["id"],
                 "drug_name": drug["drug_name"],
-                "drug_class": drug["drug_class"],
                 "day": drug["day"],
                 "dosage": drug["dosage"],
-                "time": drug[
-                    "time"
-                ],  # Since the time column doesn't exist in your database
+                "time": drug["time"],
             }
             result.append(drug_data)
 
-        # Close the database connection
-        cursor.close()
-        conn.close()
-
         return jsonify(result), 200
 
     except Exception as e:
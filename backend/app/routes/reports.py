@@ -1,14 +1,18 @@
 import mimetypes
-from app.services.data_upload.uploadHandlers import upload_controller
+from app.services.data_upload.ingestionQueue import (
+    enqueue_report_job,
+    notify_workers,
+    serialize_job,
+)
+from app.services.data_upload.uploadHandlers import supported_file_types
 from flask import Blueprint, jsonify, request, current_app, send_file
 from flask_jwt_extended import current_user, jwt_required, get_jwt_identity
 from flask_restful import Api, Resource
 from app import db
-from app.models import ExtractedImage, Report, Patient
+from app.models import ExtractedImage, IngestionJob, Report, Patient
 import os
 from werkzeug.utils import secure_filename
 from datetime import datetime
-from app.services.data_upload.uploadHandlers import upload_controller
 
 
 reports_bp = Blueprint("reports", __name__, url_prefix="/reports")
@@ -49,6 +53,11 @@ def upload_report():
     if not patient:
         return jsonify({"error": "Patient not found"}), 404
 
+    # Reject unsupported types now rather than failing the background job
+    filetype = os.path.splitext(file.filename)[1].lower().lstrip(".")
+    if filetype not in supported_file_types:
+        return jsonify({"error": f"Unsupported file type: {filetype}"}), 400
+
     try:
         # Create a secure filename and save file to appropriate location
         filename = secure_filename(file.filename)
@@ -64,7 +73,6 @@ def upload_report():
         file_path = os.path.join(reports_dir, f"{timestamp}_{filename}")
 
         file.save(file_path)
-        filetype = os.path.splitext(filename)[1].lower().lstrip(".")
         # Create database record for the report
         new_report = Report(
             patient_id=patient_id,
@@ -73,28 +81,21 @@ def upload_report():
             file_name=filename
         )
 
-        #if not upload_controller(filetype, file_path, patient_id, new_report):
-        #    raise Exception
-
         db.session.add(new_report)
 
         db.session.flush()                  #  ↶ gets new_report.id without final commit
 
-        success = upload_controller(
-            filetype,          # "docx" / "pdf"
-            file_path,         # absolute path on disk
-            patient_id,        # p_id
-            new_report         # the ORM object we just created
-        )
-
-        if not success:
-            db.session.rollback()
-            return jsonify({"error": "File processing error"}), 500
+        # Text extraction and the LLM calls run on the ingestion workers;
+        # the client polls the job for progress.
+        job = enqueue_report_job(new_report, filetype)
+        db.session.commit()
+        notify_workers()
 
-        db.session.commit()                 # finalise insert + summary update
-        return jsonify({"message": "Report uploaded successfully",
+        return jsonify({"message": "Report queued for processing",
                         "report_id": new_report.id,
-                        "patient_id": patient_id}), 201
+                        "patient_id": patient_id,
+                        "job_id": job.id,
+                        "status_url": f"/reports/jobs/{job.id}"}), 202
 
     except Exception as e:
         db.session.rollback()
@@ -102,6 +103,15 @@ def upload_report():
         return jsonify({"error": "File processing error"}), 500
 
 
+@reports_bp.route("/jobs/<int:job_id>", methods=["GET"])
+def get_ingestion_job(job_id):
+    """Report the status and per-stage progress of an ingestion job."""
+    job = db.session.get(IngestionJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(serialize_job(job)), 200
+
+
 @reports_bp.route("/<int:report_id>", methods=["GET"])
 def get_report_metadata(report_id):
     # Import required modules
@@ -182,6 +192,10 @@ def delete_report(report_id):
                 current_app.logger.info(f"Successfully deleted file: {filepath}")
             else:
                 current_app.logger.warning(f"File not found at path: {filepath}")
+
+            # Retrieval index sidecar written at ingestion
+            if os.path.exists(f"{filepath}.emb.npy"):
+                os.remove(f"{filepath}.emb.npy")
         except Exception as file_error:
             # Log the error but don't affect the API response
             current_app.logger.warning(f"Could not delete file: {str(file_error)}")
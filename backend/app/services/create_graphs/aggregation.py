@@ -0,0 +1,134 @@
+"""
+Aggregation of patient events for the dashboard graphs.
+
+Long monitoring stays can have thousands of seizures across weeks, which the
+graphs cannot show one glyph and one tick per event. ``aggregate_for_screen``
+reduces the records ``make_plot2`` takes to a size chosen from the data:
+
+- onset electrodes beyond the ``TOP_ELECTRODES`` most frequent are collapsed
+  into a single ``OTHER_ELECTRODES`` entry;
+- the time-of-day screen shows individual seizures while they fit in
+  ``MAX_TIME_BARS`` bars, and otherwise falls back to per-hour or per-day
+  bins (see ``choose_time_resolution``).
+
+``tick_stride`` thins tick labels so any axis shows at most a fixed number.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+RESOLUTION_SEIZURE = "seizure"
+RESOLUTION_HOUR = "hour"
+RESOLUTION_DAY = "day"
+
+OTHER_ELECTRODES = "Other"
+
+# Bounds that keep render time and PNG size flat for any patient
+TOP_ELECTRODES = 8
+MAX_TIME_BARS = 300
+MAX_DAY_TICKS = 8
+MAX_TIME_TICKS = 24
+
+
+def tick_stride(count: int, max_ticks: int) -> int:
+    """Step between labelled ticks so at most ``max_ticks`` of ``count`` show."""
+    return max(1, -(-count // max_ticks))
+
+
+def top_electrodes(seizures: Iterable[Dict[str, Any]], n: int = TOP_ELECTRODES) -> List[str]:
+    """The ``n`` electrodes involved in the most seizures."""
+    counts = Counter(e for s in seizures for e in set(s.get("electrodes") or []))
+    return [e for e, _ in counts.most_common(n)]
+
+
+def collapse_electrodes(
+    seizures: List[Dict[str, Any]], n: int = TOP_ELECTRODES
+) -> List[Dict[str, Any]]:
+    """
+    Replace all but the ``n`` most frequent electrodes with ``OTHER_ELECTRODES``.
+
+    Records are returned unchanged (not copied) when there are at most ``n``
+    distinct electrodes.
+    """
+    keep = set(top_electrodes(seizures, n + 1))
+    if len(keep) <= n:
+        return seizures
+    keep = set(top_electrodes(seizures, n))
+
+    collapsed = []
+    for seizure in seizures:
+        electrodes = []
+        for e in seizure.get("electrodes") or []:
+            e = e if e in keep else OTHER_ELECTRODES
+            if e not in electrodes:
+                electrodes.append(e)
+        collapsed.append({**seizure, "electrodes": electrodes})
+    return collapsed
+
+
+def _hour(seizure: Dict[str, Any]) -> int:
+    return int(seizure["start_time"][:2])
+
+
+def choose_time_resolution(seizures: List[Dict[str, Any]], max_bars: int = MAX_TIME_BARS) -> str:
+    """Finest of seizure / hour / day resolution that needs at most ``max_bars`` bars."""
+    if len(seizures) <= max_bars:
+        return RESOLUTION_SEIZURE
+    if len({(s["day"], _hour(s)) for s in seizures}) <= max_bars:
+        return RESOLUTION_HOUR
+    return RESOLUTION_DAY
+
+
+def bin_seizures(seizures: List[Dict[str, Any]], resolution: str) -> List[Dict[str, Any]]:
+    """
+    Merge seizures into one record per hour or per day.
+
+    A bin's ``duration`` is the total seizure time in it, ``count`` the number
+    of seizures and ``electrodes`` every onset electrode, most frequent first.
+    ``start_time`` is the bin centre, ``span_hours`` its width and ``label``
+    the tick label to use instead of the start time.
+    """
+    if resolution == RESOLUTION_SEIZURE:
+        return seizures
+
+    bins: Dict[tuple, Dict[str, Any]] = {}
+    for seizure in seizures:
+        hour = _hour(seizure) if resolution == RESOLUTION_HOUR else None
+        entry = bins.setdefault(
+            (seizure["day"], hour),
+            {"duration": 0, "count": 0, "electrodes": Counter()},
+        )
+        entry["duration"] += int(seizure["duration"])
+        entry["count"] += 1
+        entry["electrodes"].update(seizure.get("electrodes") or [])
+
+    binned = []
+    for (day, hour), entry in sorted(bins.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+        if resolution == RESOLUTION_HOUR:
+            start_time, span, label = f"{hour:02d}:30:00", 1, f"{hour:02d}:00"
+        else:
+            start_time, span, label = "12:00:00", 24, ""
+        binned.append({
+            "day": day,
+            "start_time": start_time,
+            "duration": entry["duration"],
+            "count": entry["count"],
+            "electrodes": [e for e, _ in entry["electrodes"].most_common()],
+            "span_hours": span,
+            "label": label,
+        })
+    return binned
+
+
+def aggregate_for_screen(screen: int, seizures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Seizure records sized for ``make_plot2`` screen ``screen``.
+
+    Every screen gets top-N electrode collapsing; the time-of-day screen (2)
+    is additionally binned at the resolution ``choose_time_resolution`` picks.
+    Day-level screens keep one record per seizure since they stack per day.
+    """
+    seizures = collapse_electrodes(seizures)
+    if screen == 2:
+        seizures = bin_seizures(seizures, choose_time_resolution(seizures))
+    return seizures
@@ -0,0 +1,112 @@
+"""
+Per-patient, per-day seizure aggregates for the day-level graphs.
+
+``patient_day_aggregates`` holds, for every (patient, day), the day's
+duration stack (one ``[duration, electrodes]`` entry per seizure) and how
+often each electrode was an onset electrode. Seizure counts and total
+durations are not duplicated here: ``patient_daily_stats`` (see
+``dailyStats``) is their single source. ``add_seizures_to_aggregates`` folds newly stored seizures in
+within the storing transaction, so ingesting one report only touches the
+days it covers. Graph screens 1 and 3 read these rows
+(``day_aggregate_records``) instead of replaying the seizure history.
+"""
+
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app import db
+from app.models import PatientDayAggregate
+
+aggregates_table = PatientDayAggregate.__table__
+
+
+def add_seizures_to_aggregates(
+    patient_id: int, seizures: Iterable[Tuple[int, int, Sequence[str]]]
+) -> None:
+    """
+    Fold ``(day, duration, electrodes)`` of newly stored seizures into the
+    patient's day aggregates.
+
+    Runs in the caller's session so the aggregates commit (or roll back)
+    with the seizures. Seizures must be given in id order.
+    """
+    by_day: Dict[int, List[Tuple[int, List[str]]]] = defaultdict(list)
+    for day, duration, electrodes in seizures:
+        by_day[day].append((int(duration or 0), list(electrodes)))
+    if not by_day:
+        return
+
+    # Create missing day rows, then lock every touched row so concurrent
+    # ingestions for the same patient merge one after the other. Rows are
+    # inserted and locked in day order so two writers never wait on each
+    # other's rows in opposite orders (deadlock).
+    days = sorted(by_day)
+    db.session.execute(
+        pg_insert(aggregates_table)
+        .values([{"patient_id": patient_id, "day": day} for day in days])
+        .on_conflict_do_nothing(index_elements=["patient_id", "day"])
+    )
+    rows = db.session.execute(
+        select(aggregates_table)
+        .where(
+            aggregates_table.c.patient_id == patient_id,
+            aggregates_table.c.day.in_(days),
+        )
+        .order_by(aggregates_table.c.day)
+        .with_for_update()
+    ).all()
+
+    params = []
+    for row in rows:
+        added = by_day[row.day]
+        electrode_counts = Counter(row.electrode_counts or {})
+        for _, electrodes in added:
+            electrode_counts.update(electrodes)
+        params.append({
+            "b_patient_id": patient_id,
+            "b_day": row.day,
+            "b_stack": list(row.stack or []) + [[d, e] for d, e in added],
+            "b_electrode_counts": dict(electrode_counts),
+        })
+
+    db.session.execute(
+        update(aggregates_table)
+        .where(
+            aggregates_table.c.patient_id == bindparam("b_patient_id"),
+            aggregates_table.c.day == bindparam("b_day"),
+        )
+        .values(
+            stack=bindparam("b_stack", type_=aggregates_table.c.stack.type),
+            electrode_counts=bindparam(
+                "b_electrode_counts", type_=aggregates_table.c.electrode_counts.type
+            ),
+        ),
+        params,
+    )
+
+
+def load_day_aggregates(patient_id: int) -> List[Any]:
+    """The patient's aggregate rows, ordered by day (one indexed query)."""
+    with db.engine.connect() as conn:
+        return conn.execute(
+            select(aggregates_table)
+            .where(aggregates_table.c.patient_id == patient_id)
+            .order_by(aggregates_table.c.day)
+        ).all()
+
+
+def day_aggregate_records(patient_id: int) -> List[Dict[str, Any]]:
+    """
+    Seizure records for the day-level graph screens, from the aggregates.
+
+    Each has the ``day``, ``duration`` and ``electrodes`` ``make_plot2``
+    stacks by; ``start_time`` is not kept per day and is always None.
+    """
+    return [
+        {"day": row.day, "start_time": None, "duration": duration, "electrodes": electrodes}
+        for row in load_day_aggregates(patient_id)
+        for duration, electrodes in row.stack
+    ]
@@ -9,7 +9,14 @@ Original file is located at
 import os
 from PIL import Image
 from datetime import datetime
-from app.models import Patient
+from app.services.create_graphs.aggregation import (
+    MAX_DAY_TICKS,
+    MAX_TIME_TICKS,
+    aggregate_for_screen,
+    tick_stride,
+)
+from app.services.create_graphs.dayAggregates import day_aggregate_records
+from app.services.create_graphs.timeline import load_patient_timeline
 
 # Define the electrode to region mapping (same as before)
 electrode_to_region = {
@@ -265,16 +272,203 @@ eeg_montage_set = {
 # #optional clinical/subclinical
 # #case seizure onset electrodes by seizure
 
-from PIL import Image, ImageDraw
+from PIL import Image
 from datetime import datetime
-import matplotlib.pyplot as plt
+import matplotlib
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch, Rectangle
 from matplotlib.ticker import MaxNLocator
-import matplotlib.patches as mpatches
 from io import BytesIO
 
-# Your data1 and data2 remain unchanged
+# Default text size of every graph. Passed explicitly instead of through
+# rcParams, which are process-global and shared by concurrent renders.
+FONT_SIZE = 12
+
+
+def _new_figure(figsize):
+    """A Figure on its own Agg canvas; nothing is registered with pyplot."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.tick_params(labelsize=FONT_SIZE)
+    return fig, ax
+
+
+def _set_tick_labels(labels, **props):
+    for label in labels:
+        label.set(**props)
+
+
+def _bar_layer(ax, x, bottom, height, width=0.8, **kwargs):
+    """
+    Draw bars centred on ``x`` as one PolyCollection.
+
+    Looks like ``ax.bar`` but adds a single artist however many bars there
+    are, so drawing and layout cost stay flat as seizure counts grow.
+    """
+    x, bottom, height, width = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (x, bottom, height, width))
+    )
+    left = x - width / 2
+    right = left + width
+    top = bottom + height
+    verts = np.stack(
+        [
+            np.column_stack([left, bottom]),
+            np.column_stack([left, top]),
+            np.column_stack([right, top]),
+            np.column_stack([right, bottom]),
+        ],
+        axis=1,
+    )
+    layer = PolyCollection(verts, joinstyle="miter", **kwargs)
+    # Like bars, keep the y axis anchored at zero instead of adding a margin
+    layer.sticky_edges.y.append(0)
+    ax.add_collection(layer)
+    return layer
+
+
+def _draw_stacked_seizures(
+    ax,
+    day_to_seizures,
+    all_days,
+    use_duration,
+    electrode_to_color,
+    bar_color,
+    edge_color,
+):
+    """
+    Stack each day's seizures into one bar per day.
+
+    Seizures are ``duration`` (or one unit) tall. With ``electrode_to_color``
+    each seizure is split into equal segments coloured by onset electrode and
+    outlined; without, it is a plain outlined block. Stacking offsets are
+    computed with a per-day cumulative sum and every layer (plain seizures,
+    electrode segments, outlines) is a single collection.
+    """
+    ordered = [s for day in all_days for s in day_to_seizures[day]]
+    if not ordered:
+        return
+
+    days = np.array([s["day"] for s in ordered], dtype=float)
+    lengths = np.array(
+        [int(s["duration"]) if use_duration else 1 for s in ordered], dtype=float
+    )
+
+    # Bottom of each seizure = lengths of the same day's earlier seizures
+    tops = np.cumsum(lengths)
+    group_start = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    group_size = np.diff(np.r_[group_start, len(days)])
+    bottoms = tops - lengths - np.repeat((tops - lengths)[group_start], group_size)
+
+    if electrode_to_color is None:
+        _bar_layer(
+            ax, days, bottoms, lengths,
+            facecolors=bar_color, edgecolors=edge_color, linewidths=1.5,
+        )
+        ax.autoscale_view()
+        return
+
+    counts = np.array([len(s.get("electrodes") or []) for s in ordered])
+    plain = counts == 0
+    if plain.any():
+        # Default solid color if no electrodes specified
+        _bar_layer(
+            ax, days[plain], bottoms[plain], lengths[plain],
+            facecolors=bar_color, edgecolors="black", linewidths=2,
+        )
+
+    split = ~plain
+    if split.any():
+        owner = np.repeat(np.arange(len(ordered)), counts)
+        rank = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        segment = lengths[owner] / counts[owner]
+        colors = []
+        for s in ordered:
+            for electrode in s.get("electrodes") or []:
+                color = electrode_to_color.get(electrode, bar_color)
+                colors.append(
+                    [c / 255 for c in color]
+                    if isinstance(color, (list, tuple)) and max(color) > 1
+                    else color
+                )
+        _bar_layer(
+            ax, days[owner], bottoms[owner] + rank * segment, segment,
+            facecolors=colors, edgecolors="none", linewidths=0,
+        )
+        # Border around each whole seizure
+        _bar_layer(
+            ax, days[split], bottoms[split], lengths[split],
+            facecolors="none", edgecolors="black", linewidths=4,
+        )
+    ax.autoscale_view()
+
+
+# Distinct onset-electrode sets whose layout is kept, per process
+ELECTRODE_LAYOUT_CACHE_SIZE = 256
+
+ElectrodeLayout = namedtuple(
+    "ElectrodeLayout", ["right", "center", "left", "order", "colors"]
+)
+
+
+@lru_cache(maxsize=ELECTRODE_LAYOUT_CACHE_SIZE)
+def electrode_layout(electrodes):
+    """
+    Side grouping, display order and palette of a frozenset of electrodes.
+
+    Computed once per distinct set and shared by all nine graphs (and the
+    graph-data endpoint). The result is immutable: ``order`` runs right,
+    center, left and ``colors`` holds one 0-255 RGB tuple per ``order`` entry.
+    """
+    sides = sort_electrodes(electrodes)
+    right, center, left = sides["right"], sides["center"], sides["left"]
+
+    # Palette depends on which sides have onset electrodes at all
+    cases = (not center) + 2 * (not right) + 4 * (not left)
+    if cases == 0:
+        colors = get_red_green_blue_groups(len(right), len(center), len(left))
+    elif cases == 1:
+        colors = get_red_blue_groups(len(right), len(left))
+    elif cases == 2:
+        colors = get_red_blue_groups(len(center), len(left))
+    elif cases == 3:
+        colors = get_max_separated_colors(len(left))
+    elif cases == 4:
+        colors = get_red_blue_groups(len(right), len(center))
+    elif cases == 5:
+        colors = get_max_separated_colors(len(right))
+    elif cases == 6:
+        colors = get_max_separated_colors(len(center))
+    else:
+        colors = []  # No onset electrodes at all
+
+    return ElectrodeLayout(
+        right=tuple(right),
+        center=tuple(center),
+        left=tuple(left),
+        order=tuple(right + center + left),
+        colors=tuple(tuple(color) for color in colors),
+    )
+
+
+def electrode_color_map(electrodes):
+    """
+    Order onset electrodes right, center, left and assign each an RGB color.
+
+    Returns ``(sorted_electrodes, electrode_to_color)`` with colors as 0-255
+    lists, freshly copied from the cached ``electrode_layout``.
+    """
+    layout = electrode_layout(frozenset(electrodes))
+    electrode_to_color = {
+        label: list(color) for color, label in zip(layout.colors, layout.order)
+    }
+    return list(layout.order), electrode_to_color
 
 
 def make_plot2(
@@ -288,6 +482,9 @@ def make_plot2(
     """
     Generate a plot based on the specified screen and optional views.
 
+    Draws on a private Figure/Agg canvas and renders straight to memory, so
+    concurrent calls from different threads do not interfere.
+
     Parameters:
     - screen: int, the screen to display (1, 2, or 3)
     - view_seizure_length: int, whether to show seizure length representation (0 or 1)
@@ -298,12 +495,9 @@ def make_plot2(
     - Image.Image, the generated plot as an image
     """
 
-    # Create a blank image
-    img = Image.new("RGB", (800, 600), color="white")
-    draw = ImageDraw.Draw(img)
-
     # Data for seizures and drug administration
-    seizures = seizure_data
+    # Top-N electrodes, and hourly/daily bins on the time-of-day screen
+    seizures = aggregate_for_screen(screen, seizure_data)
 
     # Extract seizure onset electrodes from data1
     seizure_onset_electrodes = set()
@@ -320,75 +514,12 @@ def make_plot2(
     )  # Default to 1 if no seizures
     all_days = range(1, max_day + 1)  # Always start from Day 1
 
-    # Set figure size and font sizes for iPhone 16 screen
-    plt.rcParams.update({"font.size": 12})
+    # Set figure size for iPhone 16 screen
     figsize = (4, 6)  # Adjusted figure size for iPhone 16 screen
 
-    seizure_event = defaultdict()
-    seizure_event["sorted_seizure_onset_electrodes"] = sort_electrodes(
+    sorted_electrodes, electrode_to_color = electrode_color_map(
         seizure_onset_electrodes
     )
-    cases = 0
-    if (len(seizure_event["sorted_seizure_onset_electrodes"]["center"])) == 0:
-        cases = cases + 1
-    if (len(seizure_event["sorted_seizure_onset_electrodes"]["right"])) == 0:
-        cases = cases + 2
-    if (len(seizure_event["sorted_seizure_onset_electrodes"]["left"])) == 0:
-        cases = cases + 4
-
-    if cases == 0:
-        colors = get_red_green_blue_groups(
-            len(seizure_event["sorted_seizure_onset_electrodes"]["right"]),
-            len(seizure_event["sorted_seizure_onset_electrodes"]["center"]),
-            len(seizure_event["sorted_seizure_onset_electrodes"]["left"]),
-        )
-    if cases == 3:
-        colors = get_max_separated_colors(
-            len(seizure_event["sorted_seizure_onset_electrodes"]["left"])
-        )
-
-    if cases == 5:
-        colors = get_max_separated_colors(
-            len(seizure_event["sorted_seizure_onset_electrodes"]["right"])
-        )
-
-    if cases == 6:
-        colors = get_max_separated_colors(
-            len(seizure_event["sorted_seizure_onset_electrodes"]["center"])
-        )
-
-    if cases == 1:
-
-        colors = get_red_blue_groups(
-            len(seizure_event["sorted_seizure_onset_electrodes"]["right"]),
-            len(seizure_event["sorted_seizure_onset_electrodes"]["left"]),
-        )
-
-    if cases == 2:
-        colors = get_max_separated_colors(
-            len(seizure_event["sorted_seizure_onset_electrodes"]["right"])
-        )
-        colors = get_red_blue_groups(
-            len(seizure_event["sorted_seizure_onset_electrodes"]["center"]),
-            len(seizure_event["sorted_seizure_onset_electrodes"]["left"]),
-        )
-    if cases == 4:
-        colors = get_red_blue_groups(
-            len(seizure_event["sorted_seizure_onset_electrodes"]["right"]),
-            len(seizure_event["sorted_seizure_onset_electrodes"]["center"]),
-        )
-
-    sorted_electrodes = (
-        [e for e in seizure_event["sorted_seizure_onset_electrodes"]["right"]]
-        + [
-            e
-            for e in seizure_event["sorted_seizure_onset_electrodes"]["center"]
-        ]
-        + [e for e in seizure_event["sorted_seizure_onset_electrodes"]["left"]]
-    )
-
-    color_electrode_map = list(zip(colors, sorted_electrodes))
-    electrode_to_color = {label: color for color, label in color_electrode_map}
     if screen == 1:
         # Group seizures by day
         day_to_seizures = defaultdict(list)
@@ -396,281 +527,80 @@ def make_plot2(
             day_to_seizures[seizure["day"]].append(seizure)
 
         # Create a stacked bar plot
-        fig = plt.figure(figsize=figsize)
-        bottoms = [0] * len(all_days)  # Initialize bottoms for stacking
+        fig, ax = _new_figure(figsize)
         bar_color = "skyblue"  # Set a uniform color for the bars
         edge_color = "black"  # Set the color of the outline
 
         if view_seizure_length == 0 and view_soz_heatmap == 0:
             seizure_counts = [len(day_to_seizures[day]) for day in all_days]
-            plt.bar(
+            ax.bar(
                 all_days,
                 seizure_counts,
                 color="skyblue",
                 label="Number of Seizures",
             )
-            plt.xlabel("Day", fontsize=14)
-            plt.ylabel("Number of Seizures", fontsize=14)
-            plt.title("Seizure Count by Day", fontsize=12)
-            plt.xticks(all_days, fontsize=12)
-            plt.yticks(fontsize=12)
-            plt.gca().yaxis.set_major_locator(
+            ax.set_xlabel("Day", fontsize=14)
+            ax.set_ylabel("Number of Seizures", fontsize=14)
+            ax.set_title("Seizure Count by Day", fontsize=12)
+            ax.set_xticks(all_days[::tick_stride(len(all_days), MAX_DAY_TICKS)])
+            ax.yaxis.set_major_locator(
                 MaxNLocator(integer=True)
             )  # Ensure y-ticks are integers
-            plt.tight_layout()
-            plt.savefig("plot.png")  # Saves as PNG
-            plt.close()
+            fig.tight_layout()
 
         if view_seizure_length == 1 and view_soz_heatmap == 0:
-            for i, day in enumerate(all_days):
-                lengths = [s["duration"] for s in day_to_seizures[day]]
-                for j, length in enumerate(lengths):
-                    plt.bar(
-                        day,
-                        length,
-                        bottom=bottoms[i],
-                        label=f"Seizure {j+1}" if i == 0 else "",
-                        color=bar_color,
-                        edgecolor=edge_color,
-                        linewidth=1.5,
-                    )
-                    bottoms[
-                        i
-                    ] += length  # Update the bottom for the next seizure
-
-            plt.xlabel("Day", fontsize=14)
-            plt.ylabel("Seizure Length (seconds)", fontsize=14)
-            plt.title("Seizure Count and Lengths by Day", fontsize=12)
-            plt.xticks(all_days, fontsize=12)
-            plt.yticks(fontsize=12)
-            plt.tight_layout()
-
-            plt.close()
-
-        elif view_seizure_length == 0 and view_soz_heatmap == 1:
-            fig, ax = plt.subplots(figsize=figsize)
-            # Seizure count plot
-            seizure_counts = [len(day_to_seizures[day]) for day in all_days]
-            bars = ax.bar(
+            _draw_stacked_seizures(
+                ax,
+                day_to_seizures,
                 all_days,
-                seizure_counts,
-                color="lightgray",
-                edgecolor="black",
-                label="Number of Seizures",
+                use_duration=True,
+                electrode_to_color=None,
+                bar_color=bar_color,
+                edge_color=edge_color,
             )
-            bar_width = 0.6  # Full width for day bin
-
-            # Add some spacing between seizures
-            seizure_spacing = 0  # Space between seizures in days
-
-            for i, day in enumerate(all_days):
-                seizures = day_to_seizures[day]
-                lengths = [1 for s in seizures]
-
-                for j, (seizure, length) in enumerate(zip(seizures, lengths)):
-                    involved_electrodes = seizure.get(
-                        "electrodes", []
-                    )
-
-                    # Calculate position with spacing
-                    x_pos = day + (j * seizure_spacing / len(seizures))
-                    bar_width = 0.8 - (
-                        seizure_spacing * (len(seizures) - 1) / len(seizures)
-                    )
-
-                    if not involved_electrodes:
-                        # Default solid color if no electrodes specified
-                        plt.bar(
-                            x_pos,
-                            length,
-                            bottom=bottoms[i],
-                            width=bar_width,
-                            label=f"Seizure {j+1}" if i == 0 else "",
-                            color=bar_color,
-                            edgecolor="black",
-                            linewidth=2,
-                        )
-                    else:
-                        # Stack electrode colors horizontally
-                        total_electrodes = len(involved_electrodes)
-                        cumulative_length = 0
 
-                        for k, electrode in enumerate(involved_electrodes):
-                            # Get normalized color for this electrode
-                            color = electrode_to_color.get(
-                                electrode, bar_color
-                            )
-                            color = (
-                                [c / 255 for c in color]
-                                if isinstance(color, (list, tuple))
-                                and max(color) > 1
-                                else color
-                            )
-
-                            # Calculate this segment's contribution to total length
-                            segment_length = length / total_electrodes
-
-                            # Plot this segment (stacked horizontally)
-                            plt.bar(
-                                x_pos,
-                                segment_length,
-                                bottom=bottoms[i] + cumulative_length,
-                                width=bar_width,
-                                label=(
-                                    f"{electrode}"
-                                    if (i == 0 and j == 0 and k == 0)
-                                    else ""
-                                ),
-                                color=color,
-                                edgecolor="none",  # No internal edges
-                                linewidth=0,
-                            )
-
-                            cumulative_length += segment_length
-
-                        # Add border around the entire seizure
-                        plt.bar(
-                            x_pos,
-                            length,
-                            bottom=bottoms[i],
-                            width=bar_width,
-                            color="none",
-                            edgecolor="black",
-                            linewidth=4,
-                        )
-
-                    bottoms[i] += length  # Add small spacing between seizures
-
-            plt.xlabel("Day", fontsize=14)
-            plt.ylabel("Seizure Length (seconds)", fontsize=14)
-            plt.title("Seizure Lengths by Day", fontsize=12)
-            plt.xticks(all_days, fontsize=12)
-            plt.yticks(fontsize=12)
-            plt.gca().yaxis.set_major_locator(
-                MaxNLocator(integer=True)
-            )  # Ensure y-ticks are integers
-
-            # Create legend showing electrode-color mapping
-            handles = [
-                plt.Rectangle(
-                    (0, 0),
-                    1,
-                    1,
-                    color=(
-                        [c / 255 for c in electrode_to_color[elec]]
-                        if max(electrode_to_color[elec]) > 1
-                        else electrode_to_color[elec]
-                    ),
-                    label=elec,
+            ax.set_xlabel("Day", fontsize=14)
+            ax.set_ylabel("Seizure Length (seconds)", fontsize=14)
+            ax.set_title("Seizure Count and Lengths by Day", fontsize=12)
+            ax.set_xticks(all_days[::tick_stride(len(all_days), MAX_DAY_TICKS)])
+            fig.tight_layout()
+
+        elif view_soz_heatmap == 1:
+            if view_seizure_length == 0:
+                # Seizure count plot
+                seizure_counts = [len(day_to_seizures[day]) for day in all_days]
+                ax.bar(
+                    all_days,
+                    seizure_counts,
+                    color="lightgray",
+                    edgecolor="black",
+                    label="Number of Seizures",
                 )
-                for elec in sorted_electrodes
-            ]
-            plt.legend(
-                handles=handles, bbox_to_anchor=(1.05, 1), loc="upper left"
-            )
-
-            plt.tight_layout()
-            plt.close()
-
-        elif view_seizure_length == 1 and view_soz_heatmap == 1:
-
-            color_electrode_map = list(zip(colors, sorted_electrodes))
-
-            electrode_to_color = {
-                label: color for color, label in color_electrode_map
-            }
-            bar_width = 0.6  # Full width for day bin
-
-            # Add some spacing between seizures
-            seizure_spacing = 0  # Space between seizures in days
-
-            for i, day in enumerate(all_days):
-                seizures = day_to_seizures[day]
-                lengths = [s["duration"] for s in seizures]
-
-                for j, (seizure, length) in enumerate(zip(seizures, lengths)):
-                    involved_electrodes = seizure.get(
-                        "electrodes", []
-                    )
-
-                    # Calculate position with spacing
-                    x_pos = day + (j * seizure_spacing / len(seizures))
-                    bar_width = 0.8 - (
-                        seizure_spacing * (len(seizures) - 1) / len(seizures)
-                    )
-
-                    if not involved_electrodes:
-                        # Default solid color if no electrodes specified
-                        plt.bar(
-                            x_pos,
-                            length,
-                            bottom=bottoms[i],
-                            width=bar_width,
-                            label=f"Seizure {j+1}" if i == 0 else "",
-                            color=bar_color,
-                            edgecolor="black",
-                            linewidth=2,
-                        )
-                    else:
-                        # Stack electrode colors horizontally
-                        total_electrodes = len(involved_electrodes)
-                        cumulative_length = 0
-
-                        for k, electrode in enumerate(involved_electrodes):
-                            # Get normalized color for this electrode
-                            color = electrode_to_color.get(
-                                electrode, bar_color
-                            )
-                            color = (
-                                [c / 255 for c in color]
-                                if isinstance(color, (list, tuple))
-                                and max(color) > 1
-                                else color
-                            )
 
-                            # Calculate this segment's contribution to total length
-                            segment_length = length / total_electrodes
-
-                            # Plot this segment (stacked horizontally)
-                            plt.bar(
-                                x_pos,
-                                segment_length,
-                                bottom=bottoms[i] + cumulative_length,
-                                width=bar_width,
-                                label=(
-                                    f"{electrode}"
-                                    if (i == 0 and j == 0 and k == 0)
-                                    else ""
-                                ),
-                                color=color,
-                                edgecolor="none",  # No internal edges
-                                linewidth=0,
-                            )
-
-                            cumulative_length += segment_length
-
-                        # Add border around the entire seizure
-                        plt.bar(
-                            x_pos,
-                            length,
-                            bottom=bottoms[i],
-                            width=bar_width,
-                            color="none",
-                            edgecolor="black",
-                            linewidth=4,
-                        )
-
-                    bottoms[i] += length  # Add small spacing between seizures
+            # Each seizure is one unit tall (count view) or its duration
+            # tall, split into one segment per onset electrode
+            _draw_stacked_seizures(
+                ax,
+                day_to_seizures,
+                all_days,
+                use_duration=view_seizure_length == 1,
+                electrode_to_color=electrode_to_color,
+                bar_color=bar_color,
+                edge_color=edge_color,
+            )
 
-            plt.xlabel("Day", fontsize=14)
-            plt.ylabel("Seizure Length (seconds)", fontsize=14)
-            plt.title("Seizure Lengths by Day", fontsize=12)
-            plt.xticks(all_days, fontsize=12)
-            plt.yticks(fontsize=12)
+            ax.set_xlabel("Day", fontsize=14)
+            ax.set_ylabel("Seizure Length (seconds)", fontsize=14)
+            ax.set_title("Seizure Lengths by Day", fontsize=12)
+            ax.set_xticks(all_days[::tick_stride(len(all_days), MAX_DAY_TICKS)])
+            if view_seizure_length == 0:
+                ax.yaxis.set_major_locator(
+                    MaxNLocator(integer=True)
+                )  # Ensure y-ticks are integers
 
             # Create legend showing electrode-color mapping
             handles = [
-                plt.Rectangle(
+                Rectangle(
                     (0, 0),
                     1,
                     1,
@@ -683,12 +613,15 @@ def make_plot2(
                 )
                 for elec in sorted_electrodes
             ]
-            plt.legend(
-                handles=handles, bbox_to_anchor=(1.05, 1), loc="upper left"
+            ax.legend(
+                handles=handles,
+                bbox_to_anchor=(1.05, 1),
+                loc="upper left",
+                fontsize=FONT_SIZE,
+                title_fontsize=FONT_SIZE,
             )
 
-            plt.tight_layout()
-            plt.close()
+            fig.tight_layout()
 
     if screen == 2:
         # Group seizures by day
@@ -700,12 +633,15 @@ def make_plot2(
         for seizure in seizures:
             day_to_seizures[seizure["day"]].append(seizure)
 
-        fig = plt.figure(figsize=figsize)
+        fig, ax = _new_figure(figsize)
 
         # Normalize time to a 24-hour timeline for each day
         xticks = []  # X-axis tick positions
         xtick_labels = []  # X-axis tick labels
         label_positions = []  # To store the positions of the labels
+        # Bars are collected here and drawn as one layer each below
+        plain_bars = []  # (x, duration, width) of seizures without electrodes
+        segments = []  # (x, bottom, height, width, color) per onset electrode
 
         for day in all_days:
             day_seizures = day_to_seizures[day]
@@ -723,7 +659,7 @@ def make_plot2(
                 # Add seizure time to x-axis ticks and labels
                 xticks.append(x_value)
                 xtick_labels.append(
-                    seizure_time.strftime("%H:%M")
+                    seizure.get("label", seizure_time.strftime("%H:%M"))
                 )  # Only show time, not day
                 label_positions.append(x_value)
                 seizure_spacing = 0
@@ -736,21 +672,14 @@ def make_plot2(
 
                 # Calculate position with spacing
                 # x_pos = day + (j * seizure_spacing / len(seizures))
-                bar_width = 0.8 - (
+                bar_width = 0.8 * seizure.get("span_hours", 1) - (
                     seizure_spacing * (len(seizures) - 1) / len(seizures)
                 )
 
                 if not involved_electrodes:
                     # Default solid color if no electrodes specified
-                    plt.bar(
-                        x_value,
-                        int(seizure["duration"]),
-                        bottom=bottoms[i],
-                        width=bar_width,
-                        label=f"Seizure {i+1}" if i == 0 else "",
-                        color=bar_color,
-                        edgecolor="black",
-                        linewidth=2,
+                    plain_bars.append(
+                        (x_value, int(seizure["duration"]), bar_width)
                     )
                 else:
                     # Stack electrode colors horizontally
@@ -776,19 +705,9 @@ def make_plot2(
                         segment_length = (
                             int(seizure["duration"]) / total_electrodes
                         )
-                        bottoms = 0
                         # Plot this segment (stacked horizontally)
-                        plt.bar(
-                            x_value,
-                            segment_length,
-                            bottom=0 + cumulative_length,
-                            width=bar_width,
-                            label=(
-                                f"{electrode}" if (i == 0 and k == 0) else ""
-                            ),
-                            color=color,
-                            edgecolor="none",  # No internal edges
-                            linewidth=0,
+                        segments.append(
+                            (x_value, cumulative_length, segment_length, bar_width, color)
                         )
 
                         cumulative_length += segment_length
@@ -810,34 +729,50 @@ def make_plot2(
                 #                 edgecolor='black',
                 #                 linewidth=4)
                 # """
-                if view_soz_heatmap == 1:
-                    legend_patches = [
-                        plt.Rectangle(
-                            (0, 0),
-                            1,
-                            1,
-                            color=(
-                                [c / 255 for c in electrode_to_color[elec]]
-                                if max(electrode_to_color[elec]) > 1
-                                else electrode_to_color[elec]
-                            ),
-                            label=elec,
-                        )
-                        for elec in sorted_electrodes
-                    ]
-                    plt.legend(
-                        handles=legend_patches,
-                        title="Electrodes",
-                        loc="upper left",  # Position legend at the upper left
-                        bbox_to_anchor=(
-                            0,
-                            1.55,
-                        ),  # Shift the legend to the left of the graph
-                        fontsize=6,
-                        ncol=len(legend_patches),
-                    )
                 # bottoms[i] += length  # Add small spacing between seizures
 
+        if plain_bars:
+            x, height, width = zip(*plain_bars)
+            _bar_layer(
+                ax, x, 0, height, width,
+                facecolors=bar_color, edgecolors="black", linewidths=2,
+            )
+        if segments:
+            x, bottom, height, width, colors = zip(*segments)
+            _bar_layer(
+                ax, x, bottom, height, width,
+                facecolors=list(colors), edgecolors="none", linewidths=0,
+            )
+        ax.autoscale_view()
+
+        if view_soz_heatmap == 1 and seizures:
+            legend_patches = [
+                Rectangle(
+                    (0, 0),
+                    1,
+                    1,
+                    color=(
+                        [c / 255 for c in electrode_to_color[elec]]
+                        if max(electrode_to_color[elec]) > 1
+                        else electrode_to_color[elec]
+                    ),
+                    label=elec,
+                )
+                for elec in sorted_electrodes
+            ]
+            ax.legend(
+                handles=legend_patches,
+                title="Electrodes",
+                title_fontsize=FONT_SIZE,
+                loc="upper left",  # Position legend at the upper left
+                bbox_to_anchor=(
+                    0,
+                    1.55,
+                ),  # Shift the legend to the left of the graph
+                fontsize=6,
+                ncol=len(legend_patches),
+            )
+
         # Adjust x-axis labels to prevent overlap
         adjusted_xticks = []
         adjusted_xtick_labels = []
@@ -854,28 +789,30 @@ def make_plot2(
             adjusted_xtick_labels.append(label)
 
         # Set x-axis ticks and labels (only non-overlapping labels)
-        plt.xticks(
-            adjusted_xticks,
-            adjusted_xtick_labels,
-            rotation=45,
-            ha="right",
-            fontsize=8,
-        )
-        plt.xlabel("Time", fontsize=8)
-        plt.ylabel("Seizure Duration (seconds)", fontsize=14)
+        stride = tick_stride(len(adjusted_xticks), MAX_TIME_TICKS)
+        ax.set_xticks(adjusted_xticks[::stride], adjusted_xtick_labels[::stride])
+        _set_tick_labels(ax.get_xticklabels(), rotation=45, ha="right", fontsize=8)
+        ax.set_xlabel("Time", fontsize=8)
+        if any("span_hours" in seizure for seizure in seizures):
+            ax.set_ylabel("Total Seizure Duration (seconds)", fontsize=14)
+        else:
+            ax.set_ylabel("Seizure Duration (seconds)", fontsize=14)
         if view_drug_admin == 0:
-            plt.title("Seizure Durations by Time and Day", fontsize=8)
+            ax.set_title("Seizure Durations by Time and Day", fontsize=8)
 
-        plt.grid(axis="y", linestyle="--", alpha=0.7)
+        ax.grid(axis="y", linestyle="--", alpha=0.7)
+        day_stride = tick_stride(len(all_days), MAX_DAY_TICKS)
         for day in all_days:
             day_start = (day - 1) * 24
-            plt.axvline(
+            ax.axvline(
                 x=day_start, color="black", linestyle="--", linewidth=1
             )
+            if (day - 1) % day_stride:
+                continue
             # Add day label at the start of each day
-            plt.text(
+            ax.text(
                 day_start,
-                plt.ylim()[1] * 0.95,
+                ax.get_ylim()[1] * 0.95,
                 f"Day {day}",
                 color="black",
                 ha="right",
@@ -886,10 +823,10 @@ def make_plot2(
 
         # Add a vertical dashed line to mark the end of the last day
         last_day_end = max_day * 24
-        plt.axvline(x=last_day_end, color="black", linestyle="--", linewidth=1)
-        plt.text(
+        ax.axvline(x=last_day_end, color="black", linestyle="--", linewidth=1)
+        ax.text(
             last_day_end,
-            plt.ylim()[1] * 0.95,
+            ax.get_ylim()[1] * 0.95,
             "End",
             color="black",
             ha="left",
@@ -902,13 +839,12 @@ def make_plot2(
             max_m = max(drugs, key=lambda x: int(x["dosage"]))
             max_mg = int(max_m["dosage"])
             # Plot drug administration on a secondary y-axis
-            ax2 = plt.twinx()  # Create a secondary y-axis
+            ax2 = ax.twinx()  # Create a secondary y-axis
+            ax2.tick_params(labelsize=FONT_SIZE)
             unique_drugs = list(
                 set(drug["drug_name"] for drug in drugs)
             )  # Get unique drug names
-            color_map = plt.colormaps.get_cmap(
-                "tab10"
-            )  # Use the recommended method to get a colormap
+            color_map = matplotlib.colormaps["tab10"]
 
             # Group drugs by time to handle overlapping annotations
             time_to_drugs = []
@@ -1010,7 +946,7 @@ def make_plot2(
 
             ax2.set_ylabel("Drug Dosage (mg)", fontsize=14)
             ax2.set_ylim(0, max_drug + 200)
-            plt.title(
+            ax2.set_title(
                 "Seizure Durations and Drug Administration by Time and Day",
                 fontsize=9,
             )
@@ -1019,7 +955,7 @@ def make_plot2(
                 drug_index = unique_drugs.index(drug)
 
                 legend_patches.append(
-                    mpatches.Patch(
+                    Patch(
                         color=color_map(drug_index / len(unique_drugs)),
                         label=drug,
                     )
@@ -1027,9 +963,10 @@ def make_plot2(
 
                 # Add custom legend
 
-            plt.legend(
+            ax2.legend(
                 handles=legend_patches,
                 title="Drugs",
+                title_fontsize=FONT_SIZE,
                 loc="upper left",  # Position legend at the upper left
                 bbox_to_anchor=(
                     0,
@@ -1039,9 +976,7 @@ def make_plot2(
                 ncol=len(unique_drugs),
             )
 
-        plt.tight_layout()
-
-        plt.close()
+        fig.tight_layout()
 
     if screen == 3:
         # Screen 3: Seizure onset electrodes by seizure
@@ -1064,7 +999,7 @@ def make_plot2(
 
         # Create the bar graph
         # Create the bar graph with electrode-specific colors
-        fig = plt.figure(figsize=figsize)
+        fig, ax = _new_figure(figsize)
 
         # Get colors for each electrode in order
         bar_colors = [
@@ -1080,7 +1015,7 @@ def make_plot2(
                 normalized_colors.append(color)
 
         # Plot with electrode-specific colors
-        bars = plt.bar(
+        bars = ax.bar(
             electrode_names,
             seizure_counts,
             color=normalized_colors,
@@ -1091,21 +1026,18 @@ def make_plot2(
         for bar in bars:
             bar.set_linewidth(1)
 
-        plt.xlabel("Electrodes", fontsize=14)
-        plt.ylabel("Number of Seizures", fontsize=14)
-        plt.title(
+        ax.set_xlabel("Electrodes", fontsize=14)
+        ax.set_ylabel("Number of Seizures", fontsize=14)
+        ax.set_title(
             "Number of Seizures per Seizure Onset Electrode", fontsize=10
         )
-        plt.xticks(rotation=45, ha="right", fontsize=12)
-        plt.yticks(fontsize=12)
-        plt.grid(axis="y", linestyle="--", alpha=0.7)
-        plt.gca().yaxis.set_major_locator(MaxNLocator(integer=True))
+        _set_tick_labels(ax.get_xticklabels(), rotation=45, ha="right")
+        ax.grid(axis="y", linestyle="--", alpha=0.7)
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
 
-        plt.close()
     buf = BytesIO()
     fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
     buf.seek(0)
-    plt.close(fig)
     return Image.open(buf)
 
 
@@ -1144,28 +1076,32 @@ def get_colors_for_case(cases, right_count, center_count, left_count):
 
 import numpy as np
 import colorsys
-import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 
 
+@lru_cache(maxsize=4096)
+def classify_electrode(electrode):
+    """``(side, region)`` of an electrode name such as ``"RAH3"``."""
+    # Remove any trailing numbers to get the base electrode name
+    base_name = "".join([c for c in electrode if not c.isdigit()])
+
+    if base_name.startswith("L"):
+        side = "left"
+    elif base_name.startswith("R"):
+        side = "right"
+    else:
+        side = "center"
+
+    # Get the region for this electrode
+    return side, electrode_to_region.get(base_name, "Unknown")
+
+
 def sort_electrodes(electrodes):
     # First categorize electrodes into left, right, center
     categorized = {"left": [], "right": [], "center": []}
 
     for electrode in electrodes:
-        # Remove any trailing numbers to get the base electrode name
-        base_name = "".join([c for c in electrode if not c.isdigit()])
-
-        if base_name.startswith("L"):
-            side = "left"
-        elif base_name.startswith("R"):
-            side = "right"
-        else:
-            side = "center"
-
-        # Get the region for this electrode
-        region = electrode_to_region.get(base_name, "Unknown")
-
+        side, region = classify_electrode(electrode)
         categorized[side].append((electrode, region))
 
     # Sort each side's electrodes by region, then by electrode name
@@ -1185,31 +1121,47 @@ def sort_electrodes(electrodes):
 # Process each seizure event in data1
 
 
+def _hls_palette(hues, L, C):
+    """
+    ``[int(x * 255) for x in colorsys.hls_to_rgb(hue / 360, L / 100, C / 100)]``
+    for all ``hues`` at once.
+
+    Follows ``colorsys`` operation for operation, so the colors are identical.
+    """
+    h = np.asarray(hues, dtype=float) / 360
+    l, s = L / 100, C / 100
+    if s == 0.0:
+        rgb = np.full((len(h), 3), l)
+    else:
+        m2 = l * (1.0 + s) if l <= 0.5 else l + s - (l * s)
+        m1 = 2.0 * l - m2
+        channels = []
+        for hue in ((h + colorsys.ONE_THIRD) % 1.0, h % 1.0, (h - colorsys.ONE_THIRD) % 1.0):
+            channels.append(
+                np.select(
+                    [hue < colorsys.ONE_SIXTH, hue < 0.5, hue < colorsys.TWO_THIRD],
+                    [
+                        m1 + (m2 - m1) * hue * 6.0,
+                        m2,
+                        m1 + (m2 - m1) * (colorsys.TWO_THIRD - hue) * 6.0,
+                    ],
+                    m1,
+                )
+            )
+        rgb = np.stack(channels, axis=1)
+    return (rgb * 255).astype(int).tolist()
+
+
 def get_max_separated_colors(n, L=70, C=50):
     """Generate n maximally separated colors (no groups)."""
-    hues = np.linspace(0, 360, n, endpoint=False)
-    return [
-        [
-            int(x * 255)
-            for x in colorsys.hls_to_rgb(hue / 360, L / 100, C / 100)
-        ]
-        for hue in hues
-    ]
+    return _hls_palette(np.linspace(0, 360, n, endpoint=False), L, C)
 
 
 def get_red_blue_groups(n_red, n_blue, L=70, C=50):
     """Generate colors with custom counts for reddish (0°-60°) and bluish (200°-300°)."""
     hues_red = np.linspace(0, 60, n_red, endpoint=False)
     hues_blue = np.linspace(200, 300, n_blue, endpoint=False)
-
-    colors = []
-    for hue in hues_red:
-        rgb = colorsys.hls_to_rgb(hue / 360, L / 100, C / 100)
-        colors.append([int(x * 255) for x in rgb])
-    for hue in hues_blue:
-        rgb = colorsys.hls_to_rgb(hue / 360, L / 100, C / 100)
-        colors.append([int(x * 255) for x in rgb])
-    return colors
+    return _hls_palette(np.concatenate([hues_red, hues_blue]), L, C)
 
 
 def get_red_green_blue_groups(n_red, n_green, n_blue, L=70, C=50):
@@ -1217,23 +1169,12 @@ def get_red_green_blue_groups(n_red, n_green, n_blue, L=70, C=50):
     hues_red = np.linspace(0, 60, n_red, endpoint=False)
     hues_green = np.linspace(90, 180, n_green, endpoint=False)
     hues_blue = np.linspace(200, 300, n_blue, endpoint=False)
-
-    colors = []
-    for hue in hues_red:
-        rgb = colorsys.hls_to_rgb(hue / 360, L / 100, C / 100)
-        colors.append([int(x * 255) for x in rgb])
-    for hue in hues_green:
-        rgb = colorsys.hls_to_rgb(hue / 360, L / 100, C / 100)
-        colors.append([int(x * 255) for x in rgb])
-    for hue in hues_blue:
-        rgb = colorsys.hls_to_rgb(hue / 360, L / 100, C / 100)
-        colors.append([int(x * 255) for x in rgb])
-    return colors
+    return _hls_palette(np.concatenate([hues_red, hues_green, hues_blue]), L, C)
 
 
 def plot_colors(colors, title):
-    """Display colors with HEX codes."""
-    fig, ax = plt.subplots(figsize=(10, 2))
+    """Swatches of colors with HEX codes, as an image."""
+    fig, ax = _new_figure((10, 2))
     for i, color in enumerate(colors):
         ax.add_patch(Rectangle((i, 0), 1, 1, color=np.array(color) / 255))
         hex_color = "#%02x%02x%02x" % tuple(color)
@@ -1248,203 +1189,80 @@ def plot_colors(colors, title):
     ax.set_xlim(0, len(colors))
     ax.set_ylim(0, 1)
     ax.axis("off")
-    plt.title(title)
-    plt.show()
+    ax.set_title(title)
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    buf.seek(0)
+    return Image.open(buf)
 
 
-import matplotlib.pyplot as plt
 import numpy as np
 from collections import defaultdict
 from flask import current_app
 
-def fetch_graph_data(patient_id):
-    patient = Patient.query.get(patient_id)
-    if not patient:
-        return [], []
-
-    # Import psycopg2 for direct database access
-    import psycopg2
-    import psycopg2.extras
-    
-    # Get database connection parameters from the environment
-    host = "db"  # Container name from docker-compose
-    port = 5432  # Default PostgreSQL port
-    user = "postgres"
-    password = "password"
-    database = "neuroclinaical"
-
-    # Create direct connection to PostgreSQL
-    conn = psycopg2.connect(
-        host=host, port=port, user=user, password=password, database=database
-    )
-    cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-    # Get drug administrations with drug information - removed the time column
-    cursor.execute(
-        """
-        SELECT
-            da.id, 
-            da.drug_name,
-            da.day, 
-            da.dosage,
-            da.time
-        FROM 
-            drug_administration da
-        ORDER BY 
-            da.day ASC
-    """,
-        (patient_id,),
-    )
+def fetch_graph_data(patient_id, screen=2):
+    """
+    Seizure and drug records for ``make_plot2`` screen ``screen``.
 
-    # Fetch all results
-    drugs = cursor.fetchall()
-
-    # Convert to list of dictionaries for JSON response
-    result = []
-    for drug in drugs:
-        """"
-        drug_data = {
-            "id": drug["id"],
-            "name": drug["drug_name"],
-            "day": drug["day"],
-            "mg_administered": drug["dosage"],
-            "time": drug["time"],
-        }
-        """
-        result.append(drug)
-
-    # Close the database connection
-    cursor.close()
-    conn.close()
-
-    data = []
-    for seizure in patient.seizures:
-        seizure_data = {
-            "id": seizure.id,
-            "day": seizure.day,
-            "start_time": (
-                seizure.start_time.strftime("%H:%M:%S")
-                if seizure.start_time
-                else None
-            ),
-            "duration": seizure.duration,  # Already in ISO 8601 format
-            "electrodes": [electrode.name for electrode in seizure.electrodes],
-        }
-        data.append(seizure_data)
-    return data, result
+    The day-level screens (1 and 3) only use each seizure's day, duration and
+    electrodes, read from the per-day aggregates in one query; the
+    time-of-day screen loads the full timeline (three queries).
+    """
+    if screen != 2:
+        return day_aggregate_records(patient_id), []
+    timeline = load_patient_timeline(patient_id)
+    return timeline.seizure_records(), timeline.drug_records()
+
+
+# make_plot2 options of each dashboard graph, by graph number
+GRAPH_VIEWS = [
+    dict(screen=1, view_seizure_length=0, view_drug_admin=1, view_soz_heatmap=0),
+    dict(screen=1, view_seizure_length=1, view_drug_admin=1, view_soz_heatmap=0),
+    dict(screen=1, view_seizure_length=0, view_drug_admin=1, view_soz_heatmap=1),
+    dict(screen=1, view_seizure_length=1, view_drug_admin=1, view_soz_heatmap=1),
+    dict(screen=2, view_seizure_length=0, view_drug_admin=0, view_soz_heatmap=0),
+    dict(screen=2, view_seizure_length=0, view_drug_admin=1, view_soz_heatmap=0),
+    dict(screen=2, view_seizure_length=0, view_drug_admin=0, view_soz_heatmap=1),
+    dict(screen=2, view_seizure_length=0, view_drug_admin=1, view_soz_heatmap=1),
+    dict(screen=3, view_seizure_length=0, view_drug_admin=1, view_soz_heatmap=1),
+]
+GRAPH_COUNT = len(GRAPH_VIEWS)
+
+
+def has_graph_data(view, data1, data2):
+    """Whether there is enough data to draw ``view``."""
+    if not data1:
+        return False
+    # The time-of-day drug views plot the administrations themselves
+    return bool(data2) or not (view["screen"] == 2 and view["view_drug_admin"])
 
 
 def get_graphs(patient_id, graph_number):
-    # REPLACE WITH PATIENT DATA !!!!!!
-    data1, data2 = fetch_graph_data(patient_id)
+    if not 0 <= graph_number < GRAPH_COUNT:
+        raise ValueError(f"Graph number must be 0-{GRAPH_COUNT - 1}")
+    data1, data2 = fetch_graph_data(patient_id, GRAPH_VIEWS[graph_number]["screen"])
+    return render_graph(graph_number, data1, data2)
 
-    if not data1:
-        image_path = os.path.join(os.path.dirname(__file__), "insufficientdata.png")
-        image = Image.open(image_path)
-        return image
-    
-
-    match graph_number:
-        case 0:
-            img = make_plot2(
-                screen=1,
-                view_seizure_length=0,
-                view_drug_admin=1,
-                view_soz_heatmap=0,
-                seizure_data=data1,
-                drug_data=data2,
-            )
-        case 1:
-            img = make_plot2(
-                screen=1,
-                view_seizure_length=1,
-                view_drug_admin=1,
-                view_soz_heatmap=0,
-                seizure_data=data1,
-                drug_data=data2,
-            )
 
-        case 2:
-            img = make_plot2(
-                screen=1,
-                view_seizure_length=0,
-                view_drug_admin=1,
-                view_soz_heatmap=1,
-                seizure_data=data1,
-                drug_data=data2,
-            )
-
-        case 3:
-            img = make_plot2(
-                screen=1,
-                view_seizure_length=1,
-                view_drug_admin=1,
-                view_soz_heatmap=1,
-                seizure_data=data1,
-                drug_data=data2,
-            )
+def render_graph(graph_number, data1, data2):
+    """
+    Render dashboard graph ``graph_number`` from already loaded records.
 
-        case 4:
-            img = make_plot2(
-                screen=2,
-                view_seizure_length=0,
-                view_drug_admin=0,
-                view_soz_heatmap=0,
-                seizure_data=data1,
-                drug_data=data2,
-            ).rotate(270, expand=True)
-
-        case 5:
-            if not data2:
-                image_path = os.path.join(os.path.dirname(__file__), "insufficientdata.png")
-                image = Image.open(image_path)
-                return image
-            img = make_plot2(
-                screen=2,
-                view_seizure_length=0,
-                view_drug_admin=1,
-                view_soz_heatmap=0,
-                seizure_data=data1,
-                drug_data=data2,
-            ).rotate(270, expand=True)
-
-        case 6:
-            img = make_plot2(
-                screen=2,
-                view_seizure_length=0,
-                view_drug_admin=0,
-                view_soz_heatmap=1,
-                seizure_data=data1,
-                drug_data=data2,
-            ).rotate(270, expand=True)
-
-        case 7:
-            if not data2:
-                image_path = os.path.join(os.path.dirname(__file__), "insufficientdata.png")
-                image = Image.open(image_path)
-                return image
-            img = make_plot2(
-                screen=2,
-                view_seizure_length=0,
-                view_drug_admin=1,
-                view_soz_heatmap=1,
-                seizure_data=data1,
-                drug_data=data2,
-            ).rotate(270, expand=True)
-
-        case 8:
-            img = make_plot2(
-                screen=3,
-                view_seizure_length=0,
-                view_drug_admin=1,
-                view_soz_heatmap=1,
-                seizure_data=data1,
-                drug_data=data2,
-            )
+    Touches neither the database nor the app context, so it can run in a
+    worker process (see ``graphRenderer``).
+    """
+    if not 0 <= graph_number < GRAPH_COUNT:
+        raise ValueError(f"Graph number must be 0-{GRAPH_COUNT - 1}")
+    view = GRAPH_VIEWS[graph_number]
 
-        case _:
-            raise ValueError
+    if not has_graph_data(view, data1, data2):
+        image_path = os.path.join(os.path.dirname(__file__), "insufficientdata.png")
+        image = Image.open(image_path)
+        return image
 
+    img = make_plot2(**view, seizure_data=data1, drug_data=data2)
+    if view["screen"] == 2:
+        img = img.rotate(270, expand=True)
     return img
 
 
@@ -0,0 +1,137 @@
+"""
+Cache of rendered dashboard graphs.
+
+A patient's ``data_version`` is bumped in the same transaction as any write
+to their seizures or drug administrations, so a rendered PNG stays valid
+for as long as the version it was rendered at and the code that drew it.
+PNGs are kept in an in-process LRU and on disk under ``GRAPH_CACHE_DIR``
+(shared by all worker processes), as
+``<patient_id>/<graph_number>-r<GRAPH_RENDER_VERSION>-v<version>.png``.
+"""
+
+import glob
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from app import db
+from app.models import Patient
+
+patients_table = Patient.__table__
+
+# Bump whenever the rendered graphs or the graph-data JSON change, so
+# ETags and disk cache entries from earlier code are no longer served
+GRAPH_RENDER_VERSION = 1
+
+_cache_name = re.compile(r"(\d+)-r(\d+)-v(\d+)\.png")
+
+_memory: "OrderedDict[tuple, bytes]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def bump_patient_version(patient_id: int) -> None:
+    """
+    Invalidate the patient's cached graphs.
+
+    Runs in the caller's session so the bump commits (or rolls back) with
+    the data change itself.
+    """
+    db.session.execute(
+        update(patients_table)
+        .where(patients_table.c.id == patient_id)
+        .values(data_version=patients_table.c.data_version + 1)
+    )
+
+
+def get_patient_version(patient_id: int) -> Optional[int]:
+    """Current data version, or None if the patient does not exist."""
+    return db.session.execute(
+        select(patients_table.c.data_version).where(patients_table.c.id == patient_id)
+    ).scalar()
+
+
+def graph_etag(patient_id: int, graph_number: int, version: int) -> str:
+    return f"graph-{patient_id}-{graph_number}-r{GRAPH_RENDER_VERSION}-v{version}"
+
+
+def graph_data_etag(patient_id: int, graph_number: int, version: int) -> str:
+    return f"graph-data-{patient_id}-{graph_number}-r{GRAPH_RENDER_VERSION}-v{version}"
+
+
+def _patient_dir(patient_id: int) -> str:
+    return os.path.join(current_app.config["GRAPH_CACHE_DIR"], str(patient_id))
+
+
+def _graph_path(patient_id: int, graph_number: int, version: int) -> str:
+    return os.path.join(
+        _patient_dir(patient_id),
+        f"{graph_number}-r{GRAPH_RENDER_VERSION}-v{version}.png",
+    )
+
+
+def _remember(key: tuple, png: bytes) -> None:
+    with _lock:
+        _memory[key] = png
+        _memory.move_to_end(key)
+        while len(_memory) > current_app.config["GRAPH_CACHE_MEMORY_ENTRIES"]:
+            _memory.popitem(last=False)
+
+
+def get_cached_graph(patient_id: int, graph_number: int, version: int) -> Optional[bytes]:
+    """PNG bytes rendered at ``version``, from memory or disk."""
+    key = (patient_id, graph_number, version)
+    with _lock:
+        png = _memory.get(key)
+        if png is not None:
+            _memory.move_to_end(key)
+            return png
+
+    try:
+        with open(_graph_path(patient_id, graph_number, version), "rb") as f:
+            png = f.read()
+    except OSError:
+        return None
+    _remember(key, png)
+    return png
+
+
+def store_graph(patient_id: int, graph_number: int, version: int, png: bytes) -> None:
+    """Cache a rendered PNG and drop renders of older versions or code."""
+    _remember((patient_id, graph_number, version), png)
+
+    path = _graph_path(patient_id, graph_number, version)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so other workers never read a partial file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, path)
+
+        # Only older versions: another worker may already have a newer one.
+        # Files of other renderer versions (and the old unversioned names)
+        # are never served again.
+        for stale in glob.glob(os.path.join(os.path.dirname(path), f"{graph_number}-*.png")):
+            match = _cache_name.fullmatch(os.path.basename(stale))
+            if (
+                match is None
+                or int(match[2]) != GRAPH_RENDER_VERSION
+                or int(match[3]) < version
+            ):
+                os.remove(stale)
+    except OSError as e:
+        current_app.logger.warning(f"Could not write graph cache {path}: {e}")
+
+
+def drop_patient_graphs(patient_id: int) -> None:
+    """Remove every cached graph of a deleted patient."""
+    with _lock:
+        for key in [key for key in _memory if key[0] == patient_id]:
+            del _memory[key]
+    shutil.rmtree(_patient_dir(patient_id), ignore_errors=True)
@@ -0,0 +1,141 @@
+"""
+Dashboard graph series as JSON, for drawing in the browser.
+
+``build_graph_data`` prepares what ``generate_graphs.make_plot2`` (the
+Figure-based renderer) would draw for a graph number, after the same
+``aggregation``, without rasterising it. Series are
+columnar lists, and electrodes and drugs are referenced by index into the
+``electrodes`` / ``drugs.names`` lists, to keep payloads small.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List
+
+from app.services.create_graphs.aggregation import aggregate_for_screen
+from app.services.create_graphs.generate_graphs import (
+    GRAPH_COUNT,
+    GRAPH_VIEWS,
+    electrode_color_map,
+    has_graph_data,
+)
+
+
+def _hex(color) -> str:
+    return "#%02x%02x%02x" % tuple(int(c) for c in color[:3])
+
+
+def _hours(day: int, hhmmss: str) -> float:
+    """Position on the time-of-day axis: hours since the start of day 1."""
+    h, m, s = (int(part) for part in hhmmss.split(":"))
+    return round((day - 1) * 24 + h + m / 60 + s / 3600, 4)
+
+
+def _stacked_seizures(seizures, days, use_duration, index) -> Dict[str, List]:
+    """Per-seizure stack segments, ordered by day as ``make_plot2`` stacks them."""
+    by_day = {day: [] for day in days}
+    for seizure in seizures:
+        by_day[seizure["day"]].append(seizure)
+
+    columns = {"day": [], "bottom": [], "height": [], "electrodes": []}
+    for day in days:
+        bottom = 0
+        for seizure in by_day[day]:
+            height = int(seizure["duration"]) if use_duration else 1
+            columns["day"].append(day)
+            columns["bottom"].append(bottom)
+            columns["height"].append(height)
+            columns["electrodes"].append([index[e] for e in seizure["electrodes"]])
+            bottom += height
+    return columns
+
+
+def _time_bars(seizures, index) -> Dict[str, List]:
+    columns = {
+        "x_hours": [],
+        "width_hours": [],
+        "duration": [],
+        "count": [],
+        "label": [],
+        "electrodes": [],
+    }
+    for seizure in sorted(seizures, key=lambda s: (s["day"], s["start_time"])):
+        columns["x_hours"].append(_hours(seizure["day"], seizure["start_time"]))
+        columns["width_hours"].append(0.8 * seizure.get("span_hours", 1))
+        columns["duration"].append(int(seizure["duration"]))
+        columns["count"].append(seizure.get("count", 1))
+        columns["label"].append(seizure.get("label", seizure["start_time"][:5]))
+        columns["electrodes"].append([index[e] for e in seizure["electrodes"]])
+    return columns
+
+
+def _drug_points(drugs) -> Dict[str, List]:
+    names = sorted({drug["drug_name"] for drug in drugs})
+    index = {name: i for i, name in enumerate(names)}
+    points = sorted(
+        ((_hours(d["day"], d["time"]), d) for d in drugs if d.get("time")),
+        key=lambda p: p[0],
+    )
+    return {
+        "names": names,
+        "x_hours": [x for x, _ in points],
+        "day": [d["day"] for _, d in points],
+        "dosage": [int(d["dosage"]) for _, d in points],
+        "drug": [index[d["drug_name"]] for _, d in points],
+    }
+
+
+def build_graph_data(
+    graph_number: int, seizure_data: List[Dict[str, Any]], drug_data: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Series of dashboard graph ``graph_number`` (0 - 8) as a JSON-ready dict.
+
+    Raises ValueError for an unknown graph number.
+    """
+    if not 0 <= graph_number < GRAPH_COUNT:
+        raise ValueError(f"Graph number must be 0-{GRAPH_COUNT - 1}")
+    view = GRAPH_VIEWS[graph_number]
+    screen = view["screen"]
+
+    data = {
+        "graph_number": graph_number,
+        "screen": screen,
+        "view": {key: value for key, value in view.items() if key != "screen"},
+        "insufficient_data": not has_graph_data(view, seizure_data, drug_data),
+    }
+    if data["insufficient_data"]:
+        return data
+
+    seizures = aggregate_for_screen(screen, seizure_data)
+    sorted_electrodes, electrode_to_color = electrode_color_map(
+        {e for seizure in seizures for e in seizure["electrodes"]}
+    )
+    index = {e: i for i, e in enumerate(sorted_electrodes)}
+    days = list(range(1, max(seizure["day"] for seizure in seizures) + 1))
+    data["electrodes"] = sorted_electrodes
+    data["electrode_colors"] = [_hex(electrode_to_color[e]) for e in sorted_electrodes]
+    data["days"] = days
+
+    if screen == 1:
+        counts = Counter(seizure["day"] for seizure in seizures)
+        data["seizure_counts"] = [counts[day] for day in days]
+        if view["view_seizure_length"] or view["view_soz_heatmap"]:
+            data["seizures"] = _stacked_seizures(
+                seizures, days, view["view_seizure_length"] == 1, index
+            )
+
+    elif screen == 2:
+        spans = {seizure.get("span_hours") for seizure in seizures}
+        data["resolution"] = "day" if 24 in spans else "hour" if 1 in spans else "seizure"
+        data["bars"] = _time_bars(seizures, index)
+        if view["view_drug_admin"]:
+            data["drugs"] = _drug_points(drug_data)
+
+    else:
+        counts = Counter(e for seizure in seizures for e in seizure["electrodes"])
+        data["electrode_counts"] = {
+            "electrode": [index[e] for e in sorted(counts)],
+            "count": [counts[e] for e in sorted(counts)],
+        }
+
+    return data
@@ -0,0 +1,143 @@
+"""
+Pre-rendering of a patient's full dashboard graph set.
+
+``render_patient_graphs`` loads the patient's data once per kind (day
+aggregates for the day-level screens, the timeline for the time-of-day
+screen), renders every graph that is not already cached at the current
+``data_version`` in a process pool (matplotlib is CPU bound and not thread
+safe), and stores the PNGs with ``graphCache`` so dashboard loads are
+served from the cache. It runs as the last step of report ingestion and
+behind ``POST /patients/<id>/graphs/render``.
+"""
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+
+from app.services.create_graphs.generate_graphs import (
+    GRAPH_COUNT,
+    GRAPH_VIEWS,
+    fetch_graph_data,
+    render_graph,
+)
+from app.services.create_graphs.graphCache import (
+    get_cached_graph,
+    get_patient_version,
+    store_graph,
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def render_graph_png(graph_number: int, seizure_data: List[dict], drug_data: List[dict]) -> bytes:
+    """Render one graph to PNG bytes. Runs inside a pool worker process."""
+    img_io = BytesIO()
+    render_graph(graph_number, seizure_data, drug_data).save(img_io, "PNG")
+    return img_io.getvalue()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent holds DB connections and threads
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _discard_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def render_patient_graphs(patient_id: int, force: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Render and cache all dashboard graphs of a patient in one pass.
+
+    Graphs already cached at the current version are skipped unless
+    ``force``. Returns a summary, or None if the patient does not exist.
+    """
+    started = time.perf_counter()
+
+    # Read the version before the data: a write in between bumps the
+    # version past the one we store under, so a stale render is never served
+    version = get_patient_version(patient_id)
+    if version is None:
+        return None
+
+    pending = [
+        n for n in range(GRAPH_COUNT)
+        if force or get_cached_graph(patient_id, n, version) is None
+    ]
+    summary = {
+        "patient_id": patient_id,
+        "version": version,
+        "rendered": [],
+        "cached": [n for n in range(GRAPH_COUNT) if n not in pending],
+        "failed": {},
+    }
+    if not pending:
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        return summary
+
+    # Day-level screens share one aggregate load, time-of-day ones one timeline
+    inputs = {}
+
+    def graph_inputs(n):
+        kind = 2 if GRAPH_VIEWS[n]["screen"] == 2 else 1
+        if kind not in inputs:
+            inputs[kind] = fetch_graph_data(patient_id, kind)
+        return inputs[kind]
+
+    workers = current_app.config["GRAPH_RENDER_WORKERS"]
+    if workers <= 0:
+        for n in pending:
+            try:
+                png = render_graph_png(n, *graph_inputs(n))
+            except Exception as e:
+                summary["failed"][n] = str(e)
+                continue
+            store_graph(patient_id, n, version, png)
+            summary["rendered"].append(n)
+    else:
+        pool = _get_pool(workers)
+        futures = {
+            pool.submit(render_graph_png, n, *graph_inputs(n)): n
+            for n in pending
+        }
+        try:
+            for future in as_completed(futures):
+                n = futures[future]
+                try:
+                    png = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    summary["failed"][n] = str(e)
+                    continue
+                store_graph(patient_id, n, version, png)
+                summary["rendered"].append(n)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed); start a fresh pool next time
+            _discard_pool()
+            raise
+
+    summary["rendered"].sort()
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    if summary["failed"]:
+        current_app.logger.warning(
+            f"Graph render for patient {patient_id} failed: {summary['failed']}"
+        )
+    return summary
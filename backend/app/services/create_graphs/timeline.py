@@ -0,0 +1,154 @@
+"""
+Columnar patient timeline for the graph code.
+
+``load_patient_timeline`` reads a patient's seizures, their onset electrodes
+and drug administrations in three queries, all filtered by patient, and
+returns them as numpy columns instead of one ORM object per row.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+from sqlalchemy import select
+
+from app import db
+from app.models import DrugAdministration, Electrode, Seizure, seizures_electrodes
+
+seizures_table = Seizure.__table__
+electrodes_table = Electrode.__table__
+drugs_table = DrugAdministration.__table__
+
+
+def _seconds(t) -> float:
+    return np.nan if t is None else t.hour * 3600 + t.minute * 60 + t.second
+
+
+class PatientTimeline:
+    """
+    A patient's events as parallel arrays.
+
+    Seizures (ordered by id): ``seizure_id``, ``seizure_day``,
+    ``seizure_start`` (seconds after midnight, NaN if unknown) and
+    ``seizure_duration`` (seconds). Onset electrodes are stored CSR-style:
+    seizure ``i`` has ``electrode_names[electrode_index[electrode_offsets[i]:
+    electrode_offsets[i + 1]]]``.
+
+    Drug administrations (ordered by day): ``drug_id``, ``drug_day``,
+    ``drug_dosage``, ``drug_name_index`` into ``drug_names`` and the raw
+    ``drug_time`` strings.
+    """
+
+    def __init__(self, patient_id, seizure_rows, electrode_rows, drug_rows):
+        self.patient_id = patient_id
+
+        self.seizure_id = np.array([r.id for r in seizure_rows], dtype=np.int64)
+        self.seizure_day = np.array([r.day for r in seizure_rows], dtype=np.int32)
+        self.seizure_start = np.array(
+            [_seconds(r.start_time) for r in seizure_rows], dtype=np.float64
+        )
+        self.seizure_duration = np.array(
+            [r.duration or 0 for r in seizure_rows], dtype=np.int32
+        )
+
+        # Per-seizure electrode lists, in electrode id order
+        position = {seizure_id: i for i, seizure_id in enumerate(self.seizure_id.tolist())}
+        names: Dict[str, int] = {}
+        per_seizure: List[List[int]] = [[] for _ in seizure_rows]
+        for seizure_id, name in electrode_rows:
+            i = position.get(seizure_id)
+            if i is not None:
+                per_seizure[i].append(names.setdefault(name, len(names)))
+        self.electrode_names = list(names)
+        self.electrode_offsets = np.zeros(len(seizure_rows) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in per_seizure], out=self.electrode_offsets[1:])
+        self.electrode_index = np.fromiter(
+            (idx for ids in per_seizure for idx in ids),
+            dtype=np.int32,
+            count=int(self.electrode_offsets[-1]),
+        )
+
+        self.drug_id = np.array([r.id for r in drug_rows], dtype=np.int64)
+        self.drug_day = np.array([r.day for r in drug_rows], dtype=np.int32)
+        self.drug_dosage = np.array([r.dosage for r in drug_rows], dtype=np.int32)
+        drug_names: Dict[str, int] = {}
+        self.drug_name_index = np.array(
+            [drug_names.setdefault(r.drug_name, len(drug_names)) for r in drug_rows],
+            dtype=np.int32,
+        )
+        self.drug_names = list(drug_names)
+        self.drug_time = [r.time for r in drug_rows]
+
+    def __len__(self):
+        return len(self.seizure_id)
+
+    def seizure_electrodes(self, i: int) -> List[str]:
+        """Onset electrode names of seizure ``i``."""
+        start, end = self.electrode_offsets[i], self.electrode_offsets[i + 1]
+        return [self.electrode_names[idx] for idx in self.electrode_index[start:end]]
+
+    def seizure_records(self) -> List[Dict[str, Any]]:
+        """Seizures as the list of dicts ``make_plot2`` takes."""
+        records = []
+        for i in range(len(self.seizure_id)):
+            start = self.seizure_start[i]
+            records.append({
+                "id": int(self.seizure_id[i]),
+                "day": int(self.seizure_day[i]),
+                "start_time": (
+                    None if np.isnan(start)
+                    else "%02d:%02d:%02d" % (start // 3600, start % 3600 // 60, start % 60)
+                ),
+                "duration": int(self.seizure_duration[i]),
+                "electrodes": self.seizure_electrodes(i),
+            })
+        return records
+
+    def drug_records(self) -> List[Dict[str, Any]]:
+        """Drug administrations as the list of dicts ``make_plot2`` takes."""
+        return [
+            {
+                "id": int(self.drug_id[i]),
+                "drug_name": self.drug_names[self.drug_name_index[i]],
+                "day": int(self.drug_day[i]),
+                "dosage": int(self.drug_dosage[i]),
+                "time": self.drug_time[i],
+            }
+            for i in range(len(self.drug_id))
+        ]
+
+
+def load_patient_timeline(patient_id: int) -> PatientTimeline:
+    """Load a patient's seizures, onset electrodes and drugs in three queries."""
+    with db.engine.connect() as conn:
+        seizure_rows = conn.execute(
+            select(
+                seizures_table.c.id,
+                seizures_table.c.day,
+                seizures_table.c.start_time,
+                seizures_table.c.duration,
+            )
+            .where(seizures_table.c.patient_id == patient_id)
+            .order_by(seizures_table.c.id)
+        ).all()
+
+        electrode_rows = conn.execute(
+            select(seizures_electrodes.c.seizure_id, electrodes_table.c.name)
+            .join(electrodes_table, electrodes_table.c.id == seizures_electrodes.c.electrode_id)
+            .join(seizures_table, seizures_table.c.id == seizures_electrodes.c.seizure_id)
+            .where(seizures_table.c.patient_id == patient_id)
+            .order_by(seizures_electrodes.c.seizure_id, electrodes_table.c.id)
+        ).all()
+
+        drug_rows = conn.execute(
+            select(
+                drugs_table.c.id,
+                drugs_table.c.drug_name,
+                drugs_table.c.day,
+                drugs_table.c.dosage,
+                drugs_table.c.time,
+            )
+            .where(drugs_table.c.patient_id == patient_id)
+            .order_by(drugs_table.c.day, drugs_table.c.id)
+        ).all()
+
+    return PatientTimeline(patient_id, seizure_rows, electrode_rows, drug_rows)
@@ -0,0 +1,121 @@
+"""
+Per-patient daily summary table.
+
+``patient_daily_stats`` holds, for every (patient, day) with data, the
+seizure count and total seizure duration and the number, total dosage and
+per-drug totals of drug administrations. ``refresh_daily_stats`` recomputes
+the rows of the days a write touched from the raw rows, inside the writing
+transaction, so readers (``load_daily_stats``, ``GET
+/patients/<id>/daily_stats``) get the totals with one indexed lookup.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app import db
+from app.models import DrugAdministration, PatientDailyStat, Seizure
+
+stats_table = PatientDailyStat.__table__
+seizure_table = Seizure.__table__
+drug_table = DrugAdministration.__table__
+
+STAT_COLUMNS = (
+    "seizure_count",
+    "total_seizure_duration",
+    "drug_administration_count",
+    "total_dosage",
+    "drug_totals",
+)
+
+
+def refresh_daily_stats(patient_id: int, days: Iterable[int]) -> None:
+    """
+    Recompute the patient's stats rows for ``days`` from seizures and drugs.
+
+    Runs in the caller's session so the stats commit (or roll back) with the
+    data change. Call it after ``bump_patient_version``: that UPDATE locks
+    the patient row, so concurrent writes for one patient refresh one after
+    the other and each sees the rows the previous one committed.
+    """
+    days = sorted({int(day) for day in days})
+    if not days:
+        return
+
+    stats: Dict[int, Dict[str, Any]] = defaultdict(
+        lambda: {
+            "seizure_count": 0,
+            "total_seizure_duration": 0,
+            "drug_administration_count": 0,
+            "total_dosage": 0,
+            "drug_totals": {},
+        }
+    )
+
+    seizure_rows = db.session.execute(
+        select(
+            seizure_table.c.day,
+            func.count(seizure_table.c.id),
+            func.coalesce(func.sum(seizure_table.c.duration), 0),
+        )
+        .where(seizure_table.c.patient_id == patient_id, seizure_table.c.day.in_(days))
+        .group_by(seizure_table.c.day)
+    )
+    for day, count, duration in seizure_rows:
+        stats[day]["seizure_count"] = count
+        stats[day]["total_seizure_duration"] = int(duration)
+
+    drug_rows = db.session.execute(
+        select(
+            drug_table.c.day,
+            drug_table.c.drug_name,
+            func.count(drug_table.c.id),
+            func.coalesce(func.sum(drug_table.c.dosage), 0),
+        )
+        .where(drug_table.c.patient_id == patient_id, drug_table.c.day.in_(days))
+        .group_by(drug_table.c.day, drug_table.c.drug_name)
+    )
+    for day, drug_name, count, dosage in drug_rows:
+        stats[day]["drug_administration_count"] += count
+        stats[day]["total_dosage"] += int(dosage)
+        stats[day]["drug_totals"][drug_name] = int(dosage)
+
+    # Days left without any data (e.g. after a delete) have no row
+    empty = [day for day in days if day not in stats]
+    if empty:
+        db.session.execute(
+            delete(stats_table).where(
+                stats_table.c.patient_id == patient_id, stats_table.c.day.in_(empty)
+            )
+        )
+    if not stats:
+        return
+
+    upsert = pg_insert(stats_table).values(
+        [{"patient_id": patient_id, "day": day, **row} for day, row in stats.items()]
+    )
+    db.session.execute(
+        upsert.on_conflict_do_update(
+            index_elements=["patient_id", "day"],
+            set_={column: upsert.excluded[column] for column in STAT_COLUMNS},
+        )
+    )
+
+
+def load_daily_stats(
+    patient_id: int, from_day: Optional[int] = None, to_day: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """The patient's stats rows, ordered by day, optionally within a day range."""
+    query = select(stats_table).where(stats_table.c.patient_id == patient_id)
+    if from_day is not None:
+        query = query.where(stats_table.c.day >= from_day)
+    if to_day is not None:
+        query = query.where(stats_table.c.day <= to_day)
+    with db.engine.connect() as conn:
+        rows = conn.execute(query.order_by(stats_table.c.day))
+        return [
+            {"day": row.day, **{column: row._mapping[column] for column in STAT_COLUMNS}}
+            for row in rows
+        ]
@@ -0,0 +1,89 @@
+"""
+Process-wide registry of SentenceTransformer models.
+
+Loading all-mpnet-base-v2 reads several hundred MB from disk and initialises
+torch, so each model is loaded once per worker process and shared by every
+request (chat, summaries, report indexing).
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from flask import current_app
+from sentence_transformers import SentenceTransformer
+
+DEFAULT_MODEL_NAME = "all-mpnet-base-v2"
+
+_models: Dict[str, SentenceTransformer] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+# Guards _stats; separate from _lock so counting a hit never waits on a load
+_stats_lock = threading.Lock()
+
+
+def default_model_name() -> str:
+    """Embedding model configured for this app."""
+    try:
+        return current_app.config.get("EMBEDDING_MODEL_NAME", DEFAULT_MODEL_NAME)
+    except RuntimeError:  # outside an app context
+        return DEFAULT_MODEL_NAME
+
+
+def get_embedding_model(model_name: Optional[str] = None) -> SentenceTransformer:
+    """Return the shared model instance, loading it on first use."""
+    model_name = model_name or default_model_name()
+
+    model = _models.get(model_name)
+    if model is not None:
+        _count_hit(model_name)
+        return model
+
+    with _lock:
+        # Another thread may have finished loading while we waited
+        model = _models.get(model_name)
+        if model is None:
+            started = time.perf_counter()
+            model = SentenceTransformer(model_name)
+            elapsed = time.perf_counter() - started
+            with _stats_lock:
+                _stats[model_name] = {
+                    "load_seconds": round(elapsed, 3),
+                    "loaded_at": time.time(),
+                    "hits": 0,
+                }
+            _models[model_name] = model
+            current_app.logger.info(
+                f"Loaded embedding model {model_name} in {elapsed:.2f}s"
+            )
+        _count_hit(model_name)
+    return model
+
+
+def _count_hit(model_name: str) -> None:
+    with _stats_lock:
+        _stats[model_name]["hits"] += 1
+
+
+def warm_up_embedding_models(app, model_names: Iterable[str]) -> threading.Thread:
+    """Load ``model_names`` in a background thread so boot is not blocked."""
+
+    def _warm():
+        with app.app_context():
+            for name in model_names:
+                try:
+                    get_embedding_model(name)
+                except Exception as e:
+                    current_app.logger.error(
+                        f"Failed to warm embedding model {name}: {e}"
+                    )
+
+    thread = threading.Thread(target=_warm, name="embedding-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def embedding_model_stats() -> Dict[str, Dict[str, float]]:
+    """Load time and use count for every model loaded in this process."""
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
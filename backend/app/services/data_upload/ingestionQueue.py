@@ -0,0 +1,390 @@
+"""
+Persistent report-ingestion queue.
+
+Uploads only insert an ``ingestion_jobs`` row; a small pool of background
+threads in every worker process claims queued jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED`` and runs ``upload_controller`` on them.
+Job rows double as the progress record read by ``GET /reports/jobs/<id>``.
+
+Every job timestamp comes from the database clock (``now()``), like the
+column defaults, so stale-job cutoffs do not depend on the app server's
+time zone. A running job's ``updated_at`` is refreshed by a heartbeat, so
+only jobs whose worker died look stale.
+"""
+
+import threading
+import time
+import traceback
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import func, select, update
+
+from app import db
+from app.models import IngestionJob, Report
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+STAGE_RUNNING = "running"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+jobs_table = IngestionJob.__table__
+
+# Set whenever a job is enqueued in this process so idle workers pick it up
+# without waiting for the next poll.
+_wakeup = threading.Event()
+
+
+def enqueue_report_job(report: Report, file_type: str) -> IngestionJob:
+    """
+    Add an ingestion job for ``report`` to the current session.
+
+    The caller owns the transaction: commit, then call ``notify_workers``.
+    """
+    job = IngestionJob(
+        report_id=report.id,
+        patient_id=report.patient_id,
+        file_type=file_type,
+        status=JOB_QUEUED,
+        stages={},
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def notify_workers() -> None:
+    """Wake idle workers in this process after a job has been committed."""
+    _wakeup.set()
+
+
+def serialize_job(job: IngestionJob) -> Dict[str, Any]:
+    """JSON-ready view of a job row for the status endpoint."""
+    return {
+        "job_id": job.id,
+        "report_id": job.report_id,
+        "patient_id": job.patient_id,
+        "status": job.status,
+        "stage": job.stage,
+        "stages": job.stages or {},
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def claim_next_job() -> Optional[int]:
+    """
+    Atomically move the oldest queued job to ``running`` and return its id.
+
+    Runs in its own short transaction so the claim is visible to every other
+    worker immediately; ``SKIP LOCKED`` keeps workers from blocking on each
+    other.
+    """
+    with db.engine.begin() as conn:
+        row = conn.execute(
+            select(jobs_table.c.id)
+            .where(jobs_table.c.status == JOB_QUEUED)
+            .order_by(jobs_table.c.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if row is None:
+            return None
+
+        conn.execute(
+            update(jobs_table)
+            .where(jobs_table.c.id == row.id)
+            .values(
+                status=JOB_RUNNING,
+                started_at=func.now(),
+                updated_at=func.now(),
+                attempts=jobs_table.c.attempts + 1,
+            )
+        )
+        return row.id
+
+
+def requeue_stale_jobs(stale_after: int, max_attempts: int) -> int:
+    """
+    Recover jobs left ``running`` by a worker that died mid-pipeline.
+
+    Jobs whose heartbeat has not touched them for ``stale_after`` seconds
+    are put back in the queue, or failed once they have used up
+    ``max_attempts``. Retrying is safe: the pipeline stores its results in
+    one commit that also sets ``persisted_at``, and ``run_job`` skips jobs
+    that have it.
+    """
+    with db.engine.begin() as conn:
+        # Database time, the clock updated_at is written with
+        cutoff = conn.execute(select(func.now())).scalar() - timedelta(seconds=stale_after)
+        stale = (jobs_table.c.status == JOB_RUNNING) & (jobs_table.c.updated_at < cutoff)
+        failed = conn.execute(
+            update(jobs_table)
+            .where(stale & (jobs_table.c.attempts >= max_attempts))
+            .values(
+                status=JOB_FAILED,
+                error="Worker stopped before the job finished",
+                finished_at=func.now(),
+            )
+        ).rowcount
+        requeued = conn.execute(
+            update(jobs_table)
+            .where(stale & (jobs_table.c.attempts < max_attempts))
+            .values(status=JOB_QUEUED)
+        ).rowcount
+    if failed or requeued:
+        current_app.logger.warning(
+            f"Recovered stale ingestion jobs: {requeued} requeued, {failed} failed"
+        )
+    return requeued
+
+
+def record_stage(job_id: int, stage: str, state: str, **details: Any) -> None:
+    """
+    Record progress of one pipeline stage on the job row.
+
+    Written through its own connection so progress is visible while the
+    pipeline's session transaction is still open.
+    """
+    with db.engine.begin() as conn:
+        row = conn.execute(
+            select(jobs_table.c.stages, func.now().label("now"))
+            .where(jobs_table.c.id == job_id)
+            .with_for_update()
+        ).first()
+        if row is None:
+            return
+
+        stages = dict(row.stages or {})
+        entry = dict(stages.get(stage, {}))
+        entry["state"] = state
+        if state == STAGE_RUNNING:
+            entry["started_at"] = row.now.isoformat()
+        else:
+            entry["finished_at"] = row.now.isoformat()
+        entry.update(details)
+        stages[stage] = entry
+
+        conn.execute(
+            update(jobs_table)
+            .where(jobs_table.c.id == job_id)
+            .values(stages=stages, stage=stage, updated_at=func.now())
+        )
+
+
+def touch_job(job_id: int) -> None:
+    """Heartbeat: mark a running job as still alive."""
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(jobs_table)
+            .where(jobs_table.c.id == job_id, jobs_table.c.status == JOB_RUNNING)
+            .values(updated_at=func.now())
+        )
+
+
+class _Heartbeat:
+    """Touches a job every ``interval`` seconds while the pipeline runs."""
+
+    def __init__(self, app, job_id: int, interval: float):
+        self.app = app
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"ingestion-heartbeat-{job_id}", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    touch_job(self.job_id)
+                except Exception as e:
+                    current_app.logger.warning(
+                        f"Heartbeat for ingestion job {self.job_id} failed: {e}"
+                    )
+
+
+def _finish_job(job_id: int, status: str, error: Optional[str] = None) -> None:
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(jobs_table)
+            .where(jobs_table.c.id == job_id)
+            .values(status=status, error=error, finished_at=func.now(), updated_at=func.now())
+        )
+
+
+def run_job(job_id: int) -> bool:
+    """Run the ingestion pipeline for a claimed job. Requires an app context."""
+    # Imported here: uploadHandlers pulls in the NLP stack
+    from app.services.data_upload.uploadHandlers import upload_controller
+
+    job = db.session.get(IngestionJob, job_id)
+    report = db.session.get(Report, job.report_id) if job else None
+    if report is None:
+        _finish_job(job_id, JOB_FAILED, "Report no longer exists")
+        return False
+
+    # The session is removed once the pipeline finishes, detaching job/report
+    patient_id = job.patient_id
+
+    def progress(stage: str, state: str, **details: Any) -> None:
+        record_stage(job_id, stage, state, **details)
+
+    if job.persisted_at is not None:
+        # An earlier attempt stored the results but stopped before finishing
+        # the job; running the pipeline again would store them twice
+        current_app.logger.info(f"Ingestion job {job_id} results already stored")
+        success = True
+    else:
+        current_app.logger.info(f"Running ingestion job {job_id} for report {report.id}")
+        heartbeat = _Heartbeat(
+            current_app._get_current_object(),
+            job_id,
+            current_app.config["INGESTION_HEARTBEAT_INTERVAL"],
+        )
+        try:
+            with heartbeat:
+                success = upload_controller(
+                    job.file_type, report.file_path, patient_id, report, progress, job
+                )
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(traceback.format_exc())
+            _finish_job(job_id, JOB_FAILED, str(e))
+            return False
+        finally:
+            db.session.remove()
+
+    if not success:
+        _finish_job(job_id, JOB_FAILED, "File processing error")
+        return False
+
+    _finish_job(job_id, JOB_SUCCEEDED)
+    current_app.logger.info(f"Ingestion job {job_id} finished")
+
+    if current_app.config["GRAPH_PRERENDER"]:
+        prerender_graphs(job_id, patient_id)
+    return True
+
+
+def prerender_graphs(job_id: int, patient_id: int) -> None:
+    """
+    Render the patient's dashboard graphs after a successful ingestion.
+
+    Recorded as the job's ``graphs`` stage; a failure here is logged but does
+    not fail the job, the graphs are then rendered on first view instead.
+    """
+    from app.services.create_graphs.graphRenderer import render_patient_graphs
+
+    record_stage(job_id, "graphs", STAGE_RUNNING)
+    try:
+        summary = render_patient_graphs(patient_id)
+    except Exception as e:
+        current_app.logger.error(
+            f"Graph pre-render for patient {patient_id} failed: {traceback.format_exc()}"
+        )
+        record_stage(job_id, "graphs", STAGE_FAILED, error=str(e))
+        return
+    finally:
+        db.session.remove()
+
+    summary = summary or {}
+    record_stage(
+        job_id,
+        "graphs",
+        STAGE_FAILED if summary.get("failed") else STAGE_DONE,
+        rendered=len(summary.get("rendered", [])),
+        seconds=summary.get("seconds"),
+    )
+
+
+class IngestionWorkerPool:
+    """Background threads that drain the ingestion queue for one process."""
+
+    def __init__(self, app, size: int, poll_interval: float):
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self._recovery_lock = threading.Lock()
+        self._next_recovery = 0.0
+
+    def start(self) -> None:
+        with self.app.app_context():
+            self._recover()
+
+        for i in range(self.size):
+            thread = threading.Thread(
+                target=self._run, name=f"ingestion-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        _wakeup.set()
+
+    def _recover(self) -> None:
+        """Requeue stale jobs, at most once per recovery interval per pool."""
+        with self._recovery_lock:
+            now = time.monotonic()
+            if now < self._next_recovery:
+                return
+            self._next_recovery = now + self.app.config["INGESTION_RECOVERY_INTERVAL"]
+        try:
+            requeue_stale_jobs(
+                self.app.config["INGESTION_STALE_AFTER"],
+                self.app.config["INGESTION_MAX_ATTEMPTS"],
+            )
+        except Exception as e:
+            current_app.logger.error(f"Could not recover stale jobs: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            job_id = None
+            with self.app.app_context():
+                try:
+                    # Jobs of workers that died since this one started
+                    self._recover()
+                    job_id = claim_next_job()
+                    if job_id is not None:
+                        run_job(job_id)
+                except Exception:
+                    current_app.logger.error(
+                        f"Ingestion worker error: {traceback.format_exc()}"
+                    )
+                finally:
+                    db.session.remove()
+
+            if job_id is None:
+                _wakeup.wait(self.poll_interval)
+                _wakeup.clear()
+
+
+def start_ingestion_workers(app) -> Optional[IngestionWorkerPool]:
+    """Start the per-process worker pool if ``INGESTION_WORKERS`` > 0."""
+    size = app.config.get("INGESTION_WORKERS", 0)
+    if size <= 0 or app.config.get("TESTING"):
+        return None
+    pool = IngestionWorkerPool(app, size, app.config["INGESTION_POLL_INTERVAL"])
+    pool.start()
+    app.extensions["ingestion_workers"] = pool
+    return pool
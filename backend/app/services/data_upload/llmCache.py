@@ -0,0 +1,246 @@
+"""
+Content-addressed cache of Ollama completions.
+
+Our Modelfiles set ``temperature 0``, so a (model, Modelfile, prompt) triple
+always produces the same answer. Responses are stored in
+``llm_response_cache`` under the sha256 of that triple. Reprocessing a
+report, retrying a crashed job or seeing the same day text in another
+report then skips the GPU entirely. The least recently used rows are
+evicted once the table grows past ``LLM_CACHE_MAX_ENTRIES``.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import LLMResponse
+from app.services.data_upload.ollamaClient import get_ollama_client
+
+cache_table = LLMResponse.__table__
+
+# Run eviction every this many inserts rather than on each one
+EVICT_EVERY = 100
+
+# model -> (fingerprint or None if not cacheable, fetched_at)
+_fingerprints: Dict[str, Tuple[Optional[str], float]] = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "bypassed": 0, "errors": 0}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _stats[name] += 1
+
+
+def _parse_parameters(text: str) -> Dict[str, str]:
+    """``/api/show`` returns PARAMETER lines as "name value" text."""
+    params = {}
+    for line in (text or "").splitlines():
+        name, _, value = line.strip().partition(" ")
+        if name:
+            params[name] = value.strip().strip('"')
+    return params
+
+
+def model_fingerprint(model: str) -> Optional[str]:
+    """
+    Hash of the model's Modelfile, parameters and template.
+
+    Returns None if the model samples with temperature > 0 (responses are not
+    reproducible) or Ollama cannot describe it. Looked up at most once every
+    ``LLM_CACHE_MODEL_TTL`` seconds so re-created models are noticed.
+    """
+    ttl = current_app.config["LLM_CACHE_MODEL_TTL"]
+    cached = _fingerprints.get(model)
+    if cached is not None and time.monotonic() - cached[1] < ttl:
+        return cached[0]
+
+    try:
+        info = get_ollama_client().show(model)
+    except Exception as e:
+        current_app.logger.warning(f"LLM cache disabled for {model}: {e}")
+        fingerprint = None
+    else:
+        params = _parse_parameters(info.get("parameters"))
+        try:
+            temperature = float(params.get("temperature", 0.8))  # Ollama's default
+        except (TypeError, ValueError):
+            temperature = None
+        if temperature is None:
+            current_app.logger.warning(
+                f"LLM cache disabled for {model}: "
+                f"unreadable temperature {params.get('temperature')!r}"
+            )
+            fingerprint = None
+        elif temperature != 0:
+            current_app.logger.info(f"LLM cache disabled for {model}: temperature > 0")
+            fingerprint = None
+        else:
+            described = {
+                key: info.get(key)
+                for key in ("modelfile", "parameters", "template", "system")
+            }
+            fingerprint = hashlib.sha256(
+                json.dumps(described, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+
+    with _lock:
+        _fingerprints[model] = (fingerprint, time.monotonic())
+    return fingerprint
+
+
+def response_cache_key(payload: Dict[str, Any]) -> Optional[str]:
+    """Cache key for a generate payload, or None if it must not be cached."""
+    if not current_app.config["LLM_CACHE_ENABLED"] or payload.get("stream"):
+        return None
+    options = payload.get("options") or {}
+    if options.get("temperature", 0) != 0:
+        return None
+
+    fingerprint = model_fingerprint(payload["model"])
+    if fingerprint is None:
+        return None
+
+    keyed = {
+        "model": payload["model"],
+        "fingerprint": fingerprint,
+        "prompt": payload.get("prompt"),
+        "system": payload.get("system"),
+        "format": payload.get("format"),
+        "options": options,
+    }
+    return hashlib.sha256(json.dumps(keyed, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_cached_response(key: str) -> Optional[str]:
+    """Return the stored response for ``key`` and mark it recently used."""
+    try:
+        with db.engine.begin() as conn:
+            response = conn.execute(
+                select(cache_table.c.response).where(cache_table.c.key == key)
+            ).scalar()
+            if response is None:
+                _count("misses")
+                return None
+            conn.execute(
+                update(cache_table)
+                .where(cache_table.c.key == key)
+                .values(hits=cache_table.c.hits + 1, last_used_at=datetime.utcnow())
+            )
+    except Exception as e:
+        _count("errors")
+        current_app.logger.warning(f"LLM cache lookup failed: {e}")
+        return None
+    _count("hits")
+    return response
+
+
+def store_response(key: str, model: str, response: str) -> None:
+    """Insert or replace the cached response for ``key``."""
+    if not response:
+        return
+    now = datetime.utcnow()
+    try:
+        with db.engine.begin() as conn:
+            updated = conn.execute(
+                update(cache_table)
+                .where(cache_table.c.key == key)
+                .values(response=response, last_used_at=now)
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    cache_table.insert().values(
+                        key=key,
+                        model=model,
+                        response=response,
+                        hits=0,
+                        created_at=now,
+                        last_used_at=now,
+                    )
+                )
+    except IntegrityError:
+        return  # another worker stored the same prompt first
+    except Exception as e:
+        _count("errors")
+        current_app.logger.warning(f"LLM cache store failed: {e}")
+        return
+
+    with _lock:
+        _stats["stores"] += 1
+        evict = _stats["stores"] % EVICT_EVERY == 0
+    if evict:
+        evict_responses(current_app.config["LLM_CACHE_MAX_ENTRIES"])
+
+
+def evict_responses(max_entries: int) -> int:
+    """Delete all but the ``max_entries`` most recently used responses."""
+    keep = (
+        select(cache_table.c.key)
+        .order_by(cache_table.c.last_used_at.desc())
+        .offset(max_entries)
+    )
+    try:
+        with db.engine.begin() as conn:
+            evicted = conn.execute(
+                delete(cache_table).where(cache_table.c.key.in_(keep.scalar_subquery()))
+            ).rowcount
+    except Exception as e:
+        current_app.logger.warning(f"LLM cache eviction failed: {e}")
+        return 0
+    if evicted:
+        current_app.logger.info(f"Evicted {evicted} cached LLM responses")
+    return evicted
+
+
+def cached_generate(
+    payload: Dict[str, Any],
+    refresh: bool = False,
+    interactive: bool = False,
+    accept: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """
+    Return the model's response to ``payload``, from the cache when possible.
+
+    ``refresh`` skips the lookup but still stores the new response; callers
+    use it when re-asking after a response failed validation. ``accept`` is
+    that validation: a response it returns falsy for is not stored, and a
+    stored one it rejects counts as a miss. ``interactive`` is passed on to
+    ``OllamaClient.generate``.
+    """
+    key = response_cache_key(payload)
+    if key is None:
+        _count("bypassed")
+    elif not refresh:
+        cached = get_cached_response(key)
+        if cached is not None and (accept is None or accept(cached)):
+            current_app.logger.info(f"LLM cache hit for {payload['model']}")
+            return cached
+
+    response = get_ollama_client().generate(payload, interactive=interactive)["response"]
+    if key is not None and (accept is None or accept(response)):
+        store_response(key, payload["model"], response)
+    return response
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for this process and the table's size."""
+    with _lock:
+        stats = dict(_stats)
+    stats["models"] = {model: fp is not None for model, (fp, _) in _fingerprints.items()}
+    try:
+        with db.engine.connect() as conn:
+            stats["entries"] = conn.execute(
+                select(func.count()).select_from(cache_table)
+            ).scalar()
+    except Exception as e:
+        stats["entries"] = None
+        current_app.logger.warning(f"LLM cache size query failed: {e}")
+    return stats
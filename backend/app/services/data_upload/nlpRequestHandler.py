@@ -1,10 +1,10 @@
-import os
-import urllib
-import json
 import traceback
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from app.services.data_upload.uploadUtilities import filter_paragraphs, find_top_k_similar, split_paragraphs
 from flask import current_app
+from app.services.data_upload.llmCache import cached_generate
+from app.services.data_upload.ollamaClient import get_ollama_client
 
 # Import validation functions from the module
 from app.services.data_upload.nlpValidationHandlers import (
@@ -14,14 +14,16 @@ from app.services.data_upload.nlpValidationHandlers import (
     validate_seizure,
 )
 
-TIMEOUT = 180 #Configured timeout period for any LLM request
-OLLAMA_URL = os.getenv("OLLAMA_HOST")  # This should be just the base URL, like http://ollama:11434
 MODEL_NAME = "mymodel"
 DRUG_MODEL_NAME = "drugmodel"
 SEIZURE_MODEL_NAME = "seizuremodel"
 
-def handle_summary_request(data: str) -> str:
-    """Generate a summary of the medical report."""
+def handle_summary_request(data: str, index=None) -> str:
+    """
+    Generate a summary of the medical report.
+
+    ``index`` is the report's (chunks, embeddings) retrieval index, if built.
+    """
 
     llm_prompt_visit_summary = """
     You are a medical assistant specializing in epilepsy diagnostics.
@@ -91,7 +93,7 @@ def handle_summary_request(data: str) -> str:
 
         # Get and display results
         current_app.logger.info("HERE")
-        top_paragraphs = find_top_k_similar(data, question, k)
+        top_paragraphs = find_top_k_similar(data, question, k, index=index)
         
         current_app.logger.info("NO??")
 
@@ -114,18 +116,22 @@ def handle_summary_request(data: str) -> str:
         return f"Error generating summary: {str(e)}"
 
 def handle_seizure_request(data: Dict[str, str]) -> List[Dict[str, str]]:
-    """Extract seizure events from the medical report."""
+    """Extract seizure events from the medical report, one LLM request per day."""
     seizures = []
     try:
-        for day, content in data.items():
-            try:
-                day_int = day
-            except ValueError:
-                day_int = 1
-                
-            payload = {
-                "model": SEIZURE_MODEL_NAME,
-                "prompt": f"""Extract all seizure events from the provided medical report and return them in a JSON list. Each seizure event should include the following fields:
+        for day_seizures in _map_days(_extract_seizures_for_day, data):
+            seizures.extend(day_seizures)
+    except Exception as e:
+        current_app.logger.error(f"Error in handle_seizure_request: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+    
+    return seizures
+
+def _extract_seizures_for_day(day, content: str) -> List[Dict[str, str]]:
+    """Extract and validate the seizures of a single day."""
+    payload = {
+        "model": SEIZURE_MODEL_NAME,
+        "prompt": f"""Extract all seizure events from the provided medical report and return them in a JSON list. Each seizure event should include the following fields:
 
                 1. **start_time**: The start time of the seizure in the format `HH:MM:SS` (e.g., `06:32:06`). If no start time is given, return ‘n/a’
                 2. **electrodes_involved**: A list of electrodes involved at seizure onset, separated by commas (e.g., `["RMH1", "RMH2"]` or `["RAI4-6", "RMI4-6", "RPI4-6", "RSP2-4", "RAC7-8", "LSMA2-4"]`). Give only the electrode name and nothing else. Regions like ‘cingulate’ are not electrodes. Electrodes are abbreviated. 
@@ -135,46 +141,55 @@ def handle_seizure_request(data: Dict[str, str]) -> List[Dict[str, str]]:
 
                 Return only the JSON list and nothing else. Here is the medical report:
                 {content}""",
-                "stream": False,
-            }
-            current_app.logger.info(f"Sending seizure extraction request for day {day}")
-            response = send_request_to_model(payload)
-            current_app.logger.info(f"response {response}")
-            # Try to validate, with a maximum of 3 retries
-            current_app.logger.info("Validating seizure data")
-
-            finalized_jsons = validate_seizure(day_int, response)
-            current_app.logger.info(f"response json {finalized_jsons}")
-            retry_count = 0
-            max_retries = 1
-            
-            while not finalized_jsons and retry_count < max_retries:
-                current_app.logger.info(f"Seizure validation retry {retry_count+1}/{max_retries}")
-                response = send_request_to_model(payload)
-                finalized_jsons = validate_seizure(day_int, response)
-                retry_count += 1
-            
-            # Only extend if we have valid seizures
-            if finalized_jsons:
-                current_app.logger.info(f"Found {len(finalized_jsons)} seizures for day {day}")
-                seizures.extend(finalized_jsons)
-            else:
-                current_app.logger.info(f"No seizures found for day {day}")
+        "stream": False,
+    }
+    try:
+        current_app.logger.info(f"Sending seizure extraction request for day {day}")
+        accept = lambda response: validate_seizure(day, response)
+        response = send_request_to_model(payload, accept=accept)
+        current_app.logger.info(f"response {response}")
+        # Try to validate, with a maximum of 3 retries
+        current_app.logger.info("Validating seizure data")
+
+        finalized_jsons = validate_seizure(day, response)
+        current_app.logger.info(f"response json {finalized_jsons}")
+        retry_count = 0
+        max_retries = 1
+        
+        while not finalized_jsons and retry_count < max_retries:
+            current_app.logger.info(f"Seizure validation retry {retry_count+1}/{max_retries}")
+            response = send_request_to_model(payload, refresh=True, accept=accept)
+            finalized_jsons = validate_seizure(day, response)
+            retry_count += 1
     except Exception as e:
-        current_app.logger.error(f"Error in handle_seizure_request: {str(e)}")
+        current_app.logger.error(f"Error extracting seizures for day {day}: {str(e)}")
         current_app.logger.error(traceback.format_exc())
-    
-    return seizures
+        return []
+
+    # Only keep the day if we have valid seizures
+    if finalized_jsons:
+        current_app.logger.info(f"Found {len(finalized_jsons)} seizures for day {day}")
+        return finalized_jsons
+    current_app.logger.info(f"No seizures found for day {day}")
+    return []
 
 def handle_drugadmin_request(data: Dict[str, str]) -> List[Dict[str, str]]:
-    """Extract drug administration details from the medical report."""
+    """Extract drug administration details from the medical report, one LLM request per day."""
     drugs = []
     try:
-        for day, content in data.items():
-            day_int = day
-            payload = {
-                "model": DRUG_MODEL_NAME,
-                "prompt": """Extract all active drug administration details from the following medical report and return them as a structured JSON list. Each entry should include:  
+        for day_drugs in _map_days(_extract_drugs_for_day, data):
+            drugs.extend(day_drugs)
+    except Exception as e:
+        current_app.logger.error(f"Error in handle_drugadmin_request: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+    
+    return drugs
+
+def _extract_drugs_for_day(day, content: str) -> List[Dict[str, str]]:
+    """Extract and validate the drug administrations of a single day."""
+    payload = {
+        "model": DRUG_MODEL_NAME,
+        "prompt": """Extract all active drug administration details from the following medical report and return them as a structured JSON list. Each entry should include:  
 
                 Required Fields:  
                 1. `name` *(string)*: The name of the drug (e.g., "Lamotrigine").  
@@ -228,41 +243,64 @@ def handle_drugadmin_request(data: Dict[str, str]) -> List[Dict[str, str]]:
 
                 Here is the medical report: 
                 """ + content,
-                "stream": False,
-            }
-            current_app.logger.info(f"Sending drug extraction request for day {day}")
-            response = send_request_to_model(payload)
-            current_app.logger.info(f"response {response}")
-            # Try to validate, with a maximum of 3 retries
-            current_app.logger.info("Validating drug data")
-            finalized_jsons = validate_drug(day_int, response)
-            current_app.logger.info(f"response final {finalized_jsons}")
-            retry_count = 0
-            max_retries = 1
-            
-            while not finalized_jsons and retry_count < max_retries:
-                current_app.logger.info(f"Drug validation retry {retry_count+1}/{max_retries}")
-                response = send_request_to_model(payload)
-                finalized_jsons = validate_drug(day_int, response)
-                retry_count += 1
-            
-            # Only extend if we have valid drugs
-            if finalized_jsons:
-                current_app.logger.info(f"Found {len(finalized_jsons)} drugs for day {day}")
-                drugs.extend(finalized_jsons)
-            else:
-                current_app.logger.info(f"No drugs found for day {day}")
+        "stream": False,
+    }
+    try:
+        current_app.logger.info(f"Sending drug extraction request for day {day}")
+        accept = lambda response: validate_drug(day, response)
+        response = send_request_to_model(payload, accept=accept)
+        current_app.logger.info(f"response {response}")
+        # Try to validate, with a maximum of 3 retries
+        current_app.logger.info("Validating drug data")
+        finalized_jsons = validate_drug(day, response)
+        current_app.logger.info(f"response final {finalized_jsons}")
+        retry_count = 0
+        max_retries = 1
+        
+        while not finalized_jsons and retry_count < max_retries:
+            current_app.logger.info(f"Drug validation retry {retry_count+1}/{max_retries}")
+            response = send_request_to_model(payload, refresh=True, accept=accept)
+            finalized_jsons = validate_drug(day, response)
+            retry_count += 1
     except Exception as e:
-        current_app.logger.error(f"Error in handle_drugadmin_request: {str(e)}")
+        current_app.logger.error(f"Error extracting drugs for day {day}: {str(e)}")
         current_app.logger.error(traceback.format_exc())
-    
-    return drugs
+        return []
+
+    # Only keep the day if we have valid drugs
+    if finalized_jsons:
+        current_app.logger.info(f"Found {len(finalized_jsons)} drugs for day {day}")
+        return finalized_jsons
+    current_app.logger.info(f"No drugs found for day {day}")
+    return []
+
+def _map_days(extract_day, data: Dict[str, str]) -> List[Any]:
+    """
+    Run ``extract_day(day, content)`` for every day on a bounded thread pool.
+
+    At most as many days run at once as the Ollama client lets background
+    requests have in flight (OLLAMA_MAX_IN_FLIGHT less the
+    OLLAMA_INTERACTIVE_SLOTS kept for chat); results come back in day order.
+    """
+    app = current_app._get_current_object()
 
-def handle_chat_request(text, question):
+    def run(item):
+        day, content = item
+        with app.app_context():
+            return extract_day(day, content)
+
+    background_slots = (
+        app.config["OLLAMA_MAX_IN_FLIGHT"] - app.config["OLLAMA_INTERACTIVE_SLOTS"]
+    )
+    workers = max(1, min(background_slots, len(data)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-day") as pool:
+        return list(pool.map(run, data.items()))
+
+def build_chat_prompt(text, question, index=None) -> str:
     k = 5  # Reduced for more focused results
     current_app.logger.info("enter")
     # Get and display results
-    top_paragraphs = find_top_k_similar(text, question, k, 'all-mpnet-base-v2')
+    top_paragraphs = find_top_k_similar(text, question, k, index=index)
 
     current_app.logger.info(f"here {top_paragraphs}")
     query = ""
@@ -275,40 +313,49 @@ def handle_chat_request(text, question):
         query = query + '-'*50 
         query = query + result["paragraph"]
 
+    return query
+
+def handle_chat_request(text, question, index=None):
     payload = {
                 "model": MODEL_NAME,
-                "prompt": query,
+                "prompt": build_chat_prompt(text, question, index),
                 "stream": False,
             }
     
-    response = send_request_to_model(payload=payload)
+    # A user is waiting: may use the slots ingestion leaves free
+    response = send_request_to_model(payload=payload, interactive=True)
 
     return response
 
-def send_request_to_model(payload: Dict[str, Any]) -> str:
-    """Send a request to the Ollama model and return the response."""
-    # FIXED: Construct the correct API endpoint URL without duplication
-    api_url = f"{OLLAMA_URL}/api/generate"
-    
-    # Fix for OLLAMA_HOST already containing "/api/generate"
-    if OLLAMA_URL.endswith("/api/generate"):
-        api_url = OLLAMA_URL
-    
+def stream_chat_request(text, question, index=None) -> Iterator[str]:
+    """Like ``handle_chat_request`` but yields tokens as the model produces them."""
+    payload = {
+        "model": MODEL_NAME,
+        "prompt": build_chat_prompt(text, question, index),
+        "stream": True,
+    }
+    current_app.logger.info(f"Streaming request to model {MODEL_NAME}")
+    return get_ollama_client().generate_stream(payload)
+
+def send_request_to_model(
+    payload: Dict[str, Any],
+    refresh: bool = False,
+    interactive: bool = False,
+    accept: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """
+    Send a request to the Ollama model and return the response.
+
+    Identical prompts are answered from the LLM response cache; pass
+    ``refresh`` to re-ask the model (e.g. after a response failed validation),
+    ``accept`` to keep responses that fail validation out of the cache and
+    ``interactive`` for requests a user is waiting on.
+    """
     try:
-        current_app.logger.info(f"Sending request to model API at {api_url}")
-        req = urllib.request.Request(
-            api_url,
-            data=json.dumps(payload).encode("utf-8"),
-            headers={"Content-Type": "application/json"},
+        current_app.logger.info(f"Sending request to model {payload.get('model')}")
+        return cached_generate(
+            payload, refresh=refresh, interactive=interactive, accept=accept
         )
-
-        with urllib.request.urlopen(req, timeout=TIMEOUT) as response:
-            result = json.loads(response.read().decode("utf-8"))
-            return result["response"]
-
-    except urllib.error.URLError as e:
-        current_app.logger.error(f"Error connecting to model: {str(e)}")
-        return ""
     except Exception as e:
         current_app.logger.error(f"Error in send_request_to_model: {str(e)}")
         return ""
@@ -158,6 +158,19 @@ def split_electrodes(electrode_str):
     return electrodes
 
 
+def has_valid_timing(seizure: Dict[str, Any]) -> bool:
+    """
+    True if a seizure has an ``HH:MM:SS`` start time and a positive duration.
+
+    Seizures failing this can't be plotted and are never stored.
+    """
+    try:
+        datetime.strptime(str(seizure.get("start_time")), "%H:%M:%S")
+        return int(seizure.get("duration") or 0) > 0
+    except (ValueError, TypeError):
+        return False
+
+
 def validate_seizure(day: int, json_text: str) -> List[Dict[str, Any]]:
     """
     Validate and process seizure data from JSON response.
@@ -218,6 +231,11 @@ def validate_seizure(day: int, json_text: str) -> List[Dict[str, Any]]:
                         seizure["duration"]
                     )
 
+                # Reject seizures that can't be placed on the timeline
+                if not has_valid_timing(seizure):
+                    current_app.logger.info(f"Dropping seizure without start time or duration: {seizure}")
+                    continue
+
                 # Add the day field
                 seizure["day"] = day
 
@@ -0,0 +1,339 @@
+"""
+Shared HTTP client for the Ollama API.
+
+One ``requests.Session`` per worker process keeps connections to Ollama
+alive between calls, bounds the number of in-flight generations (keeping
+some free for interactive chat requests), retries
+transient failures with jittered backoff within an overall deadline and
+keeps a latency histogram and slot wait time per model for
+``/debug/ollama/metrics``. ``generate_stream`` yields tokens from
+Ollama's NDJSON stream for the streaming chat endpoint.
+"""
+
+import bisect
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+# Upper bounds (seconds) of the latency histogram buckets; the last is open
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 180, 300)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class OllamaError(Exception):
+    """Ollama could not be reached or kept failing after all retries."""
+
+
+class OllamaClient:
+    def __init__(
+        self,
+        base_url: str,
+        max_in_flight: int = 4,
+        interactive_slots: int = 1,
+        connect_timeout: float = 5,
+        read_timeout: float = 180,
+        retries: int = 2,
+        backoff: float = 1,
+        retry_deadline: float = 300,
+    ):
+        if not base_url:
+            raise OllamaError("OLLAMA_HOST is not set")
+        # OLLAMA_HOST is sometimes configured with the endpoint already on it
+        base_url = base_url.rstrip("/")
+        if base_url.endswith("/api/generate"):
+            base_url = base_url[: -len("/api/generate")]
+        self.base_url = base_url
+        self.generate_url = f"{base_url}/api/generate"
+        self.show_url = f"{base_url}/api/show"
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_deadline = retry_deadline
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Shared by every caller in this process so concurrent stages never
+        # have more than max_in_flight requests outstanding. Background
+        # (ingestion) requests must also hold one of the fewer background
+        # slots, so interactive_slots always stay free for chat requests.
+        # At least one slot is left for background work.
+        interactive_slots = max(0, min(interactive_slots, max_in_flight - 1))
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._background_slots = threading.BoundedSemaphore(
+            max_in_flight - interactive_slots
+        )
+
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def generate(
+        self,
+        payload: Dict[str, Any],
+        timeout: Optional[Tuple[float, float]] = None,
+        interactive: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        POST ``payload`` to /api/generate and return the decoded response.
+
+        Connection errors, timeouts and 5xx responses are retried; anything
+        else, or running out of retries, raises ``OllamaError``. Pass
+        ``interactive`` for requests a user is waiting on, so they can use
+        the reserved slots.
+        """
+        model = payload.get("model", "")
+        response, retries, started = self._post(payload, timeout, interactive)
+        try:
+            result = response.json()
+        except ValueError as e:
+            self._record(model, None, retries)
+            raise OllamaError(f"Request to {model} returned invalid JSON: {e}") from e
+        finally:
+            response.close()
+            self._release(interactive)
+        self._record(model, time.perf_counter() - started, retries)
+        return result
+
+    def show(self, model: str) -> Dict[str, Any]:
+        """Return a model's Modelfile, parameters and template (/api/show)."""
+        try:
+            response = self.session.post(
+                self.show_url, json={"model": model, "name": model}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise OllamaError(f"Could not describe model {model}: {e}") from e
+
+    def generate_stream(
+        self,
+        payload: Dict[str, Any],
+        timeout: Optional[Tuple[float, float]] = None,
+        interactive: bool = True,
+    ) -> Iterator[str]:
+        """
+        Stream a generation, yielding response tokens as Ollama emits them.
+
+        Only the initial request is retried; once tokens have been yielded a
+        dropped connection raises ``OllamaError``. The in-flight slot is held
+        until the stream is exhausted or closed. Streams are interactive by
+        default: a user is watching the tokens arrive.
+        """
+        model = payload.get("model", "")
+        response, retries, started = self._post(
+            dict(payload, stream=True), timeout, interactive, stream=True
+        )
+        first_token = None
+        completed = cancelled = False
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise OllamaError(f"Request to {model} failed: {chunk['error']}")
+                token = chunk.get("response", "")
+                if token:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    yield token
+                if chunk.get("done"):
+                    break
+            completed = True
+        except GeneratorExit:
+            # Client went away mid-stream; not an Ollama failure
+            cancelled = True
+            raise
+        except (requests.RequestException, ValueError) as e:
+            raise OllamaError(f"Stream from {model} failed: {e}") from e
+        finally:
+            response.close()
+            self._release(interactive)
+            if not cancelled:
+                self._record(
+                    model,
+                    time.perf_counter() - started if completed else None,
+                    retries,
+                    first_token,
+                )
+
+    def _acquire(self, interactive: bool) -> None:
+        if not interactive:
+            self._background_slots.acquire()
+        self._slots.acquire()
+
+    def _release(self, interactive: bool) -> None:
+        self._slots.release()
+        if not interactive:
+            self._background_slots.release()
+
+    def _post(
+        self, payload: Dict[str, Any], timeout, interactive: bool, stream: bool = False
+    ):
+        """
+        POST to /api/generate with retries.
+
+        Attempts stop once ``retry_deadline`` seconds have passed since the
+        first one started, and each attempt's read timeout is cut to the time
+        left, so retries cannot multiply the read timeout. The wait for the
+        first slot is not counted; slot waits are recorded separately.
+
+        Returns ``(response, retries, started)`` for the successful attempt
+        with an in-flight slot held; the caller must ``_release`` it.
+        """
+        model = payload.get("model", "")
+        connect_timeout, read_timeout = timeout or self.timeout
+        deadline = None
+        attempt = 0
+        while True:
+            waiting = time.perf_counter()
+            self._acquire(interactive)
+            started = time.perf_counter()
+            self._record_wait(model, started - waiting)
+            if deadline is None:
+                deadline = started + self.retry_deadline
+            elif started >= deadline:
+                self._release(interactive)
+                self._record(model, None, attempt)
+                raise OllamaError(
+                    f"Request to {model} failed after {attempt} attempts, "
+                    f"retry deadline of {self.retry_deadline:g}s reached: {error}"
+                )
+            try:
+                response = self.session.post(
+                    self.generate_url,
+                    json=payload,
+                    timeout=(connect_timeout, min(read_timeout, deadline - started)),
+                    stream=stream,
+                )
+                if response.status_code < 500:
+                    if response.status_code >= 400:
+                        # Give a streamed response's connection back to the pool
+                        response.close()
+                    response.raise_for_status()
+                    return response, attempt, started
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                response.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            except requests.RequestException as e:
+                self._release(interactive)
+                self._record(model, None, attempt)
+                raise OllamaError(f"Request to {model} failed: {e}") from e
+            # Don't hold a slot while backing off
+            self._release(interactive)
+
+            if attempt >= self.retries:
+                self._record(model, None, attempt)
+                raise OllamaError(
+                    f"Request to {model} failed after {attempt + 1} attempts: {error}"
+                )
+            # Full jitter so retries from parallel stages don't line up
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            current_app.logger.warning(
+                f"Ollama request to {model} failed ({error}); retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    def _model_stats(self, model: str) -> Dict[str, Any]:
+        """The model's counters; call with ``_stats_lock`` held."""
+        return self._stats.setdefault(
+            model,
+            {
+                "requests": 0,
+                "failures": 0,
+                "retries": 0,
+                "total_seconds": 0.0,
+                "streams": 0,
+                "first_token_seconds": 0.0,
+                "slot_waits": 0,
+                "slot_wait_seconds": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            },
+        )
+
+    def _record_wait(self, model: str, seconds: float) -> None:
+        with self._stats_lock:
+            stats = self._model_stats(model)
+            stats["slot_waits"] += 1
+            stats["slot_wait_seconds"] += seconds
+
+    def _record(
+        self,
+        model: str,
+        seconds: Optional[float],
+        retries: int,
+        first_token: Optional[float] = None,
+    ) -> None:
+        with self._stats_lock:
+            stats = self._model_stats(model)
+            stats["requests"] += 1
+            stats["retries"] += retries
+            if first_token is not None:
+                stats["streams"] += 1
+                stats["first_token_seconds"] += first_token
+            if seconds is None:
+                stats["failures"] += 1
+                return
+            stats["total_seconds"] += seconds
+            stats["buckets"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Request counts and latency histogram (seconds) for every model."""
+        bounds = list(LATENCY_BUCKETS) + [None]
+        with self._stats_lock:
+            out = {}
+            for model, stats in self._stats.items():
+                succeeded = stats["requests"] - stats["failures"]
+                out[model] = {
+                    "requests": stats["requests"],
+                    "failures": stats["failures"],
+                    "retries": stats["retries"],
+                    "mean_seconds": (
+                        round(stats["total_seconds"] / succeeded, 3) if succeeded else None
+                    ),
+                    "mean_first_token_seconds": (
+                        round(stats["first_token_seconds"] / stats["streams"], 3)
+                        if stats["streams"] else None
+                    ),
+                    "mean_slot_wait_seconds": (
+                        round(stats["slot_wait_seconds"] / stats["slot_waits"], 3)
+                        if stats["slot_waits"] else None
+                    ),
+                    "histogram": [
+                        {"le": bound, "count": count}
+                        for bound, count in zip(bounds, stats["buckets"])
+                    ],
+                }
+            return out
+
+
+def get_ollama_client() -> OllamaClient:
+    """Return this process's shared client, creating it from the app config."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                config = current_app.config
+                _client = OllamaClient(
+                    config["OLLAMA_HOST"],
+                    max_in_flight=config["OLLAMA_MAX_IN_FLIGHT"],
+                    interactive_slots=config["OLLAMA_INTERACTIVE_SLOTS"],
+                    connect_timeout=config["OLLAMA_CONNECT_TIMEOUT"],
+                    read_timeout=config["OLLAMA_READ_TIMEOUT"],
+                    retries=config["OLLAMA_RETRIES"],
+                    backoff=config["OLLAMA_RETRY_BACKOFF"],
+                    retry_deadline=config["OLLAMA_RETRY_DEADLINE"],
+                )
+    return _client
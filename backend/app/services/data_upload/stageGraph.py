@@ -0,0 +1,121 @@
+"""
+Tiny dependency-graph runner for the ingestion pipeline.
+
+Each stage names the stages it depends on and receives their results; a
+stage starts as soon as its dependencies finish, so independent stages
+(summary, seizure and drug extraction) run at the same time.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from flask import current_app
+
+
+class Stage:
+    """A named unit of work: ``fn(results)`` runs after every stage in ``deps``."""
+
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Sequence[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+class StageError(Exception):
+    """A stage raised; ``stage`` names it and ``__cause__`` holds the error."""
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"Stage {stage} failed: {error}")
+        self.stage = stage
+
+
+def run_stage_graph(
+    stages: List[Stage],
+    on_start: Optional[Callable[[str], None]] = None,
+    on_finish: Optional[Callable[[str, float], None]] = None,
+):
+    """
+    Run ``stages`` with maximal parallelism and return ``(results, timings)``.
+
+    ``timings`` maps each stage to its start offset and duration in seconds
+    and includes ``critical_path``, the chain of stages that bounded the
+    total wall-clock time. The hooks run on the calling thread. If a stage
+    raises, stages not yet started are skipped and ``StageError`` is raised
+    once running stages have finished.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown {missing}")
+
+    app = current_app._get_current_object()
+    results: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    pending = {stage.name for stage in stages}
+    running = {}
+    failure = None
+    t0 = time.perf_counter()
+
+    def run(stage: Stage, inputs: Dict[str, Any]):
+        with app.app_context():
+            return stage.fn(inputs)
+
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="stage") as pool:
+        while pending or running:
+            if failure is None:
+                ready = [
+                    name for name in pending
+                    if all(dep in results for dep in by_name[name].deps)
+                ]
+                for name in sorted(ready):
+                    pending.discard(name)
+                    stage = by_name[name]
+                    inputs = {dep: results[dep] for dep in stage.deps}
+                    timings[name] = {"start": time.perf_counter() - t0}
+                    if on_start:
+                        on_start(name)
+                    running[pool.submit(run, stage, inputs)] = name
+            else:
+                pending.clear()
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Stage graph has a cycle through {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                timings[name]["seconds"] = (
+                    time.perf_counter() - t0 - timings[name]["start"]
+                )
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    if failure is None:
+                        failure = StageError(name, e)
+                        failure.__cause__ = e
+                    continue
+                if on_finish:
+                    on_finish(name, timings[name]["seconds"])
+
+    if failure is not None:
+        raise failure
+
+    return results, dict(timings, critical_path=_critical_path(by_name, timings))
+
+
+def _critical_path(by_name: Dict[str, Stage], timings) -> List[str]:
+    """Walk back from the last stage to finish through its latest-finishing dependency."""
+
+    def end(name):
+        return timings[name]["start"] + timings[name]["seconds"]
+
+    if not timings:
+        return []
+    path = [max(timings, key=end)]
+    while by_name[path[-1]].deps:
+        path.append(max(by_name[path[-1]].deps, key=end))
+    return path[::-1]
@@ -1,18 +1,25 @@
 import os
+import hashlib
 import fitz
 import traceback
 import zipfile
 from docx import Document
 from flask import current_app
+from sqlalchemy import func
 #from app.__init__ import db
 from app import db
 from app.models import Report, ExtractedImage
+from app.services.data_upload.embeddingModels import default_model_name
 from app.services.data_upload.nlpRequestHandler import handle_drugadmin_request, handle_seizure_request, handle_summary_request
 from app.services.data_upload.uploadUtilities import (
+    encode_report_index,
     extract_days_from_text,
+    report_index_path,
     store_drugs_array,
+    store_report_index,
     store_seizures_array,
 )
+from app.services.data_upload.stageGraph import Stage, StageError, run_stage_graph
 
 # INDIVIDUAL UPLOAD HANDLERS: DON'T USE DIRECTLY
 
@@ -55,7 +62,7 @@ class pdf_upload_handler:
                     image_num += 1
                     with open(final_path, "wb") as f:
                         f.write(image_bytes)
-            db.session.commit()
+            db.session.flush()
         except Exception as e:
             current_app.logger.error(f"Error extracting images from PDF: {str(e)}")
             raise Exception(f"PDF extraction failed: {str(e)}")
@@ -101,7 +108,7 @@ class docx_upload_handler:
                         image_num += 1
                         with open(final_path, 'wb') as f:
                             f.write(image_data)
-                db.session.commit()
+                db.session.flush()
                         
         except Exception as e:
             current_app.logger.error(f"Error extracting images from DOCX: {str(e)}")
@@ -122,18 +129,91 @@ supported_file_types = {
     "docx": docx_upload_handler(),
 }
 
+text_extractors = {
+    "pdf": supported_file_types["pdf"].extract_text_from_pdf,
+    "docx": supported_file_types["docx"].extract_text_from_docx,
+}
+
+image_extractors = {
+    "pdf": supported_file_types["pdf"].extract_image_from_pdf,
+    "docx": supported_file_types["docx"].extract_image_from_docx,
+}
+
 # DIRECTLY USABLE UPLOAD HANDLERS:
 
 
+def report_file_type(report: Report) -> str:
+    """File type ("pdf" / "docx") of a report's upload."""
+    name = report.file_name or report.file_path
+    return os.path.splitext(name)[1].lower().lstrip(".")
+
+
+def file_content_hash(file_path: str) -> str:
+    """sha256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_report_text(report: Report, content_ext: str = None) -> str:
+    """
+    Return the report's extracted text, parsing the upload only on a miss.
+
+    On a miss the text of an earlier upload with the same content hash is
+    reused before falling back to PyMuPDF / python-docx. The result is stored
+    on the report; the caller commits the session.
+    """
+    if report.extracted_text:
+        return report.extracted_text
+
+    content_ext = content_ext or report_file_type(report)
+    extractor = text_extractors.get(content_ext)
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {content_ext}")
+
+    content_hash = file_content_hash(report.file_path)
+    cached = (
+        Report.query.with_entities(Report.extracted_text)
+        .filter(
+            Report.content_hash == content_hash,
+            Report.extracted_text.isnot(None),
+        )
+        .first()
+    )
+    if cached is not None:
+        current_app.logger.info(f"Reusing extracted text for {report.file_path}")
+        text = cached.extracted_text
+    else:
+        current_app.logger.info(f"Extracting text from {content_ext}: {report.file_path}")
+        text = extractor(report.file_path)
+
+    report.content_hash = content_hash
+    report.extracted_text = text
+    return text
+
+
 def upload_controller(content_ext: str,
                       file_path: str,
                       p_id: int,
-                      report: Report) -> bool:
+                      report: Report,
+                      progress=None,
+                      job=None) -> bool:
     """
     • extracts text (pdf / docx)
-    • asks Ollama for a summary
-    • writes the summary back to the Report row
+    • indexes it and asks Ollama for a summary, seizures and drug
+      administrations, as a stage graph so independent calls overlap
+    • writes the summary, seizures and drugs back in one transaction; the
+      store helpers raise on a database error, which fails the job
+
+    ``progress(stage, state, **details)`` is called as each stage starts and
+    finishes so the ingestion queue can report per-stage status. ``job``'s
+    ``persisted_at`` is set in the same commit as the results.
     """
+    if progress is None:
+        progress = lambda *args, **kwargs: None
+
     current_app.logger.info(f"Starting upload_controller for {content_ext}: {file_path}")
 
     # ---- 1.  scrape --------------------------------------------------------
@@ -141,40 +221,104 @@ def upload_controller(content_ext: str,
     extractor     = supported_file_types.get(content_ext)
     if extractor is None:
         current_app.logger.warning(f"Unsupported file type: {content_ext}")
+        progress("extract", "failed", error=f"Unsupported file type: {content_ext}")
         return False
 
+    progress("extract", "running")
     try:
-        # NB: docx handler needs storage_path & report.id to pull out images
-        extracted_text = extractor(file_path, storage_path, report.id)
+        extracted_text = get_report_text(report, content_ext)
+        # Keep the text cache even if a later stage fails; a retry reuses it
+        db.session.commit()
+        # Images are only flushed and committed with the results below
+        # NB: image extraction needs storage_path & report.id
+        image_extractors[content_ext](file_path, storage_path, report.id)
     except Exception:
         current_app.logger.error("Text extraction failed", exc_info=True)
+        progress("extract", "failed", error="Text extraction failed")
         return False
 
     if not extracted_text:
         current_app.logger.warning("No text extracted")
+        progress("extract", "failed", error="No text extracted")
         return False
+    progress("extract", "done", characters=len(extracted_text))
 
-    # ---- 2.  summarise -----------------------------------------------------
-    summary = handle_summary_request(extracted_text)
-    if not summary:                                   # model may time‑out
-        summary = extracted_text[:400] + "…"          # cheap fall‑back
+    # ---- 2.  extract in parallel ------------------------------------------
+    # index -> summary and days -> seizures / drugs only share extracted_text,
+    # so they run side by side; nothing touches the session until the join.
+    # The index is recorded on the report in step 3, on this thread.
+    index_path = report_index_path(report)
+    index_model = default_model_name()
 
-    # ---- 3.  persist -------------------------------------------------------
-    try:
-        report.summary = summary.strip()
-        db.session.commit()
+    def index_stage(_):
+        # Chunk + embed once; summary and every later chat question reuse it
+        try:
+            return encode_report_index(index_path, extracted_text, index_model)
+        except Exception:
+            current_app.logger.error("Report indexing failed", exc_info=True)
+            return None
+
+    def summary_stage(results):
+        summary = handle_summary_request(extracted_text, results["index"])
+        if not summary:                                   # model may time‑out
+            summary = extracted_text[:400] + "…"          # cheap fall‑back
+        return summary
+
+    def days_stage(_):
         days = extract_days_from_text(extracted_text)
         current_app.logger.info(f"Checking day error {days}")
-        
-        seizures = handle_seizure_request(days)
-        store_seizures_array(seizures, p_id)
-        drug_admin = handle_drugadmin_request(days)
-        store_drugs_array(drug_admin, p_id)
-        db.session.commit()
-        current_app.logger.info("Report summary saved")
-        return True
+        return days
 
-    except Exception:
+    stages = [
+        Stage("index", index_stage),
+        Stage("summary", summary_stage, deps=["index"]),
+        Stage("days", days_stage),
+        Stage("seizures", lambda r: handle_seizure_request(r["days"]), deps=["days"]),
+        Stage("drugs", lambda r: handle_drugadmin_request(r["days"]), deps=["days"]),
+    ]
+    try:
+        results, timings = run_stage_graph(
+            stages,
+            on_start=lambda name: progress(name, "running"),
+            on_finish=lambda name, seconds: progress(name, "done", seconds=round(seconds, 3)),
+        )
+    except StageError as e:
+        current_app.logger.error(f"Extraction failed in {e.stage}", exc_info=True)
+        progress(e.stage, "failed", error=str(e.__cause__))
+        return False
+
+    current_app.logger.info(
+        "Extraction stage timings: "
+        + ", ".join(f"{name} {timings[name]['seconds']:.2f}s" for name in results)
+        + f"; critical path {' -> '.join(timings['critical_path'])}"
+    )
+
+    # ---- 3.  persist -------------------------------------------------------
+    # The store helpers only flush; this is the pipeline's single results
+    # commit, so the images, summary, index, seizures and drugs are stored
+    # together or not at all
+    progress("persist", "running", critical_path=timings["critical_path"])
+    try:
+        report.summary = results["summary"].strip()
+        if results["index"]:
+            store_report_index(report, results["index"][0], index_path, index_model)
+        seizure_count = store_seizures_array(results["seizures"], p_id)
+        drug_stats = store_drugs_array(results["drugs"], p_id)
+        if job is not None:
+            job.persisted_at = func.now()
+        db.session.commit()
+    except Exception as e:
         db.session.rollback()
-        current_app.logger.error("DB commit failed", exc_info=True)
+        current_app.logger.error("Storing extraction results failed", exc_info=True)
+        progress("persist", "failed", error=str(e))
         return False
+
+    progress(
+        "persist", "done",
+        seizures=seizure_count,
+        drugs=drug_stats["stored"],
+        drugs_seconds=drug_stats["seconds"],
+        chunks=len(results["index"][0]) if results["index"] else 0,
+    )
+    current_app.logger.info("Report summary saved")
+    return True
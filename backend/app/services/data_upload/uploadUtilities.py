@@ -1,15 +1,24 @@
 from datetime import datetime
+import csv
+import io
 import re
-from typing import List, Dict
+import time
+from typing import Any, Dict, List
 from flask import current_app
 from app import db
 
-from app.models import Seizure, DrugAdministration, Electrode
-
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from app.models import Seizure, DrugAdministration, Electrode, seizures_electrodes
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.services.create_graphs.dayAggregates import add_seizures_to_aggregates
+from app.services.create_graphs.graphCache import bump_patient_version
+from app.services.data_upload.dailyStats import refresh_daily_stats
+from app.services.data_upload.embeddingModels import (
+    default_model_name,
+    get_embedding_model,
+)
 import numpy as np
-import re
 
 def split_paragraphs(text):
     """Split text into meaningful paragraphs using double newlines as separators."""
@@ -55,48 +64,119 @@ def chunk_paragraphs_by_word_count(paragraphs, max_words=150, overlap=0):
                 chunks.append(chunk)
     return chunks
 
-def find_top_k_similar(text, question, k=3, model_name='all-mpnet-base-v2'):
-    """Find top-k paragraphs most similar to the question."""
-    current_app.logger.info("1")
-    model = SentenceTransformer(model_name)
-    current_app.logger.info("2")
+def chunk_report_text(text):
+    """Split report text into the de-duplicated chunks used for retrieval."""
     paragraphs = split_paragraphs(text)
-    current_app.logger.info("3")
     paragraphs = filter_paragraphs(paragraphs)
-    current_app.logger.info("4")
     paragraphs = chunk_paragraphs_by_word_count(paragraphs)
-    current_app.logger.info("5")
-    paragraphs = list(set(paragraphs))
-    current_app.logger.info("6")
-    # Generate embeddings
-    paragraph_embeddings = model.encode(paragraphs)
-    current_app.logger.info("7")
-    question_embedding = model.encode([question])[0]
-    current_app.logger.info("8")
-
-    # Calculate similarities
-    paragraph_embeddings = np.array(paragraph_embeddings)
-    question_embedding = np.array(question_embedding).reshape(1, -1)
-
-    similarities = cosine_similarity(question_embedding, paragraph_embeddings)[0]    
-    current_app.logger.info("9")
-
-    # Get top k indices
-    top_k_indices = np.argsort(similarities)[-k:][::-1]
-    current_app.logger.info("10")
-
-    # Prepare results
-    results = []
-    for i in top_k_indices:
-        current_app.logger.info("loopedy poop")
-        results.append({
-            "paragraph": paragraphs[i],
+    # dict keeps first-seen order so the index is stable across rebuilds
+    return list(dict.fromkeys(paragraphs))
+
+def encode_chunks(chunks, model_name=None):
+    """Embed chunks as unit-length float32 rows, so cosine similarity is a dot product."""
+    if not chunks:
+        return np.zeros((0, 0), dtype=np.float32)
+    model = get_embedding_model(model_name)
+    embeddings = np.asarray(model.encode(chunks), dtype=np.float32)
+    if embeddings.ndim == 1:
+        embeddings = embeddings.reshape(len(chunks), -1)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+def rank_chunks(chunks, embeddings, question, k=3, model_name=None):
+    """Return the k chunks most similar to the question, best first."""
+    if not chunks:
+        return []
+    question_embedding = encode_chunks([question], model_name)[0]
+    similarities = np.asarray(embeddings, dtype=np.float32) @ question_embedding
+
+    k = min(k, len(chunks))
+    top_k_indices = np.argpartition(similarities, -k)[-k:]
+    top_k_indices = top_k_indices[np.argsort(similarities[top_k_indices])[::-1]]
+
+    return [
+        {
+            "paragraph": chunks[i],
             "similarity": float(similarities[i])  # Convert numpy float to Python float
-        })
-        if len(results) == k:
-            break
+        }
+        for i in top_k_indices
+    ]
+
+def find_top_k_similar(text, question, k=3, model_name=None, index=None):
+    """
+    Find top-k paragraphs most similar to the question.
+
+    Pass ``index`` (chunks, embeddings) from ``build_report_index`` or
+    ``load_report_index`` to skip chunking and re-encoding the report.
+    """
+    if index is None:
+        chunks = chunk_report_text(text)
+        index = (chunks, encode_chunks(chunks, model_name))
+    chunks, embeddings = index
+    return rank_chunks(chunks, embeddings, question, k, model_name)
 
-    return results
+def report_index_path(report):
+    """Sidecar file holding a report's chunk embeddings."""
+    return f"{report.file_path}.emb.npy"
+
+def encode_report_index(path, text, model_name=None):
+    """
+    Chunk and embed a report's text and save the embeddings as a float16
+    ``.npy`` at ``path``.
+
+    Doesn't touch the Report or the session, so it can run off the request
+    thread; ``store_report_index`` records the result. Returns the
+    (chunks, embeddings) index.
+    """
+    chunks = chunk_report_text(text)
+    embeddings = encode_chunks(chunks, model_name or default_model_name())
+    np.save(path, embeddings.astype(np.float16))
+    return chunks, embeddings
+
+def store_report_index(report, chunks, path, model_name=None):
+    """Point a Report at its saved index. The caller commits the session."""
+    report.embedding_chunks = chunks
+    report.embedding_path = path
+    report.embedding_model = model_name or default_model_name()
+    current_app.logger.info(f"Indexed {len(chunks)} chunks for report {report.id}")
+
+def build_report_index(report, text, model_name=None):
+    """
+    Chunk and embed a report once and store the result against the Report.
+
+    Chunk text goes in ``report.embedding_chunks``; embeddings are written as
+    a float16 ``.npy`` next to the upload. The caller commits the session.
+    Returns the (chunks, embeddings) index.
+    """
+    model_name = model_name or default_model_name()
+    path = report_index_path(report)
+    chunks, embeddings = encode_report_index(path, text, model_name)
+    store_report_index(report, chunks, path, model_name)
+    return chunks, embeddings
+
+def load_report_index(report, model_name=None):
+    """
+    Memory-map a report's stored index.
+
+    Returns None when the report has no index, it was built with another
+    embedding model, or the sidecar file is missing.
+    """
+    model_name = model_name or default_model_name()
+    if (
+        report.embedding_chunks is None
+        or not report.embedding_path
+        or report.embedding_model != model_name
+    ):
+        return None
+    try:
+        embeddings = np.load(report.embedding_path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        current_app.logger.warning(f"Could not load index for report {report.id}: {e}")
+        return None
+    if embeddings.shape[0] != len(report.embedding_chunks):
+        return None
+    return report.embedding_chunks, embeddings
 
 def extract_days_from_text(text: str) -> Dict[str, str]:
     """
@@ -141,175 +221,205 @@ def extract_time_for_DB(time_str: str) -> datetime.time:
         return None
 
 
-def store_seizures_array(seizures: List[Dict], p_id: int) -> bool:
+def store_seizures_array(seizures: List[Dict], p_id: int) -> int:
     """
     Store an array of seizure data for a patient.
 
+    Electrodes are resolved in one query (missing names are upserted), the
+    seizures go in as one multi-row INSERT ... RETURNING and their electrode
+    links as one executemany, so the cost no longer grows with round trips
+    per seizure and electrode.
+
+    Writes are only flushed: the caller commits, so the seizures are stored
+    together with the rest of the report or not at all. Database errors
+    propagate to the caller.
+
     Args:
         seizures: List of seizure dictionaries
         p_id: Patient ID
 
     Returns:
-        bool: True if successful, False otherwise
+        int: number of seizures stored
     """
     if not seizures:
         current_app.logger.info("No seizures to store")
-        return True
+        return 0
+
+    rows = []
+    electrode_names = []
+    skipped = 0
+    for seizure in seizures:
+        # Handle different field names
+        start_time = None
+        if "start_time" in seizure:
+            start_time = extract_time_for_DB(seizure["start_time"])
+        elif "seizure_time" in seizure:
+            start_time = extract_time_for_DB(seizure["seizure_time"])
+
+        duration = seizure.get("duration", 0)
+        # validate_seizure already drops these; guard callers that skip it
+        if start_time is None or not duration:
+            skipped += 1
+            continue
 
-    try:
-        # Use a fresh session to avoid issues with app context
-        for seizure in seizures:
-            # Get required fields with default values if missing
-            day = seizure.get("day", 1)
-
-            # Handle different field names
-            start_time = None
-            if "start_time" in seizure:
-                start_time = extract_time_for_DB(seizure["start_time"])
-            elif "seizure_time" in seizure:
-                start_time = extract_time_for_DB(seizure["seizure_time"])
-
-            duration = seizure.get("duration", 0)
-
-            # Create seizure record
-            db_seizure = Seizure(
-                patient_id=p_id, day=day, start_time=start_time, duration=duration
-            )
-            current_app.logger.info("FINAL BEFORE ADDING TO DB")
-            current_app.logger.info(    
-            f"Seizure(patient_id={db_seizure.patient_id}, "
-            f"day={db_seizure.day}, "
-            f"start_time={db_seizure.start_time}, "
-            f"duration={db_seizure.duration})"
-            )
+        rows.append({
+            "patient_id": p_id,
+            "day": seizure.get("day", 1),
+            "start_time": start_time,
+            "duration": duration,
+        })
+        # Dedupe per seizure and skip empty names
+        raw = seizure.get("electrodes_involved") or []
+        electrode_names.append([name for name in dict.fromkeys(raw) if name])
+
+    if not rows:
+        current_app.logger.info(f"No valid seizures to store ({skipped} skipped)")
+        return 0
+
+    electrode_ids = resolve_electrode_ids(
+        {name for names in electrode_names for name in names}
+    )
+
+    seizure_table = Seizure.__table__
+    seizure_ids = db.session.execute(
+        seizure_table.insert().returning(
+            seizure_table.c.id, sort_by_parameter_order=True
+        ),
+        rows,
+    ).scalars().all()
+
+    links = [
+        {"seizure_id": seizure_id, "electrode_id": electrode_ids[name]}
+        for seizure_id, names in zip(seizure_ids, electrode_names)
+        for name in names
+    ]
+    if links:
+        db.session.execute(seizures_electrodes.insert(), links)
+
+    # Electrodes in id order, as load_patient_timeline returns them
+    add_seizures_to_aggregates(
+        p_id,
+        (
+            (row["day"], row["duration"], sorted(names, key=electrode_ids.get))
+            for row, names in zip(rows, electrode_names)
+        ),
+    )
+    bump_patient_version(p_id)
+    refresh_daily_stats(p_id, (row["day"] for row in rows))
+    current_app.logger.info(
+        f"Stored {len(rows)} seizures "
+        f"with {len(links)} electrode links ({skipped} skipped)"
+    )
+    return len(rows)
+
+
+def resolve_electrode_ids(names) -> Dict[str, int]:
+    """
+    Map electrode names to ids, creating the missing ones.
 
-            # Add and flush to get ID before adding electrodes
-            try:
-                db.session.add(db_seizure)
-                db.session.flush()
-            except Exception as e:
-                current_app.logger.info(f"PROP DUPLICATE {e}")
-
-            # Process electrodes if present
-            #try:
-                """
-                electrodes = []
-                if "electrodes_involved" in seizure and seizure["electrodes_involved"]:
-                    electrodes = seizure["electrodes_involved"]
-            except Exception as e:
-                        current_app.logger.info(f"error eek{e}")
-                """
-            raw = seizure.get("electrodes_involved", [])
-            electrodes = list(dict.fromkeys(raw)) 
-            current_app.logger.info(f"print electrodes {electrodes}")
-            # Add each electrode
-            for electrode_name in electrodes:
-                current_app.logger.info(f"print electrodes name :{electrode_name}")
-                # Skip empty names
-                if not electrode_name:
-                    current_app.logger.info(f"Why")
-                    continue
-
-                # Find or create electrode
-                electrode = Electrode.query.filter_by(name=electrode_name).first()
-                current_app.logger.info(f"print electrode after query {electrode}")
-                if not electrode:
-                    try:
-                        
-                        electrode = Electrode(name=electrode_name)
-                        
-                        db.session.add(electrode)
-                        db.session.flush()
-                    except Exception as e:
-                        current_app.logger.info(f"PROP DUPLICATE 2{e}")
-
-                # Add the association
-                try:
-                    db_seizure.electrodes.append(electrode)
-                except Exception as e:
-                        current_app.logger.info(f"error 3{e}")
-
-        # Commit all changes
-        db.session.query(Seizure).filter(
-            (Seizure.start_time == None) |  (Seizure.duration == 0)
-        ).delete(synchronize_session=False)
-        
-        db.session.commit()
-        current_app.logger.info(f"Successfully stored {len(seizures)} seizures")
-        return True
-
-    except Exception as err:
-        db.session.rollback()
-        current_app.logger.error(f"Error storing seizures: {str(err)}")
-        import traceback
-
-        current_app.logger.error(traceback.format_exc())
-        return False
-
-
-def store_drugs_array(drugs: List[Dict], p_id: int) -> bool:
+    One SELECT when every name exists; otherwise an
+    ``INSERT ... ON CONFLICT DO NOTHING`` on the unique name index (safe
+    against concurrent ingestion jobs) and a second SELECT.
+    """
+    if not names:
+        return {}
+    electrode_table = Electrode.__table__
+    lookup = select(electrode_table.c.name, electrode_table.c.id).where(
+        electrode_table.c.name.in_(names)
+    )
+    ids = dict(db.session.execute(lookup).all())
+
+    missing = [name for name in names if name not in ids]
+    if missing:
+        db.session.execute(
+            pg_insert(electrode_table).on_conflict_do_nothing(index_elements=["name"]),
+            [{"name": name} for name in missing],
+        )
+        ids = dict(db.session.execute(lookup).all())
+    return ids
+
+
+def store_drugs_array(drugs: List[Dict], p_id: int) -> Dict[str, Any]:
     """
     Store drug administration data for a patient.
 
+    All rows are built in memory and written with a single
+    ``COPY ... FROM STDIN`` (an executemany INSERT on non-Postgres
+    databases). Nothing is committed: the caller commits, so the chart is
+    stored together with the rest of the report or not at all. Database
+    errors propagate to the caller.
+
     Args:
         drugs: List of drug dictionaries with name, dosage, etc.
         p_id: Patient ID
 
     Returns:
-        bool: True if successful, False otherwise
+        dict: ``stored`` / ``skipped`` row counts and ``seconds`` taken
     """
+    started = time.perf_counter()
+    rows = []
+    for drug in drugs:
+        # Skip if missing required fields
+        drug_name = (drug.get("name") or "").lower()
+        if not drug_name:
+            continue
 
-    try:
-        stored_count = 0
-
-        for drug in drugs:
-            # Skip if missing required fields
-            if "name" not in drug:
-                continue
-
-            drug_name = drug.get("name", "").lower()
-            if not drug_name:
-                continue
-
-            drug_time = drug.get("time", "").lower()
-            if not drug_name:
-                continue
-
+        drug_time = (drug.get("time") or "").lower()
 
-            # Get dosage with fallback
-            try:
-                dosage = int(drug.get("mg_administered", 0))
-            except (ValueError, TypeError):
-                dosage = 0
+        # Get dosage with fallback
+        try:
+            dosage = int(drug.get("mg_administered", 0))
+        except (ValueError, TypeError):
+            dosage = 0
 
-            # Get day
-            day = drug.get("day", 1)
+        rows.append((p_id, drug_name, drug.get("day", 1), dosage, drug_time))
 
-            
+    if rows:
+        copy_rows(
+            DrugAdministration.__table__,
+            ("patient_id", "drug_name", "day", "dosage", "time"),
+            rows,
+        )
+        bump_patient_version(p_id)
+        refresh_daily_stats(p_id, (row[2] for row in rows))
+
+    stats = {
+        "stored": len(rows),
+        "skipped": len(drugs) - len(rows),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+    current_app.logger.info(
+        f"Stored {stats['stored']} drug administrations "
+        f"in {stats['seconds'] * 1000:.1f}ms ({stats['skipped']} skipped)"
+    )
+    return stats
+
+
+def copy_rows(table, columns, rows) -> None:
+    """
+    Bulk-load ``rows`` into ``table`` inside the session's transaction.
 
-            # Create administration record
-            admin = DrugAdministration(
-                patient_id=p_id, day=day, dosage=dosage, drug_name=drug_name, time=drug_time
+    Uses psycopg2's ``copy_expert`` with CSV and ``\\N`` for NULL. Other
+    drivers get an executemany INSERT.
+    """
+    dbapi_conn = db.session.connection().connection.dbapi_connection
+    cursor = dbapi_conn.cursor()
+    try:
+        if not hasattr(cursor, "copy_expert"):
+            db.session.execute(
+                table.insert(), [dict(zip(columns, row)) for row in rows]
             )
+            return
 
-            db.session.add(admin)
-            stored_count += 1
-
-            # Commit in batches to avoid long transactions
-            if stored_count % 50 == 0:
-                db.session.commit()
-
-        # Final commit for any remaining items
-        db.session.commit()
-        current_app.logger.info(
-            f"Successfully stored {stored_count} drug administrations"
+        buf = io.StringIO()
+        csv.writer(buf).writerows(
+            [r"\N" if value is None else value for value in row] for row in rows
         )
-        return True
-
-    except Exception as err:
-        db.session.rollback()
-        current_app.logger.error(f"Error storing drugs: {str(err)}")
-        import traceback
-
-        current_app.logger.error(traceback.format_exc())
-        return False
+        buf.seek(0)
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) "
+            r"FROM STDIN WITH (FORMAT csv, NULL '\N')",
+            buf,
+        )
+    finally:
+        cursor.close()
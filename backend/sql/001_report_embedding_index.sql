@@ -0,0 +1,4 @@
+-- Per-report retrieval index built at ingestion
+ALTER TABLE reports ADD COLUMN IF NOT EXISTS embedding_chunks JSON;
+ALTER TABLE reports ADD COLUMN IF NOT EXISTS embedding_path TEXT;
+ALTER TABLE reports ADD COLUMN IF NOT EXISTS embedding_model TEXT;
@@ -0,0 +1,4 @@
+-- Extracted report text cached at upload, keyed by file content hash
+ALTER TABLE reports ADD COLUMN IF NOT EXISTS extracted_text TEXT;
+ALTER TABLE reports ADD COLUMN IF NOT EXISTS content_hash TEXT;
+CREATE INDEX IF NOT EXISTS ix_reports_content_hash ON reports (content_hash);
@@ -0,0 +1,17 @@
+-- Electrode names are upserted with ON CONFLICT (name) during ingestion.
+-- Fold duplicate rows into the lowest id first, then enforce uniqueness.
+INSERT INTO seizures_electrodes (seizure_id, electrode_id)
+SELECT se.seizure_id, keep.id
+FROM seizures_electrodes se
+JOIN electrodes e ON e.id = se.electrode_id
+JOIN (SELECT name, MIN(id) AS id FROM electrodes GROUP BY name) keep
+  ON keep.name = e.name
+WHERE e.id <> keep.id
+ON CONFLICT DO NOTHING;
+
+-- Links to the duplicates are removed by ON DELETE CASCADE
+DELETE FROM electrodes e
+USING electrodes keep
+WHERE e.name = keep.name AND e.id > keep.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS electrodes_name_key ON electrodes (name);
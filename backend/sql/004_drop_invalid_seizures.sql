@@ -0,0 +1,3 @@
+-- One-off cleanup of seizures stored before validation rejected them.
+-- Ingestion no longer inserts rows without a start time or duration.
+DELETE FROM seizures WHERE start_time IS NULL OR duration IS NULL OR duration <= 0;
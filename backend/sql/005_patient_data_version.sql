@@ -0,0 +1,2 @@
+-- Per-patient data version used to key cached graph renders
+ALTER TABLE patients ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0;
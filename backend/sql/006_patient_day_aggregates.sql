@@ -0,0 +1,48 @@
+-- Per-patient, per-day seizure aggregates read by the day-level graphs.
+-- Rebuilt from the raw rows, so it is safe to re-run at any time.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS patient_day_aggregates (
+    patient_id INTEGER NOT NULL REFERENCES patients (id) ON DELETE CASCADE,
+    day INTEGER NOT NULL,
+    seizure_count INTEGER NOT NULL DEFAULT 0,
+    total_duration INTEGER NOT NULL DEFAULT 0,
+    stack JSON NOT NULL DEFAULT '[]',
+    electrode_counts JSON NOT NULL DEFAULT '{}',
+    PRIMARY KEY (patient_id, day)
+);
+
+DELETE FROM patient_day_aggregates;
+
+WITH seizure_electrodes AS (
+    SELECT s.id, s.patient_id, s.day, COALESCE(s.duration, 0) AS duration,
+           COALESCE(
+               (SELECT json_agg(e.name ORDER BY e.id)
+                FROM seizures_electrodes se
+                JOIN electrodes e ON e.id = se.electrode_id
+                WHERE se.seizure_id = s.id),
+               '[]'::json
+           ) AS electrodes
+    FROM seizures s
+),
+electrode_counts AS (
+    SELECT patient_id, day, json_object_agg(name, n) AS counts
+    FROM (
+        SELECT s.patient_id, s.day, e.name, COUNT(*) AS n
+        FROM seizures s
+        JOIN seizures_electrodes se ON se.seizure_id = s.id
+        JOIN electrodes e ON e.id = se.electrode_id
+        GROUP BY s.patient_id, s.day, e.name
+    ) per_electrode
+    GROUP BY patient_id, day
+)
+INSERT INTO patient_day_aggregates
+    (patient_id, day, seizure_count, total_duration, stack, electrode_counts)
+SELECT se.patient_id, se.day, COUNT(*), SUM(se.duration),
+       json_agg(json_build_array(se.duration, se.electrodes) ORDER BY se.id),
+       COALESCE(MAX(ec.counts::text)::json, '{}'::json)
+FROM seizure_electrodes se
+LEFT JOIN electrode_counts ec ON ec.patient_id = se.patient_id AND ec.day = se.day
+GROUP BY se.patient_id, se.day;
+
+COMMIT;
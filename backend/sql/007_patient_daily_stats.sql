@@ -0,0 +1,45 @@
+-- Per-patient daily seizure and drug totals (GET /patients/<id>/daily_stats).
+-- Rebuilt from the raw rows, so it is safe to re-run at any time.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS patient_daily_stats (
+    patient_id INTEGER NOT NULL REFERENCES patients (id) ON DELETE CASCADE,
+    day INTEGER NOT NULL,
+    seizure_count INTEGER NOT NULL DEFAULT 0,
+    total_seizure_duration INTEGER NOT NULL DEFAULT 0,
+    drug_administration_count INTEGER NOT NULL DEFAULT 0,
+    total_dosage INTEGER NOT NULL DEFAULT 0,
+    drug_totals JSON NOT NULL DEFAULT '{}',
+    PRIMARY KEY (patient_id, day)
+);
+
+DELETE FROM patient_daily_stats;
+
+WITH seizure_days AS (
+    SELECT patient_id, day, COUNT(*) AS seizure_count,
+           COALESCE(SUM(duration), 0) AS total_seizure_duration
+    FROM seizures
+    GROUP BY patient_id, day
+),
+drug_days AS (
+    SELECT patient_id, day, SUM(n) AS drug_administration_count,
+           SUM(dosage) AS total_dosage,
+           json_object_agg(drug_name, dosage) AS drug_totals
+    FROM (
+        SELECT patient_id, day, drug_name, COUNT(*) AS n, SUM(dosage) AS dosage
+        FROM drug_administration
+        GROUP BY patient_id, day, drug_name
+    ) per_drug
+    GROUP BY patient_id, day
+)
+INSERT INTO patient_daily_stats
+    (patient_id, day, seizure_count, total_seizure_duration,
+     drug_administration_count, total_dosage, drug_totals)
+SELECT COALESCE(s.patient_id, d.patient_id), COALESCE(s.day, d.day),
+       COALESCE(s.seizure_count, 0), COALESCE(s.total_seizure_duration, 0),
+       COALESCE(d.drug_administration_count, 0), COALESCE(d.total_dosage, 0),
+       COALESCE(d.drug_totals, '{}'::json)
+FROM seizure_days s
+FULL OUTER JOIN drug_days d ON d.patient_id = s.patient_id AND d.day = s.day;
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Indexes for per-patient lookups and ON DELETE CASCADE on foreign keys.
+-- electrodes.name is already unique (003). The (patient_id, day) indexes
+-- also serve lookups by patient_id alone.
+CREATE INDEX IF NOT EXISTS ix_seizures_patient_id_day ON seizures (patient_id, day);
+CREATE INDEX IF NOT EXISTS ix_drug_administration_patient_id_day
+    ON drug_administration (patient_id, day);
+CREATE INDEX IF NOT EXISTS ix_reports_patient_id ON reports (patient_id);
+CREATE INDEX IF NOT EXISTS ix_extracted_images_report_id ON extracted_images (report_id);
+CREATE INDEX IF NOT EXISTS ix_supplemental_materials_patient_id
+    ON supplemental_materials (patient_id);
+CREATE INDEX IF NOT EXISTS ix_conversations_user_id ON conversations (user_id);
+CREATE INDEX IF NOT EXISTS ix_conversations_patient_id ON conversations (patient_id);
+CREATE INDEX IF NOT EXISTS ix_messages_conversation_id ON messages (conversation_id);
+CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_report_id ON ingestion_jobs (report_id);
+CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_patient_id ON ingestion_jobs (patient_id);
@@ -1,16 +1,80 @@
+import os
+import tempfile
+
 import pytest
-from api import app, db
 
+# Config is read from the environment when the app package is imported, so
+# point everything at a throwaway sqlite database and directory first.
+_tmp = tempfile.mkdtemp(prefix="neuroclinaical-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.sqlite"
+os.environ["UPLOAD_FOLDER"] = os.path.join(_tmp, "uploads")
+os.environ["INGESTION_WORKERS"] = "0"
+os.environ["EMBEDDING_WARMUP"] = "False"
+os.environ["SCHEMA_VERSION_CHECK"] = "False"
+os.environ["GRAPH_RENDER_WORKERS"] = "0"
+os.environ["GRAPH_PRERENDER"] = "False"
+os.environ["LLM_CACHE_ENABLED"] = "False"
 
-@pytest.fixture
-def test_client():
-    # Set up the Flask test client
+from app import create_app, db  # noqa: E402
+
+# Canned extraction results for pipeline tests
+SEIZURES = [
+    {"day": 1, "start_time": "01:00:00", "duration": 30, "electrodes_involved": ["RAH1"]},
+    {"day": 2, "start_time": "02:00:00", "duration": 45, "electrodes_involved": ["LAH2"]},
+]
+DRUGS = [{"name": "Keppra", "day": 1, "mg_administered": 500, "time": "08:00:00"}]
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
     app.config["TESTING"] = True
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    return app
+
 
+@pytest.fixture
+def app_context(app):
     with app.app_context():
-        db.create_all()  # Create tables in memory for the test database
-        client = app.test_client()
-        yield client
+        db.create_all()
+        yield app
         db.session.remove()
         db.drop_all()
+
+
+@pytest.fixture
+def test_client(app_context):
+    return app_context.test_client()
+
+
+@pytest.fixture
+def patient(app_context):
+    from app.models import Patient
+
+    patient = Patient(name="Test Patient")
+    db.session.add(patient)
+    db.session.commit()
+    return patient.id
+
+
+@pytest.fixture
+def report(app_context, patient, tmp_path):
+    from app.models import Report
+
+    report = Report(patient_id=patient, file_path=str(tmp_path / "r.pdf"), file_name="r.pdf")
+    db.session.add(report)
+    db.session.commit()
+    return report
+
+
+@pytest.fixture
+def extraction(monkeypatch):
+    """Replace text extraction and the LLM calls with canned results."""
+    from app.services.data_upload import uploadHandlers
+
+    monkeypatch.setattr(uploadHandlers, "get_report_text", lambda report, ext: "Day 1 ...")
+    monkeypatch.setattr(uploadHandlers, "image_extractors", {"pdf": lambda *args: None})
+    monkeypatch.setattr(uploadHandlers, "encode_report_index", lambda path, text, model: None)
+    monkeypatch.setattr(uploadHandlers, "handle_summary_request", lambda text, index: "Summary")
+    monkeypatch.setattr(uploadHandlers, "extract_days_from_text", lambda text: {1: text})
+    monkeypatch.setattr(uploadHandlers, "handle_seizure_request", lambda days: SEIZURES)
+    monkeypatch.setattr(uploadHandlers, "handle_drugadmin_request", lambda days: DRUGS)
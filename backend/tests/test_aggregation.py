@@ -0,0 +1,125 @@
+from app.services.create_graphs.aggregation import (
+    MAX_TIME_BARS,
+    OTHER_ELECTRODES,
+    RESOLUTION_DAY,
+    RESOLUTION_HOUR,
+    RESOLUTION_SEIZURE,
+    aggregate_for_screen,
+    bin_seizures,
+    choose_time_resolution,
+    collapse_electrodes,
+    tick_stride,
+    top_electrodes,
+)
+
+
+def seizure(day, start_time, duration=10, electrodes=("RAH1",)):
+    return {
+        "day": day,
+        "start_time": start_time,
+        "duration": duration,
+        "electrodes": list(electrodes),
+    }
+
+
+def test_tick_stride():
+    assert tick_stride(5, 8) == 1
+    assert tick_stride(8, 8) == 1
+    assert tick_stride(9, 8) == 2
+    assert tick_stride(100, 24) == 5
+    assert tick_stride(0, 8) == 1
+
+
+def test_top_electrodes_counts_each_seizure_once():
+    seizures = [
+        seizure(1, "01:00:00", electrodes=["A", "A", "B"]),
+        seizure(1, "02:00:00", electrodes=["B"]),
+    ]
+    assert top_electrodes(seizures, 1) == ["B"]
+
+
+def test_collapse_keeps_small_sets_unchanged():
+    seizures = [seizure(1, "01:00:00", electrodes=["A", "B"])]
+    assert collapse_electrodes(seizures, n=2) is seizures
+
+
+def test_collapse_merges_rare_electrodes():
+    seizures = [
+        seizure(1, "01:00:00", electrodes=["A", "B"]),
+        seizure(1, "02:00:00", electrodes=["A", "C", "D"]),
+        seizure(2, "03:00:00", electrodes=["A"]),
+        seizure(2, "04:00:00", electrodes=["B"]),
+    ]
+    collapsed = collapse_electrodes(seizures, n=2)
+
+    assert [s["electrodes"] for s in collapsed] == [
+        ["A", "B"],
+        ["A", OTHER_ELECTRODES],
+        ["A"],
+        ["B"],
+    ]
+    # The input records are not modified
+    assert seizures[1]["electrodes"] == ["A", "C", "D"]
+
+
+def test_choose_time_resolution():
+    seizures = [seizure(1, f"{h:02d}:{m:02d}:00") for h in range(4) for m in (0, 30)]
+    assert choose_time_resolution(seizures, max_bars=8) == RESOLUTION_SEIZURE
+    assert choose_time_resolution(seizures, max_bars=4) == RESOLUTION_HOUR
+    assert choose_time_resolution(seizures, max_bars=3) == RESOLUTION_DAY
+
+
+def test_bin_by_hour():
+    seizures = [
+        seizure(2, "05:10:00", 20, ["B"]),
+        seizure(1, "05:50:00", 10, ["A", "B"]),
+        seizure(1, "05:05:00", 30, ["B"]),
+    ]
+    assert bin_seizures(seizures, RESOLUTION_HOUR) == [
+        {
+            "day": 1,
+            "start_time": "05:30:00",
+            "duration": 40,
+            "count": 2,
+            "electrodes": ["B", "A"],
+            "span_hours": 1,
+            "label": "05:00",
+        },
+        {
+            "day": 2,
+            "start_time": "05:30:00",
+            "duration": 20,
+            "count": 1,
+            "electrodes": ["B"],
+            "span_hours": 1,
+            "label": "05:00",
+        },
+    ]
+
+
+def test_bin_by_day():
+    seizures = [seizure(1, "01:00:00", 5), seizure(1, "23:00:00", 7), seizure(3, "12:00:00", 1)]
+    binned = bin_seizures(seizures, RESOLUTION_DAY)
+
+    assert [(b["day"], b["duration"], b["count"]) for b in binned] == [(1, 12, 2), (3, 1, 1)]
+    assert {(b["start_time"], b["span_hours"], b["label"]) for b in binned} == {
+        ("12:00:00", 24, "")
+    }
+
+
+def test_seizure_resolution_is_a_no_op():
+    seizures = [seizure(1, "01:00:00")]
+    assert bin_seizures(seizures, RESOLUTION_SEIZURE) is seizures
+
+
+def test_only_the_time_of_day_screen_is_binned():
+    # More seizures than MAX_TIME_BARS, all within three hours of day 1
+    seizures = [
+        seizure(1, f"{i % 3:02d}:{i % 60:02d}:00") for i in range(MAX_TIME_BARS + 1)
+    ]
+
+    assert len(aggregate_for_screen(1, seizures)) == MAX_TIME_BARS + 1
+    assert len(aggregate_for_screen(3, seizures)) == MAX_TIME_BARS + 1
+    binned = aggregate_for_screen(2, seizures)
+    assert [b["label"] for b in binned] == ["00:00", "01:00", "02:00"]
+    assert sum(b["count"] for b in binned) == MAX_TIME_BARS + 1
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from app import db
+from app.models import DrugAdministration
+from app.services.data_upload.uploadUtilities import copy_rows, store_drugs_array
+
+drug_table = DrugAdministration.__table__
+COLUMNS = ("patient_id", "drug_name", "day", "dosage", "time")
+
+
+class FakeCursor:
+    def __init__(self):
+        self.copied = None
+        self.closed = False
+
+    def copy_expert(self, sql, file):
+        self.copied = (sql, file.read())
+
+    def close(self):
+        self.closed = True
+
+
+def test_copy_rows_streams_csv_through_copy(app_context, monkeypatch):
+    cursor = FakeCursor()
+    connection = SimpleNamespace(
+        connection=SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=lambda: cursor))
+    )
+    monkeypatch.setattr(db.session, "connection", lambda: connection)
+
+    copy_rows(drug_table, COLUMNS, [(1, "keppra, xr", 2, 500, None), (1, "ativan", 2, 2, "")])
+
+    sql, data = cursor.copied
+    assert sql == (
+        "COPY drug_administration (patient_id, drug_name, day, dosage, time) "
+        r"FROM STDIN WITH (FORMAT csv, NULL '\N')"
+    )
+    assert data.splitlines() == ['1,"keppra, xr",2,500,\\N', "1,ativan,2,2,"]
+    assert cursor.closed
+
+
+def test_copy_rows_falls_back_to_insert(patient):
+    copy_rows(drug_table, COLUMNS, [(patient, "keppra", 1, 500, None)])
+    db.session.commit()
+
+    drug = DrugAdministration.query.one()
+    assert (drug.drug_name, drug.dosage, drug.time) == ("keppra", 500, None)
+
+
+def test_store_drugs_array(patient):
+    stats = store_drugs_array(
+        [
+            {"name": "Keppra", "day": 2, "mg_administered": "750", "time": "08:00:00"},
+            {"name": "Ativan", "mg_administered": "two"},
+            {"name": "", "mg_administered": 5},
+        ],
+        patient,
+    )
+    db.session.commit()
+
+    assert (stats["stored"], stats["skipped"]) == (2, 1)
+    rows = DrugAdministration.query.order_by(DrugAdministration.id).all()
+    assert [(d.drug_name, d.day, d.dosage, d.time) for d in rows] == [
+        ("keppra", 2, 750, "08:00:00"),
+        ("ativan", 1, 0, ""),
+    ]
+
+
+def test_store_no_drugs(patient):
+    assert store_drugs_array([], patient)["stored"] == 0
+    assert DrugAdministration.query.count() == 0
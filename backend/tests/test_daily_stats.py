@@ -0,0 +1,87 @@
+from datetime import time
+
+from app import db
+from app.models import DrugAdministration, Seizure
+from app.services.data_upload.dailyStats import load_daily_stats, refresh_daily_stats
+from app.services.data_upload.uploadUtilities import store_drugs_array, store_seizures_array
+from tests.conftest import DRUGS, SEIZURES
+
+
+def add_rows(patient):
+    db.session.add_all([
+        Seizure(patient_id=patient, day=1, start_time=time(1), duration=30),
+        Seizure(patient_id=patient, day=1, start_time=time(2), duration=15),
+        Seizure(patient_id=patient, day=3, start_time=time(3), duration=60),
+        DrugAdministration(
+            patient_id=patient, drug_name="Keppra", day=1, dosage=500, time="08:00:00"
+        ),
+        DrugAdministration(
+            patient_id=patient, drug_name="Keppra", day=1, dosage=250, time="20:00:00"
+        ),
+        DrugAdministration(
+            patient_id=patient, drug_name="Ativan", day=1, dosage=2, time="09:00:00"
+        ),
+    ])
+    db.session.flush()
+
+
+def test_refresh_recomputes_from_raw_rows(patient):
+    add_rows(patient)
+    refresh_daily_stats(patient, [3, 1, 1])
+    # Refreshing again replaces the rows instead of adding to them
+    refresh_daily_stats(patient, [1, 3])
+    db.session.commit()
+
+    assert load_daily_stats(patient) == [
+        {
+            "day": 1,
+            "seizure_count": 2,
+            "total_seizure_duration": 45,
+            "drug_administration_count": 3,
+            "total_dosage": 752,
+            "drug_totals": {"Ativan": 2, "Keppra": 750},
+        },
+        {
+            "day": 3,
+            "seizure_count": 1,
+            "total_seizure_duration": 60,
+            "drug_administration_count": 0,
+            "total_dosage": 0,
+            "drug_totals": {},
+        },
+    ]
+    assert [row["day"] for row in load_daily_stats(patient, from_day=2)] == [3]
+
+
+def test_refresh_drops_days_without_data(patient):
+    add_rows(patient)
+    refresh_daily_stats(patient, [1, 3])
+    Seizure.query.filter_by(day=3).delete()
+    refresh_daily_stats(patient, [3])
+    db.session.commit()
+
+    assert [row["day"] for row in load_daily_stats(patient)] == [1]
+
+
+def test_storing_seizures_and_drugs_refreshes_stats(patient):
+    store_seizures_array(SEIZURES, patient)
+    store_drugs_array(DRUGS, patient)
+    db.session.commit()
+
+    stats = {row["day"]: row for row in load_daily_stats(patient)}
+    assert stats[1]["seizure_count"] == 1
+    assert stats[1]["drug_totals"] == {"keppra": 500}
+    assert stats[2]["total_seizure_duration"] == 45
+
+
+def test_daily_stats_endpoint(test_client, patient):
+    add_rows(patient)
+    refresh_daily_stats(patient, [1, 3])
+    db.session.commit()
+
+    response = test_client.get(f"/patients/{patient}/daily_stats?to_day=2")
+    assert response.status_code == 200
+    assert [row["day"] for row in response.get_json()] == [1]
+
+    assert test_client.get(f"/patients/{patient}/daily_stats?from_day=x").status_code == 400
+    assert test_client.get("/patients/999/daily_stats").status_code == 404
@@ -0,0 +1,33 @@
+from app import db
+from app.services.create_graphs.dayAggregates import (
+    add_seizures_to_aggregates,
+    day_aggregate_records,
+    load_day_aggregates,
+)
+
+
+def test_aggregates_fold_in_later_seizures(patient):
+    add_seizures_to_aggregates(patient, [(3, 40, ["LAH2"]), (1, 30, ["RAH1"])])
+    db.session.commit()
+    add_seizures_to_aggregates(patient, [(3, 20, ["RAH1", "LAH2"]), (2, 10, [])])
+    db.session.commit()
+
+    rows = load_day_aggregates(patient)
+    assert [row.day for row in rows] == [1, 2, 3]
+    assert rows[2].stack == [[40, ["LAH2"]], [20, ["RAH1", "LAH2"]]]
+    assert rows[2].electrode_counts == {"LAH2": 2, "RAH1": 1}
+
+
+def test_day_aggregate_records(patient):
+    add_seizures_to_aggregates(patient, [(2, 15, ["RAH1"]), (1, 30, ["LAH2"])])
+    db.session.commit()
+
+    assert day_aggregate_records(patient) == [
+        {"day": 1, "start_time": None, "duration": 30, "electrodes": ["LAH2"]},
+        {"day": 2, "start_time": None, "duration": 15, "electrodes": ["RAH1"]},
+    ]
+
+
+def test_no_seizures_is_a_no_op(patient):
+    add_seizures_to_aggregates(patient, [])
+    assert load_day_aggregates(patient) == []
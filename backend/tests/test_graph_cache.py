@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from app import db
+from app.services.create_graphs import graphCache
+from app.services.create_graphs.graphCache import (
+    GRAPH_RENDER_VERSION,
+    bump_patient_version,
+    get_cached_graph,
+    get_patient_version,
+    graph_data_etag,
+    graph_etag,
+    store_graph,
+)
+
+
+@pytest.fixture
+def cache_dir(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "GRAPH_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(graphCache, "_memory", graphCache.OrderedDict())
+    return tmp_path
+
+
+def test_etags_carry_the_render_version():
+    assert graph_etag(1, 2, 3) == f"graph-1-2-r{GRAPH_RENDER_VERSION}-v3"
+    assert graph_data_etag(1, 2, 3) == f"graph-data-1-2-r{GRAPH_RENDER_VERSION}-v3"
+
+
+def test_render_version_change_invalidates_etags(monkeypatch):
+    before = graph_etag(1, 2, 3), graph_data_etag(1, 2, 3)
+    monkeypatch.setattr(graphCache, "GRAPH_RENDER_VERSION", GRAPH_RENDER_VERSION + 1)
+    assert graph_etag(1, 2, 3) not in before
+    assert graph_data_etag(1, 2, 3) not in before
+
+
+def test_bump_patient_version(patient):
+    version = get_patient_version(patient)
+    bump_patient_version(patient)
+    db.session.commit()
+    assert get_patient_version(patient) == version + 1
+    assert get_patient_version(999) is None
+
+
+def test_store_and_read_back_from_disk(app_context, cache_dir):
+    store_graph(1, 4, 2, b"png")
+    graphCache._memory.clear()
+
+    assert get_cached_graph(1, 4, 2) == b"png"
+    assert get_cached_graph(1, 4, 1) is None
+    assert os.listdir(cache_dir / "1") == [f"4-r{GRAPH_RENDER_VERSION}-v2.png"]
+
+
+def test_store_drops_older_versions_and_renderers(app_context, cache_dir):
+    patient_dir = cache_dir / "1"
+    patient_dir.mkdir()
+    for name in ("4-v1.png", "4-r0-v5.png", f"4-r{GRAPH_RENDER_VERSION}-v1.png",
+                 f"4-r{GRAPH_RENDER_VERSION}-v9.png", "5-v1.png"):
+        (patient_dir / name).write_bytes(b"old")
+
+    store_graph(1, 4, 2, b"png")
+
+    assert sorted(os.listdir(patient_dir)) == [
+        f"4-r{GRAPH_RENDER_VERSION}-v2.png",
+        f"4-r{GRAPH_RENDER_VERSION}-v9.png",
+        "5-v1.png",
+    ]
+
+
+def test_graph_from_another_renderer_is_not_served(app_context, cache_dir, monkeypatch):
+    store_graph(1, 4, 2, b"png")
+    graphCache._memory.clear()
+
+    monkeypatch.setattr(graphCache, "GRAPH_RENDER_VERSION", GRAPH_RENDER_VERSION + 1)
+    assert get_cached_graph(1, 4, 2) is None
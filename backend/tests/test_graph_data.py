@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.create_graphs.graphData import build_graph_data
+
+SEIZURES = [
+    {"day": 1, "start_time": "01:30:00", "duration": 30, "electrodes": ["RAH1"]},
+    {"day": 1, "start_time": "06:00:00", "duration": 60, "electrodes": ["RAH1", "LAH2"]},
+    {"day": 3, "start_time": "12:00:00", "duration": 45, "electrodes": ["LAH2"]},
+]
+DRUGS = [
+    {"drug_name": "Keppra", "day": 1, "dosage": 500, "time": "08:00:00"},
+    {"drug_name": "Ativan", "day": 1, "dosage": 2, "time": "08:00:00"},
+    {"drug_name": "Keppra", "day": 2, "dosage": 750, "time": "20:00:00"},
+]
+
+
+def test_unknown_graph_number():
+    with pytest.raises(ValueError):
+        build_graph_data(9, SEIZURES, DRUGS)
+
+
+def test_no_seizures_is_insufficient_data():
+    data = build_graph_data(0, [], DRUGS)
+    assert data["insufficient_data"]
+    assert "days" not in data
+
+
+def test_day_counts_and_stacks():
+    data = build_graph_data(1, SEIZURES, DRUGS)
+
+    assert data["days"] == [1, 2, 3]
+    # Right hemisphere electrodes first
+    assert data["electrodes"] == ["RAH1", "LAH2"]
+    assert data["seizure_counts"] == [2, 0, 1]
+    assert data["seizures"]["bottom"] == [0, 30, 0]
+    assert data["seizures"]["height"] == [30, 60, 45]
+    assert data["seizures"]["electrodes"] == [[0], [0, 1], [1]]
+
+
+def test_time_of_day_bars_and_drugs():
+    data = build_graph_data(5, SEIZURES, DRUGS)
+
+    assert data["resolution"] == "seizure"
+    assert data["bars"]["x_hours"] == [1.5, 6.0, 60.0]
+    assert data["bars"]["label"] == ["01:30", "06:00", "12:00"]
+    drugs = data["drugs"]
+    assert drugs["names"] == ["Ativan", "Keppra"]
+    assert drugs["x_hours"] == [8.0, 8.0, 44.0]
+    assert drugs["dosage"] == [500, 2, 750]
+    assert drugs["drug"] == [1, 0, 1]
+
+
+def test_drugs_at_the_same_time_keep_their_order():
+    data = build_graph_data(5, SEIZURES, DRUGS[:2])
+    assert data["drugs"]["drug"] == [1, 0]
+
+
+def test_electrode_counts():
+    data = build_graph_data(8, SEIZURES, DRUGS)
+    assert data["electrode_counts"] == {"electrode": [1, 0], "count": [2, 2]}
@@ -0,0 +1,156 @@
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import IngestionJob, Seizure
+from app.services.data_upload import ingestionQueue, uploadHandlers
+from app.services.data_upload.ingestionQueue import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    IngestionWorkerPool,
+    claim_next_job,
+    enqueue_report_job,
+    requeue_stale_jobs,
+    run_job,
+)
+
+
+def make_job(report, **values):
+    job = enqueue_report_job(report, "pdf")
+    for key, value in values.items():
+        setattr(job, key, value)
+    db.session.commit()
+    return job.id
+
+
+def get_job(job_id):
+    db.session.expire_all()
+    return db.session.get(IngestionJob, job_id)
+
+
+def test_claim_takes_the_oldest_queued_job(report):
+    first = make_job(report)
+    second = make_job(report)
+
+    assert claim_next_job() == first
+    job = get_job(first)
+    assert job.status == JOB_RUNNING
+    assert job.attempts == 1
+    assert job.started_at is not None
+
+    assert claim_next_job() == second
+    assert claim_next_job() is None
+
+
+def test_requeue_stale_jobs(report):
+    old = datetime.utcnow() - timedelta(minutes=30)
+    stale = make_job(report, status=JOB_RUNNING, attempts=1, updated_at=old)
+    exhausted = make_job(report, status=JOB_RUNNING, attempts=3, updated_at=old)
+    fresh = make_job(report, status=JOB_RUNNING, attempts=1, updated_at=datetime.utcnow())
+
+    assert requeue_stale_jobs(stale_after=600, max_attempts=3) == 1
+
+    assert get_job(stale).status == JOB_QUEUED
+    assert get_job(exhausted).status == JOB_FAILED
+    assert get_job(fresh).status == JOB_RUNNING
+
+
+def test_run_job_marks_results_persisted(report, extraction):
+    job_id = make_job(report)
+    claim_next_job()
+
+    assert run_job(job_id)
+
+    job = get_job(job_id)
+    assert job.status == JOB_SUCCEEDED
+    assert job.persisted_at is not None
+    assert job.stages["persist"]["state"] == "done"
+    assert Seizure.query.count() == 2
+
+
+def test_retry_after_persist_does_not_store_twice(report, extraction, monkeypatch):
+    job_id = make_job(report)
+    claim_next_job()
+    assert run_job(job_id)
+
+    # A worker that died after the results commit leaves the job running
+    db.session.execute(
+        ingestionQueue.jobs_table.update()
+        .where(ingestionQueue.jobs_table.c.id == job_id)
+        .values(status=JOB_RUNNING, updated_at=datetime.utcnow() - timedelta(hours=1))
+    )
+    db.session.commit()
+    assert requeue_stale_jobs(stale_after=600, max_attempts=3) == 1
+
+    def rerun(*args, **kwargs):
+        raise AssertionError("pipeline ran again")
+
+    monkeypatch.setattr(uploadHandlers, "upload_controller", rerun)
+    assert claim_next_job() == job_id
+    assert run_job(job_id)
+
+    assert get_job(job_id).status == JOB_SUCCEEDED
+    assert Seizure.query.count() == 2
+
+
+def test_run_job_prerenders_graphs(app, report, extraction, monkeypatch):
+    monkeypatch.setitem(app.config, "GRAPH_PRERENDER", True)
+    job_id = make_job(report)
+    claim_next_job()
+
+    assert run_job(job_id)
+
+    graphs = get_job(job_id).stages["graphs"]
+    assert graphs["state"] == "done"
+    assert graphs["rendered"] > 0
+
+
+def backdate(job_id, **delta):
+    db.session.execute(
+        ingestionQueue.jobs_table.update()
+        .where(ingestionQueue.jobs_table.c.id == job_id)
+        .values(updated_at=datetime.utcnow() - timedelta(**delta))
+    )
+    db.session.commit()
+
+
+def test_heartbeat_keeps_a_long_stage_from_looking_stale(app, report, monkeypatch):
+    monkeypatch.setitem(app.config, "INGESTION_HEARTBEAT_INTERVAL", 0.05)
+    job_id = make_job(report)
+    claim_next_job()
+    requeued = []
+
+    def slow_pipeline(*args):
+        # No progress for an hour, but the worker is still alive
+        backdate(job_id, hours=1)
+        time.sleep(0.5)
+        requeued.append(requeue_stale_jobs(stale_after=600, max_attempts=3))
+        return True
+
+    monkeypatch.setattr(uploadHandlers, "upload_controller", slow_pipeline)
+    assert run_job(job_id)
+
+    assert requeued == [0]
+    assert get_job(job_id).status == JOB_SUCCEEDED
+
+
+def test_workers_recover_stale_jobs_periodically(app, report, monkeypatch):
+    monkeypatch.setitem(app.config, "INGESTION_RECOVERY_INTERVAL", 60)
+    pool = IngestionWorkerPool(app, 0, 1)
+    first = make_job(report, status=JOB_RUNNING, attempts=1)
+    backdate(first, hours=1)
+
+    pool._recover()
+    assert get_job(first).status == JOB_QUEUED
+
+    # Not again within the interval
+    second = make_job(report, status=JOB_RUNNING, attempts=1)
+    backdate(second, hours=1)
+    pool._recover()
+    assert get_job(second).status == JOB_RUNNING
+
+    pool._next_recovery = 0
+    pool._recover()
+    assert get_job(second).status == JOB_QUEUED
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import LLMResponse
+from app.services.data_upload import llmCache
+from app.services.data_upload.llmCache import (
+    cached_generate,
+    evict_responses,
+    response_cache_key,
+)
+
+PAYLOAD = {"model": "seizuremodel", "prompt": "Day 1 ...", "stream": False}
+
+
+class FakeOllama:
+    def __init__(self):
+        self.parameters = "temperature 0\nnum_ctx 8192"
+        self.modelfile = "FROM llama3"
+        self.generated = 0
+
+    def show(self, model):
+        return {
+            "modelfile": self.modelfile,
+            "parameters": self.parameters,
+            "template": "{{ .Prompt }}",
+        }
+
+    def generate(self, payload, interactive=False):
+        self.generated += 1
+        return {"response": f"answer {self.generated}"}
+
+
+@pytest.fixture
+def ollama(app, app_context, monkeypatch):
+    monkeypatch.setitem(app.config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llmCache, "_fingerprints", {})
+    fake = FakeOllama()
+    monkeypatch.setattr(llmCache, "get_ollama_client", lambda: fake)
+    return fake
+
+
+def test_key_is_stable_and_covers_the_prompt(ollama):
+    key = response_cache_key(PAYLOAD)
+    assert key == response_cache_key(dict(PAYLOAD))
+    assert key != response_cache_key(dict(PAYLOAD, prompt="Day 2 ..."))
+    assert key != response_cache_key(dict(PAYLOAD, options={"num_ctx": 4096}))
+    assert key != response_cache_key(dict(PAYLOAD, model="drugmodel"))
+
+
+def test_key_changes_with_the_modelfile(ollama, monkeypatch):
+    key = response_cache_key(PAYLOAD)
+    ollama.modelfile = "FROM llama3.1"
+    monkeypatch.setattr(llmCache, "_fingerprints", {})
+    assert response_cache_key(PAYLOAD) != key
+
+
+@pytest.mark.parametrize("payload", [
+    dict(PAYLOAD, stream=True),
+    dict(PAYLOAD, options={"temperature": 0.7}),
+])
+def test_non_deterministic_payloads_are_not_cached(ollama, payload):
+    assert response_cache_key(payload) is None
+
+
+def test_models_sampling_with_temperature_are_not_cached(ollama):
+    ollama.parameters = "num_ctx 8192"  # Ollama's default temperature is 0.8
+    assert response_cache_key(PAYLOAD) is None
+
+
+def test_unreadable_temperature_bypasses_the_cache(ollama):
+    ollama.parameters = "temperature low"
+    assert response_cache_key(PAYLOAD) is None
+
+
+def test_disabled_cache(ollama, app, monkeypatch):
+    monkeypatch.setitem(app.config, "LLM_CACHE_ENABLED", False)
+    assert response_cache_key(PAYLOAD) is None
+
+
+def test_cached_generate_reuses_responses(ollama):
+    assert cached_generate(PAYLOAD) == "answer 1"
+    assert cached_generate(PAYLOAD) == "answer 1"
+    assert ollama.generated == 1
+
+    # refresh re-asks the model and replaces the stored answer
+    assert cached_generate(PAYLOAD, refresh=True) == "answer 2"
+    assert cached_generate(PAYLOAD) == "answer 2"
+    assert LLMResponse.query.one().hits == 2
+
+
+def test_rejected_responses_are_not_stored(ollama):
+    accept = lambda response: response != "answer 1"
+
+    assert cached_generate(PAYLOAD, accept=accept) == "answer 1"
+    assert LLMResponse.query.count() == 0
+
+    assert cached_generate(PAYLOAD, refresh=True, accept=accept) == "answer 2"
+    assert cached_generate(PAYLOAD, accept=accept) == "answer 2"
+    assert ollama.generated == 2
+
+
+def test_rejected_cached_responses_are_misses(ollama):
+    assert cached_generate(PAYLOAD) == "answer 1"
+    assert cached_generate(PAYLOAD, accept=lambda response: response != "answer 1") == "answer 2"
+    assert cached_generate(PAYLOAD) == "answer 2"
+
+
+def test_eviction_keeps_the_most_recently_used(ollama):
+    now = datetime.utcnow()
+    for i in range(3):
+        db.session.add(LLMResponse(
+            key=f"k{i}", model="m", response="r", hits=0,
+            created_at=now, last_used_at=now - timedelta(minutes=i),
+        ))
+    db.session.commit()
+
+    assert evict_responses(2) == 1
+    assert sorted(row.key for row in LLMResponse.query) == ["k0", "k1"]
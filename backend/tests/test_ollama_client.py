@@ -0,0 +1,195 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from app.services.data_upload.ollamaClient import OllamaClient, OllamaError
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, lines=()):
+        self.status_code = status_code
+        self.body = body or {"response": "ok"}
+        self.lines = lines
+        self.text = json.dumps(self.body)
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.body
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """Returns the queued responses (or raises queued exceptions) in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def make_client(*responses, **kwargs):
+    kwargs.setdefault("backoff", 0)
+    client = OllamaClient("http://ollama:11434/api/generate", **kwargs)
+    client.session = FakeSession(*(responses or [FakeResponse()]))
+    return client
+
+
+def test_base_url_strips_the_endpoint():
+    client = make_client()
+    assert client.generate_url == "http://ollama:11434/api/generate"
+
+
+def test_generate_records_latency():
+    client = make_client()
+    assert client.generate({"model": "m"}) == {"response": "ok"}
+
+    stats = client.stats()["m"]
+    assert stats["requests"] == 1
+    assert stats["failures"] == 0
+    assert sum(bucket["count"] for bucket in stats["histogram"]) == 1
+
+
+def test_server_errors_are_retried(app_context):
+    client = make_client(
+        FakeResponse(503), requests.ConnectionError("refused"), FakeResponse(), retries=2
+    )
+    assert client.generate({"model": "m"}) == {"response": "ok"}
+    assert client.session.calls == 3
+    assert client.stats()["m"]["retries"] == 2
+
+
+def test_gives_up_after_the_retries(app_context):
+    client = make_client(FakeResponse(500), retries=1)
+    with pytest.raises(OllamaError, match="after 2 attempts"):
+        client.generate({"model": "m"})
+    assert client.stats()["m"]["failures"] == 1
+    # Every slot was given back
+    assert client._slots.acquire(blocking=False)
+
+
+def test_client_errors_are_not_retried():
+    client = make_client(FakeResponse(404))
+    with pytest.raises(OllamaError):
+        client.generate({"model": "m"})
+    assert client.session.calls == 1
+
+
+def test_client_error_closes_a_streamed_response():
+    response = FakeResponse(400)
+    client = make_client(response)
+    with pytest.raises(OllamaError):
+        list(client.generate_stream({"model": "m"}))
+    assert response.closed
+    assert client._slots.acquire(blocking=False)
+
+
+def test_interactive_requests_skip_busy_background_slots():
+    client = make_client(max_in_flight=2, interactive_slots=1)
+    client._acquire(interactive=False)  # ingestion holds its only slot
+
+    assert not client._background_slots.acquire(blocking=False)
+    assert client.generate({"model": "m"}, interactive=True) == {"response": "ok"}
+
+    client._release(interactive=False)
+    assert client._background_slots.acquire(blocking=False)
+
+
+def test_background_requests_wait_for_a_background_slot():
+    client = make_client(max_in_flight=2, interactive_slots=1)
+    client._acquire(interactive=False)
+    done = threading.Event()
+
+    def background():
+        client.generate({"model": "m"})
+        done.set()
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    assert not done.wait(0.2)
+
+    client._release(interactive=False)
+    assert done.wait(2)
+    thread.join()
+
+
+def test_at_least_one_background_slot():
+    client = make_client(max_in_flight=1, interactive_slots=3)
+    assert client.generate({"model": "m"}) == {"response": "ok"}
+
+
+def test_generate_stream_yields_tokens():
+    lines = [
+        json.dumps({"response": "Hel"}).encode(),
+        b"",
+        json.dumps({"response": "lo", "done": True}).encode(),
+    ]
+    client = make_client(FakeResponse(lines=lines), max_in_flight=1, interactive_slots=0)
+
+    assert list(client.generate_stream({"model": "m"})) == ["Hel", "lo"]
+    assert client.stats()["m"]["mean_first_token_seconds"] is not None
+    assert client._slots.acquire(blocking=False)
+
+
+def test_stream_error_chunk_raises():
+    lines = [json.dumps({"error": "model not found"}).encode()]
+    client = make_client(FakeResponse(lines=lines))
+    with pytest.raises(OllamaError, match="model not found"):
+        list(client.generate_stream({"model": "m"}))
+
+
+def test_retries_stop_at_the_deadline(app_context, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("time.perf_counter", lambda: clock[0])
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    timeouts = []
+
+    class SlowSession(FakeSession):
+        def post(self, url, **kwargs):
+            timeouts.append(kwargs["timeout"])
+            clock[0] += kwargs["timeout"][1]
+            raise requests.ReadTimeout("read timed out")
+
+    client = OllamaClient(
+        "http://ollama:11434", read_timeout=180, retries=2, backoff=0, retry_deadline=240
+    )
+    client.session = SlowSession()
+    with pytest.raises(OllamaError, match="retry deadline of 240s"):
+        client.generate({"model": "m"})
+
+    # The second attempt only gets what is left of the deadline
+    assert timeouts == [(5, 180), (5, 60)]
+
+
+def test_slot_wait_is_not_counted_as_latency(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("time.perf_counter", lambda: clock[0])
+    client = make_client()
+    acquire = client._acquire
+
+    def slow_acquire(interactive):
+        clock[0] += 30
+        acquire(interactive)
+
+    monkeypatch.setattr(client, "_acquire", slow_acquire)
+    client.generate({"model": "m"})
+
+    stats = client.stats()["m"]
+    assert stats["mean_slot_wait_seconds"] == 30
+    assert stats["mean_seconds"] == 0
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from app.services.data_upload.stageGraph import Stage, StageError, run_stage_graph
+
+
+def test_results_flow_along_dependencies(app):
+    with app.app_context():
+        results, timings = run_stage_graph([
+            Stage("days", lambda r: [1, 2]),
+            Stage("seizures", lambda r: len(r["days"]), deps=["days"]),
+            Stage("summary", lambda r: "summary"),
+        ])
+
+    assert results == {"days": [1, 2], "seizures": 2, "summary": "summary"}
+    assert set(timings) == {"days", "seizures", "summary", "critical_path"}
+
+
+def test_independent_stages_overlap(app):
+    barrier = threading.Barrier(2, timeout=2)
+
+    with app.app_context():
+        # Each stage waits for the other, so this only finishes if they overlap
+        results, _ = run_stage_graph([
+            Stage("seizures", lambda r: barrier.wait()),
+            Stage("drugs", lambda r: barrier.wait()),
+        ])
+    assert set(results) == {"seizures", "drugs"}
+
+
+def test_critical_path_follows_the_slowest_chain(app):
+    with app.app_context():
+        _, timings = run_stage_graph([
+            Stage("index", lambda r: time.sleep(0.1)),
+            Stage("summary", lambda r: None, deps=["index"]),
+            Stage("days", lambda r: None),
+            Stage("drugs", lambda r: None, deps=["days"]),
+        ])
+    assert timings["critical_path"] == ["index", "summary"]
+
+
+def test_hooks_report_start_and_finish(app):
+    events = []
+    with app.app_context():
+        run_stage_graph(
+            [Stage("a", lambda r: None), Stage("b", lambda r: None, deps=["a"])],
+            on_start=lambda name: events.append(("start", name)),
+            on_finish=lambda name, seconds: events.append(("finish", name)),
+        )
+    assert events == [("start", "a"), ("finish", "a"), ("start", "b"), ("finish", "b")]
+
+
+def test_failure_skips_dependent_stages(app):
+    ran = []
+
+    def broken(r):
+        raise RuntimeError("model timed out")
+
+    with app.app_context(), pytest.raises(StageError) as info:
+        run_stage_graph([
+            Stage("days", broken),
+            Stage("seizures", lambda r: ran.append("seizures"), deps=["days"]),
+        ])
+
+    assert info.value.stage == "days"
+    assert isinstance(info.value.__cause__, RuntimeError)
+    assert ran == []
+
+
+def test_invalid_graphs(app):
+    with app.app_context():
+        with pytest.raises(ValueError, match="unknown"):
+            run_stage_graph([Stage("a", lambda r: None, deps=["b"])])
+        with pytest.raises(ValueError, match="cycle"):
+            run_stage_graph([
+                Stage("a", lambda r: None, deps=["b"]),
+                Stage("b", lambda r: None, deps=["a"]),
+            ])
@@ -0,0 +1,68 @@
+from app import db
+from app.models import DrugAdministration, Report, Seizure
+from app.services.data_upload import uploadHandlers
+from app.services.data_upload.uploadUtilities import store_drugs_array, store_seizures_array
+from tests.conftest import DRUGS, SEIZURES
+
+
+def run_pipeline(report):
+    stages = {}
+    ok = uploadHandlers.upload_controller(
+        "pdf", report.file_path, report.patient_id, report,
+        lambda stage, state, **details: stages.__setitem__(stage, (state, details)),
+    )
+    return ok, stages
+
+
+def test_store_helpers_leave_the_commit_to_the_caller(app_context, patient):
+    assert store_seizures_array(SEIZURES, patient) == 2
+    assert store_drugs_array(DRUGS, patient)["stored"] == 1
+    db.session.rollback()
+
+    assert Seizure.query.count() == 0
+    assert DrugAdministration.query.count() == 0
+
+
+def test_pipeline_stores_everything_in_one_commit(report, extraction):
+    ok, stages = run_pipeline(report)
+
+    assert ok
+    state, details = stages["persist"]
+    assert state == "done"
+    assert details["seizures"] == 2
+    assert details["drugs"] == 1
+    db.session.expire_all()
+    assert db.session.get(Report, report.id).summary == "Summary"
+    assert Seizure.query.count() == 2
+    assert DrugAdministration.query.count() == 1
+
+
+def test_failed_drug_storage_rolls_back_the_whole_report(report, extraction, monkeypatch):
+    def broken(drugs, p_id):
+        raise RuntimeError("COPY failed")
+
+    monkeypatch.setattr(uploadHandlers, "store_drugs_array", broken)
+    ok, stages = run_pipeline(report)
+
+    assert not ok
+    assert stages["persist"] == ("failed", {"error": "COPY failed"})
+    db.session.expire_all()
+    assert db.session.get(Report, report.id).summary is None
+    assert Seizure.query.count() == 0
+
+
+def test_index_is_recorded_on_the_report_with_the_results(report, extraction, monkeypatch):
+    def encode(path, text, model):
+        assert report.embedding_chunks is None
+        return ["Day 1 ..."], None
+
+    monkeypatch.setattr(uploadHandlers, "encode_report_index", encode)
+    ok, stages = run_pipeline(report)
+
+    assert ok
+    assert stages["persist"][1]["chunks"] == 1
+    db.session.expire_all()
+    stored = db.session.get(Report, report.id)
+    assert stored.embedding_chunks == ["Day 1 ..."]
+    assert stored.embedding_path == report.file_path + ".emb.npy"
+    assert stored.embedding_model
@@ -1,5 +1,7 @@
 """Patient routes."""
 
+import json
+
 from flask import (
     request,
     redirect,
@@ -9,6 +11,8 @@ from flask import (
     render_template,
     flash,
     send_file,
+    Response,
+    stream_with_context,
 )
 from app.services.patients_api import (
     fetch_a_patient,
@@ -19,6 +23,7 @@ from app.services.patients_api import (
     download_supplemental_material,
     fetch_reports_for_patient,
     fetch_supplemental_materials_for_patient,
+    stream_chat_message,
 )
 
 bp = Blueprint("patient", __name__, url_prefix="/patients")
@@ -77,7 +82,7 @@ def upload_patient_report(patient_id):
 
     response = upload_report(patient_id, save_path)
     if response:
-        flash("Report uploaded successfully.", "success")
+        flash("Report uploaded; processing has started.", "success")
     else:
         flash("Failed to upload report.", "error")
 
@@ -138,3 +143,22 @@ def download_patient_supplemental(material_id):
         return redirect(
             url_for("patient.patient_detail", patient_id=material_id)
         )
+
+
+@bp.route("/reports/<int:report_id>/chat", methods=["POST"])
+def chat_about_report(report_id):
+    """Relay a streamed chat answer about a report to the browser as SSE."""
+    query = (request.get_json(silent=True) or {}).get("query", "").strip()
+    if not query:
+        abort(400)
+
+    def events():
+        for event, data in stream_chat_message(report_id, query):
+            prefix = "" if event == "token" else f"event: {event}\n"
+            yield f"{prefix}data: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,7 @@
 """API requests for patients."""
 
 import os
+import json
 import requests
 from flask import current_app
 
@@ -163,3 +164,32 @@ def fetch_supplemental_materials_for_patient(patient_id: int):
             f"API error while fetching supplemental materials: {e}"
         )
         return []
+
+
+def stream_chat_message(report_id: int, query: str):
+    """
+    Ask a question about a report, yielding (event, data) pairs as they arrive.
+
+    Events are "token" for each chunk of the answer, then "done" with the full
+    response, or "error" if the backend or model failed.
+    """
+    url = f"{current_app.config['API_BASE_URL']}/chat/{report_id}/messages"
+    data = {"query": query, "stream": True}
+    headers = {"Accept": "text/event-stream"}
+    try:
+        # (connect, read) timeout: tokens arrive well within 60s of each other
+        with requests.post(
+            url, json=data, headers=headers, stream=True, timeout=(10, 60)
+        ) as response:
+            response.raise_for_status()
+            event = "token"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    event = "token"  # blank line ends an event
+                elif line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:"):])
+    except requests.RequestException as e:
+        current_app.logger.error(f"API error during chat: {e}")
+        yield "error", {"error": "Failed to reach the chat service"}